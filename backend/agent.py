@@ -0,0 +1,41 @@
+"""
+Standalone Walletsurance agent process.
+Runs the background work outside the web tier: nominee inactivity checks (SMS), Horizon stream
+ingestion (if HORIZON_STREAM_ENABLED=1) and the contract claim check (AGENT_CHECK_INTERVAL_MINUTES).
+
+Run exactly one of these next to the web service, and set RUN_AGENT_IN_WEB=0 on the web service so
+gunicorn can run several workers without duplicate checks or duplicate SMS:
+  cd backend && python -m agent
+"""
+import logging
+import signal
+import threading
+
+import app as web
+
+logger = logging.getLogger("agent")
+
+
+def main() -> None:
+    stop = threading.Event()
+
+    def _shutdown(signum, frame):
+        logger.info("Agent stopping (signal %s)", signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    threads = web.start_background_workers(stop, contract_check=True)
+    if not threads:
+        logger.warning("Nothing to run: INACTIVITY_CHECK_INTERVAL_MINUTES=0, stream disabled and no contract check")
+        return
+    logger.info("Agent running: %s", ", ".join(t.name for t in threads))
+    while not stop.wait(1):
+        pass
+    for t in threads:
+        t.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
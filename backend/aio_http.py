@@ -0,0 +1,111 @@
+"""
+Async counterpart of http_session for the ASGI serving mode (asgi.py).
+One aiohttp ClientSession per event loop, shared by every host (keep-alive connections, at most
+ASGI_HTTP_LIMIT open), with the same per-host timeouts and jittered retries on 429/5xx as http_session.
+Like urllib3's Retry, a non-idempotent request (POST) is only retried when the connection could not be
+set up, never after it may have reached the server (read error or timeout).
+aiohttp is only imported when the first async request is made, so the WSGI app does not need it.
+"""
+import asyncio
+import json
+import random
+
+from requests.structures import CaseInsensitiveDict
+
+from config import ASGI_HTTP_LIMIT, HTTP_BACKOFF_FACTOR, HTTP_RETRIES
+from http_session import RETRY_STATUSES, timeout_for
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class Response:
+    """The parts of requests.Response the clients use, read fully before the connection is released."""
+
+    def __init__(self, status_code: int, text: str, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = CaseInsensitiveDict(headers or {})
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}: {self.text[:200]}")
+
+
+_sessions: dict = {}
+
+
+def _session():
+    """The aiohttp ClientSession of the running event loop (created on first use)."""
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=ASGI_HTTP_LIMIT))
+    return session
+
+
+def _connect_errors(aiohttp) -> tuple:
+    """Errors raised before the request was sent: safe to retry for any method."""
+    timeout = getattr(aiohttp, "ConnectionTimeoutError", None)  # aiohttp >= 3.10: sock_connect timed out
+    return (aiohttp.ClientConnectorError, timeout) if timeout else (aiohttp.ClientConnectorError,)
+
+
+def _retryable(status_code: int, method: str, retry_429: bool) -> bool:
+    """Whether a response is worth another attempt: 429 only when retry_429, other RETRY_STATUSES if idempotent."""
+    if status_code == 429:
+        return retry_429
+    return status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+
+
+def _backoff(attempt: int, retry_after: str | None) -> float:
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return random.uniform(0, HTTP_BACKOFF_FACTOR * (2 ** attempt))
+
+
+async def request(method: str, url: str, *, timeout=None, retry_429: bool = True, **kwargs) -> Response:
+    """Like http_session.request, awaiting the response instead of blocking a thread."""
+    import aiohttp
+
+    timeout = timeout_for(url, timeout)
+    if isinstance(timeout, tuple):
+        client_timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    else:
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+    method = method.upper()
+    for attempt in range(HTTP_RETRIES + 1):
+        last = attempt == HTTP_RETRIES
+        try:
+            async with _session().request(method, url, timeout=client_timeout, **kwargs) as resp:
+                response = Response(resp.status, await resp.text(), resp.headers)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if last or (method not in IDEMPOTENT_METHODS and not isinstance(e, _connect_errors(aiohttp))):
+                raise
+            await asyncio.sleep(_backoff(attempt, None))
+            continue
+        if not _retryable(response.status_code, method, retry_429) or last:
+            return response
+        await asyncio.sleep(_backoff(attempt, response.headers.get("Retry-After")))
+    return response
+
+
+async def get(url: str, **kwargs) -> Response:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> Response:
+    return await request("POST", url, **kwargs)
+
+
+async def close_all() -> None:
+    """Close the running loop's session (ASGI lifespan shutdown)."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
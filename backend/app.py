@@ -3,6 +3,7 @@ Walletsurance Backend – Flask API and Agent entrypoint.
 - REST API for user registration (mock bank details), ping, and status.
 - Agent: checks contracts for claimable vaults, mocks claim + Onmeta off-ramp.
 """
+import json
 import logging
 import os
 import secrets
@@ -39,23 +40,72 @@ except ImportError:
     pass
 
 from flask import Flask, g, jsonify, request, render_template
+from flask.json.provider import DefaultJSONProvider
+
+import metrics
+import profiling
+import timing
+from db import db_time
 
 from config import (
     CONTRACT_ID,
     DEFAULT_TOKEN_ADDRESS,
+    HORIZON_STREAM_ENABLED,
     HORIZON_URL,
     INACTIVITY_CHECK_INTERVAL_MINUTES,
+    MULTI_VAULT_CONTRACT_ID,
     NETWORK_PASSPHRASE,
+    RUN_AGENT_IN_WEB,
+    SOROBAN_EVENTS_ENABLED,
     SOROBAN_RPC_URL,
 )
 
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """flask.json provider that records response encoding as the request's "json" timing span."""
+
+    def dumps(self, obj, **kwargs):
+        with timing.span("json"):
+            return super().dumps(obj, **kwargs)
+
+
 app = Flask(__name__, static_folder="static", template_folder="templates")
+app.json = TimedJSONProvider(app)
 app.config["DATABASE"] = os.environ.get("DATABASE_PATH", "walletsurance.db")
 
 # When set, 500 responses include "traceback" in JSON (for debugging). Always log full traceback server-side.
 SHOW_TRACEBACK_IN_RESPONSE = os.environ.get("FLASK_DEBUG", "0") == "1" or os.environ.get("ERROR_DETAIL", "0") == "1"
 
 
+@app.before_request
+def _start_request_timing():
+    g.timing_token = timing.start()
+    g.profile = profiling.maybe_start("request", request.path)
+
+
+@app.after_request
+def _finish_request_timing(response):
+    """Server-Timing header + structured timing log; saves the request's profile when it was sampled."""
+    profiling.stop(g.pop("profile", None))
+    token = g.pop("timing_token", None)
+    if token is not None:
+        route = request.url_rule.rule if request.url_rule else request.path
+        header = timing.finish(token, request.method, route, response.status_code)
+        if header:
+            response.headers["Server-Timing"] = header
+    return response
+
+
+@app.teardown_request
+def _teardown_request_timing(exc):
+    # after_request does not run when a view raises past the error handlers: don't leak the context.
+    profiling.stop(g.pop("profile", None))
+    token = g.pop("timing_token", None)
+    if token is not None:
+        timing.finish(token, request.method, request.path, 500)
+
+
 @app.errorhandler(500)
 def handle_500(err):
     """Ensure every 500 returns JSON and we log the exact failure location."""
@@ -70,12 +120,10 @@ def handle_500(err):
 
 
 def get_db():
-    """Per-request DB connection (thread-safe)."""
+    """Per-request DB connection, taken from this thread's pooled connection (WAL, tuned pragmas)."""
     if "db" not in g:
-        db_path = app.config["DATABASE"]
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        g.db = sqlite3.connect(db_path)
-        g.db.row_factory = sqlite3.Row
+        from db import get_pool
+        g.db = get_pool(app.config["DATABASE"]).connection()
     return g.db
 
 
@@ -83,14 +131,21 @@ def get_db():
 def close_db(exception=None):
     db = g.pop("db", None)
     if db is not None:
-        db.close()
+        from db import get_pool
+        get_pool(app.config["DATABASE"]).release(db)
+
+
+# nominees.next_check_at: earliest UTC time ('YYYY-MM-DD HH:MM:SS') the depositor can be past its threshold.
+# New rows default to the epoch (due on the next cycle); NULL means a claim was issued and the row is retired.
+NEXT_CHECK_UNSCHEDULED = "1970-01-01 00:00:00"
 
 
 def init_db():
+    import sms_outbox
+    from db import connect
+
     with app.app_context():
-        db_path = app.config["DATABASE"]
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        db = sqlite3.connect(db_path)
+        db = connect(app.config["DATABASE"])
         db.execute(
             """
             CREATE TABLE IF NOT EXISTS beneficiaries (
@@ -118,6 +173,11 @@ def init_db():
             """
         )
         db.commit()
+        try:
+            db.execute("ALTER TABLE agent_runs ADD COLUMN vault_id INTEGER")
+            db.commit()
+        except sqlite3.OperationalError:
+            pass
         try:
             db.execute("ALTER TABLE beneficiaries ADD COLUMN timeout_days INTEGER")
             db.commit()
@@ -152,10 +212,110 @@ def init_db():
             )
             """
         )
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vault_contracts (
+                contract_id TEXT PRIMARY KEY,
+                label TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        # Vault state mirrored from contract events (soroban_events); vault_id is 0 for single-vault contracts.
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vaults (
+                contract_id TEXT NOT NULL,
+                vault_id INTEGER NOT NULL DEFAULT 0,
+                depositor TEXT,
+                beneficiary TEXT,
+                token TEXT,
+                amount TEXT,
+                last_ping INTEGER,
+                timeout INTEGER,
+                deadline INTEGER,
+                status TEXT NOT NULL DEFAULT 'active',
+                updated_ledger INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (contract_id, vault_id)
+            )
+            """
+        )
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stream_cursors (
+                name TEXT PRIMARY KEY,
+                cursor TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        # Event ingestion lanes (soroban_events): each watched contract's lane and the ledger it is mirrored through.
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS event_lanes (
+                contract_id TEXT PRIMARY KEY,
+                lane INTEGER NOT NULL,
+                ledger INTEGER,
+                polled_at REAL
+            )
+            """
+        )
+        db.commit()
+        try:
+            db.execute("ALTER TABLE nominees ADD COLUMN last_activity_at TEXT")
+            db.commit()
+        except sqlite3.OperationalError:
+            pass
+        try:
+            db.execute(f"ALTER TABLE nominees ADD COLUMN next_check_at TEXT DEFAULT '{NEXT_CHECK_UNSCHEDULED}'")
+            db.commit()
+        except sqlite3.OperationalError:
+            pass
+        # KDF algorithm + parameters the record's ciphertext was made with (JSON; NULL = key_encrypt.LEGACY_KDF_PARAMS).
+        try:
+            db.execute("ALTER TABLE nominees ADD COLUMN kdf_params TEXT")
+            db.commit()
+        except sqlite3.OperationalError:
+            pass
+        # Agent leases (see _lease_due_nominees): which agent instance is checking the row, and until when.
+        for column in ("lease_owner TEXT", "lease_expires_at TEXT"):
+            try:
+                db.execute(f"ALTER TABLE nominees ADD COLUMN {column}")
+                db.commit()
+            except sqlite3.OperationalError:
+                pass
+        db.execute("CREATE INDEX IF NOT EXISTS idx_nominees_next_check_at ON nominees(next_check_at)")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_nominee_claims_nominee_id ON nominee_claims(nominee_id)")
+        db.execute(sms_outbox.SCHEMA)
+        db.execute("CREATE INDEX IF NOT EXISTS idx_sms_outbox_due ON sms_outbox(status, next_attempt_at)")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_vaults_due ON vaults(status, deadline)")
+        _backfill_next_check_at(db)
         db.commit()
         db.close()
 
 
+def _backfill_next_check_at(db):
+    """
+    Bulk-compute next_check_at for existing rows: retire rows that already have a claim, and schedule
+    unscheduled rows with a known last activity at last activity + threshold. Rows with no known
+    activity stay due and are scheduled by their first check.
+    """
+    db.execute(
+        "UPDATE nominees SET next_check_at = NULL WHERE next_check_at IS NOT NULL AND id IN (SELECT nominee_id FROM nominee_claims)"
+    )
+    db.execute(
+        """
+        UPDATE nominees SET next_check_at = datetime(
+            last_activity_at,
+            CASE WHEN inactivity_days = 0 THEN '+2 minutes' ELSE '+' || inactivity_days || ' days' END
+        )
+        WHERE next_check_at = ? AND last_activity_at IS NOT NULL
+        """,
+        (NEXT_CHECK_UNSCHEDULED,),
+    )
+
+
 @app.route("/")
 def index():
     """Minimal UI: contract status, register beneficiary, mock agent."""
@@ -177,11 +337,31 @@ def health():
     return jsonify({"status": "ok", "service": "walletsurance"})
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint (text format). 404 with METRICS_ENABLED=0. Scrapes must send
+    Authorization: Bearer <METRICS_TOKEN> (or ADMIN_TOKEN); 403 while neither is set.
+    """
+    from config import ADMIN_TOKEN, METRICS_ENABLED, METRICS_TOKEN
+
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics disabled"}), 404
+    token = METRICS_TOKEN or ADMIN_TOKEN
+    if not token:
+        return jsonify({"error": "Metrics are disabled (set METRICS_TOKEN or ADMIN_TOKEN)"}), 403
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+    return app.response_class(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.route("/api/lock-config", methods=["GET"])
 def lock_config():
     """Public config for Lock funds: contract ID, RPC URL, network, default token (if set)."""
     return jsonify({
         "contract_id": CONTRACT_ID,
+        "multi_vault_contract_id": MULTI_VAULT_CONTRACT_ID or None,
         "rpc_url": SOROBAN_RPC_URL,
         "network_passphrase": NETWORK_PASSPHRASE,
         "horizon_url": HORIZON_URL or "https://horizon-testnet.stellar.org",
@@ -189,18 +369,8 @@ def lock_config():
     })
 
 
-@app.route("/api/build-deposit", methods=["POST"])
-def build_deposit():
-    """
-    Build an unsigned deposit() transaction. Returns transaction_xdr for the client to sign (e.g. Freighter).
-    Body: depositor_public_key, beneficiary_address, amount, timeout_ledgers, token_address (optional).
-    """
-    try:
-        from build_deposit import build_deposit_xdr
-    except ImportError:
-        return jsonify({"error": "build_deposit not available"}), 503
-
-    data = request.get_json() or {}
+def _deposit_args(data):
+    """Validate a build-deposit body. Returns ((depositor, beneficiary, amount, timeout_ledgers, token_address), None) or (None, error)."""
     depositor = (data.get("depositor_public_key") or "").strip()
     beneficiary = (data.get("beneficiary_address") or "").strip()
     amount = data.get("amount")
@@ -208,21 +378,37 @@ def build_deposit():
     token_address = (data.get("token_address") or "").strip() or None
 
     if not depositor or not beneficiary:
-        return jsonify({"error": "depositor_public_key and beneficiary_address required"}), 400
+        return None, "depositor_public_key and beneficiary_address required"
     if amount is None:
-        return jsonify({"error": "amount required"}), 400
+        return None, "amount required"
     try:
         amount = int(amount)
     except (TypeError, ValueError):
-        return jsonify({"error": "amount must be an integer"}), 400
+        return None, "amount must be an integer"
     if timeout_ledgers is None:
-        return jsonify({"error": "timeout_ledgers required"}), 400
+        return None, "timeout_ledgers required"
     try:
         timeout_ledgers = int(timeout_ledgers)
     except (TypeError, ValueError):
-        return jsonify({"error": "timeout_ledgers must be an integer"}), 400
+        return None, "timeout_ledgers must be an integer"
+    return (depositor, beneficiary, amount, timeout_ledgers, token_address), None
+
+
+@app.route("/api/build-deposit", methods=["POST"])
+def build_deposit():
+    """
+    Build an unsigned deposit() transaction. Returns transaction_xdr for the client to sign (e.g. Freighter).
+    Body: depositor_public_key, beneficiary_address, amount, timeout_ledgers, token_address (optional).
+    """
+    try:
+        from build_deposit import build_deposit_xdr
+    except ImportError:
+        return jsonify({"error": "build_deposit not available"}), 503
 
-    xdr, err = build_deposit_xdr(depositor, beneficiary, amount, timeout_ledgers, token_address)
+    args, err = _deposit_args(request.get_json() or {})
+    if err:
+        return jsonify({"error": err}), 400
+    xdr, err = build_deposit_xdr(*args)
     if err:
         return jsonify({"error": err}), 400
     return jsonify({"transaction_xdr": xdr})
@@ -259,29 +445,16 @@ def nominee_register():
     """
     try:
         from stellar_sdk import Keypair
-        from key_encrypt import encrypt_secret_with_answer
+        import kdf_pool
+        from key_encrypt import current_kdf_params
+        from nominee_import import validate_nominee
     except ImportError as e:
         return jsonify({"error": f"Missing dependency: {e}"}), 503
 
-    data = request.get_json() or {}
-    depositor = (data.get("depositor_account_id") or "").strip()
-    phone = (data.get("beneficiary_phone") or "").strip()
-    beneficiary_address = (data.get("beneficiary_stellar_address") or "").strip()
-    question = (data.get("question") or "").strip()
-    answer = (data.get("answer") or "").strip()
-    inactivity_days = data.get("inactivity_days", 30)
-    if isinstance(inactivity_days, str) and inactivity_days.isdigit():
-        inactivity_days = int(inactivity_days)
-    else:
-        try:
-            inactivity_days = int(inactivity_days) if inactivity_days not in (None, "") else 30
-        except (TypeError, ValueError):
-            inactivity_days = 30
-
-    if not depositor or not phone or not question or not answer:
-        return jsonify({"error": "depositor_account_id, beneficiary_phone, question, and answer required"}), 400
-    if len(depositor) != 56 or not depositor.startswith("G"):
-        return jsonify({"error": "depositor_account_id must be a Stellar public key (G..., 56 chars)"}), 400
+    fields, err = validate_nominee(request.get_json() or {})
+    if err:
+        return jsonify({"error": err}), 400
+    depositor, phone, answer = fields["depositor"], fields["phone"], fields["answer"]
 
     try:
         kp = Keypair.random()
@@ -291,8 +464,12 @@ def nominee_register():
         logger.exception("nominee_register: Keypair generation failed")
         return jsonify({"error": f"Keypair generation failed: {e}", "where": "keypair"}), 500
 
+    kdf_params = current_kdf_params()
     try:
-        ciphertext_b64, nonce_b64, salt_b64 = encrypt_secret_with_answer(secret, answer)
+        ciphertext_b64, nonce_b64, salt_b64 = kdf_pool.encrypt(secret, answer, kdf_params)
+    except kdf_pool.PoolBusy as e:
+        resp = jsonify({"error": "Too many registrations in progress, please retry shortly.", "retry_after": e.retry_after})
+        return resp, 503, {"Retry-After": str(e.retry_after)}
     except Exception as e:
         logger.exception("nominee_register: Encryption failed")
         return jsonify({"error": f"Encryption failed: {e}", "where": "encrypt"}), 500
@@ -302,10 +479,13 @@ def nominee_register():
         db.execute(
             """
             INSERT OR REPLACE INTO nominees
-            (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, question, beneficiary_phone, beneficiary_stellar_address, inactivity_days)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, kdf_params, question, beneficiary_phone, beneficiary_stellar_address, inactivity_days)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (depositor, public, ciphertext_b64, nonce_b64, salt_b64, question, phone, beneficiary_address or None, inactivity_days),
+            (
+                depositor, public, ciphertext_b64, nonce_b64, salt_b64, json.dumps(kdf_params), fields["question"],
+                phone, fields["beneficiary_address"] or None, fields["inactivity_days"],
+            ),
         )
         db.commit()
     except sqlite3.IntegrityError:
@@ -321,45 +501,123 @@ def nominee_register():
     })
 
 
+def _admin_denied():
+    """Error response unless the request carries Authorization: Bearer <ADMIN_TOKEN>; None when allowed."""
+    from config import ADMIN_TOKEN
+
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled (set ADMIN_TOKEN)"}), 403
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+    return None
+
+
+@app.route("/api/admin/profiling", methods=["GET", "POST"])
+def admin_profiling():
+    """
+    Sampled profiling (admin). GET: current sample rates and saved profiles. POST JSON
+    {request_rate, cycle_rate, path_prefix} (any subset) updates the rates for this process.
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            profiling.configure(data.get("request_rate"), data.get("cycle_rate"), data.get("path_prefix"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "request_rate and cycle_rate must be numbers between 0 and 1"}), 400
+    return jsonify({**profiling.settings(), "profiles": profiling.list_profiles()})
+
+
+@app.route("/api/admin/profiles/<name>", methods=["GET"])
+def admin_profile(name):
+    """Download a saved profile (admin); ?format=top returns its top functions by cumulative time as JSON."""
+    from flask import send_file
+
+    denied = _admin_denied()
+    if denied:
+        return denied
+    if request.args.get("format") == "top":
+        rows = profiling.top_functions(name, limit=request.args.get("limit", 20, type=int))
+        if rows is None:
+            return jsonify({"error": "Profile not found"}), 404
+        return jsonify({"name": name, "functions": rows})
+    path = profiling.profile_path(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path.resolve(), mimetype="application/octet-stream", as_attachment=True, download_name=name)
+
+
+@app.route("/api/nominees/import", methods=["POST"])
+def nominees_import():
+    """
+    Bulk nominee import (admin). Body: NDJSON (one register body per line) or CSV with the same columns
+    (Content-Type text/csv or ?format=csv). Streams back NDJSON: one result per row, then a summary line.
+    """
+    from flask import Response, stream_with_context
+    import nominee_import
+
+    denied = _admin_denied()
+    if denied:
+        return denied
+    fmt = request.args.get("format") or ("csv" if request.mimetype == "text/csv" else "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    rows = nominee_import.read_rows(request.stream, fmt)
+
+    def generate():
+        for result in nominee_import.import_rows(get_db(), rows):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @app.route("/claim/<token>")
 def claim_page(token):
     """Render claim page for nominee (question + answer form; decrypt and sign in browser)."""
     return render_template("claim.html", claim_token=token)
 
 
-@app.route("/api/claim/data/<token>", methods=["GET"])
-def claim_data(token):
-    """Return question, ciphertext, nonce, salt, KDF params, network info, account, and optional platform_sweep_address for bank payout."""
-    from config import HORIZON_URL, NETWORK_PASSPHRASE, PLATFORM_SWEEP_PUBLIC_KEY
-    from key_encrypt import get_kdf_params
-    from horizon_client import get_account
-
-    db = get_db()
-    row = db.execute(
-        "SELECT n.id, n.question, n.ciphertext_b64, n.nonce_b64, n.salt_b64, n.depositor_account_id, n.beneficiary_stellar_address FROM nominee_claims c JOIN nominees n ON c.nominee_id = n.id WHERE c.claim_token = ?",
+def _claim_row(db, token):
+    return db.execute(
+        "SELECT n.id, n.question, n.ciphertext_b64, n.nonce_b64, n.salt_b64, n.kdf_params, n.depositor_account_id, n.beneficiary_stellar_address FROM nominee_claims c JOIN nominees n ON c.nominee_id = n.id WHERE c.claim_token = ?",
         (token.strip(),),
     ).fetchone()
-    if not row:
-        return jsonify({"error": "Invalid or expired claim link"}), 404
 
-    depositor = row["depositor_account_id"]
-    account = get_account(depositor)
+
+def _claim_data_payload(row, account):
+    """JSON body of /api/claim/data for a claim row and the depositor's Horizon account."""
+    from config import HORIZON_URL, NETWORK_PASSPHRASE, PLATFORM_SWEEP_PUBLIC_KEY
+    from key_encrypt import get_kdf_params
 
     out = {
         "question": row["question"],
         "ciphertext_b64": row["ciphertext_b64"],
         "nonce_b64": row["nonce_b64"],
         "salt_b64": row["salt_b64"],
-        "kdf": get_kdf_params(),
+        "kdf": get_kdf_params(row["kdf_params"]),
         "network_passphrase": NETWORK_PASSPHRASE,
         "horizon_url": HORIZON_URL,
-        "depositor_account_id": depositor,
+        "depositor_account_id": row["depositor_account_id"],
         "beneficiary_stellar_address": (row["beneficiary_stellar_address"] or "").strip(),
         "account": account,
     }
     if PLATFORM_SWEEP_PUBLIC_KEY:
         out["platform_sweep_address"] = PLATFORM_SWEEP_PUBLIC_KEY
-    return jsonify(out)
+    return out
+
+
+@app.route("/api/claim/data/<token>", methods=["GET"])
+def claim_data(token):
+    """Return question, ciphertext, nonce, salt, KDF params, network info, account, and optional platform_sweep_address for bank payout."""
+    from horizon_client import get_account
+
+    row = _claim_row(get_db(), token)
+    if not row:
+        return jsonify({"error": "Invalid or expired claim link"}), 404
+    return jsonify(_claim_data_payload(row, get_account(row["depositor_account_id"])))
 
 
 def _friendly_horizon_error(tx_code: str, op_codes: list) -> str:
@@ -397,20 +655,11 @@ def _friendly_horizon_error(tx_code: str, op_codes: list) -> str:
     return " ".join(parts)
 
 
-@app.route("/api/claim/submit", methods=["POST"])
-def claim_submit():
-    """Submit signed classic transaction (sweep or add-signer). Body: signed_envelope_xdr."""
-    from horizon_client import submit_transaction
-
-    data = request.get_json() or {}
-    xdr = (data.get("signed_envelope_xdr") or "").strip()
-    if not xdr:
-        return jsonify({"error": "signed_envelope_xdr required"}), 400
-
-    result = submit_transaction(xdr)
+def _claim_submit_response(result):
+    """(JSON body, status) of /api/claim/submit for a Horizon submit response."""
     tx_hash = result.get("hash") or result.get("id")
     if tx_hash:
-        return jsonify({"hash": tx_hash, "status": "success"})
+        return {"hash": tx_hash, "status": "success"}, 200
 
     # Extract detailed result_codes from Horizon error
     extras = result.get("extras", {})
@@ -422,11 +671,25 @@ def claim_submit():
     friendly = _friendly_horizon_error(tx_code, op_codes)
     detail = result.get("detail") or result.get("title") or result.get("error") or "Submit failed"
 
-    return jsonify({
+    return {
         "error": friendly or detail,
         "result_codes": result_codes,
         "detail": detail,
-    }), 400
+    }, 400
+
+
+@app.route("/api/claim/submit", methods=["POST"])
+def claim_submit():
+    """Submit signed classic transaction (sweep or add-signer). Body: signed_envelope_xdr."""
+    from horizon_client import submit_transaction
+
+    data = request.get_json() or {}
+    xdr = (data.get("signed_envelope_xdr") or "").strip()
+    if not xdr:
+        return jsonify({"error": "signed_envelope_xdr required"}), 400
+
+    body, status = _claim_submit_response(submit_transaction(xdr))
+    return jsonify(body), status
 
 
 @app.route("/api/claim/offramp", methods=["POST"])
@@ -517,46 +780,62 @@ def horizon_account(account_id):
     """
     Horizon API example: get account by public key (raw Horizon response).
     Uses GET {HORIZON_URL}/accounts/{account_id}. No SDK in frontend needed.
+    Served from the account cache; ?fresh=1 reads Horizon, for callers about to build a transaction from
+    its sequence number.
     """
     from horizon_client import get_account
-    acc = get_account(account_id.strip())
+    acc = get_account(account_id.strip(), fresh=request.args.get("fresh") == "1")
     if not acc:
         return jsonify({"error": "Account not found"}), 404
     return jsonify(acc)
 
 
-@app.route("/api/build-add-signer", methods=["POST"])
-def build_add_signer():
-    """
-    Build an unsigned Set Options (add signer) transaction. Uses Horizon REST for
-    account data and Python stellar_sdk only in the backend. Frontend gets
-    transaction_xdr and signs with Freighter, then submits via /api/claim/submit.
-    Body: account_public_key (G...), signer_public_key (secondary key to add).
-    """
-    try:
-        from config import NETWORK_PASSPHRASE
-        from horizon_client import get_account
-        from stellar_sdk import Account, Signer, TransactionBuilder
-    except ImportError as e:
-        return jsonify({"error": f"Missing dependency: {e}"}), 503
+@app.route("/api/horizon/account-cache", methods=["GET"])
+def horizon_account_cache():
+    """Hit / miss / coalesced-miss counters and size of the Horizon account cache."""
+    from horizon_client import account_cache
+    return jsonify(account_cache.stats())
 
-    data = request.get_json() or {}
+
+@app.route("/api/horizon/rate-limit", methods=["GET"])
+def horizon_rate_limit():
+    """Adaptive lookup concurrency: current limit, in-flight lookups, last rate-limit headers, 429s and deferrals."""
+    from horizon_ratelimit import limiter
+    return jsonify(limiter.state())
+
+
+@app.route("/api/endpoints", methods=["GET"])
+def upstream_endpoints():
+    """Per-endpoint latency EWMA, health, hedge delay and hedge wins for the Horizon and Soroban RPC endpoints."""
+    from horizon_client import endpoint_pool
+    from soroban_client import rpc_endpoints
+    return jsonify({"horizon": endpoint_pool.state(), "soroban": rpc_endpoints.state()})
+
+
+def _add_signer_args(data):
+    """Validate a build-add-signer body. Returns ((account_public_key, signer_public_key), None) or (None, error)."""
     account_public_key = (data.get("account_public_key") or "").strip()
     signer_public_key = (data.get("signer_public_key") or "").strip()
     if not account_public_key or not signer_public_key:
-        return jsonify({"error": "account_public_key and signer_public_key required"}), 400
+        return None, "account_public_key and signer_public_key required"
     if len(account_public_key) != 56 or not account_public_key.startswith("G"):
-        return jsonify({"error": "account_public_key must be a Stellar public key (G..., 56 chars)"}), 400
+        return None, "account_public_key must be a Stellar public key (G..., 56 chars)"
     if len(signer_public_key) != 56 or not signer_public_key.startswith("G"):
-        return jsonify({"error": "signer_public_key must be a Stellar public key (G..., 56 chars)"}), 400
+        return None, "signer_public_key must be a Stellar public key (G..., 56 chars)"
+    return (account_public_key, signer_public_key), None
+
+
+def _add_signer_response(account_public_key, signer_public_key, acc):
+    """(JSON body, status) of /api/build-add-signer given the account loaded from Horizon (or None)."""
+    from config import NETWORK_PASSPHRASE
+    from stellar_sdk import Account, Signer, TransactionBuilder
 
-    acc = get_account(account_public_key)
     if not acc:
-        return jsonify({"error": "Account not found on network (check Horizon URL and that account exists)"}), 404
+        return {"error": "Account not found on network (check Horizon URL and that account exists)"}, 404
     try:
         sequence = int(acc["sequence"])
     except (TypeError, ValueError, KeyError):
-        return jsonify({"error": "Invalid account sequence from Horizon"}), 500
+        return {"error": "Invalid account sequence from Horizon"}, 500
 
     try:
         source = Account(account_public_key, sequence)
@@ -574,10 +853,61 @@ def build_add_signer():
         if hasattr(envelope, "to_transaction_envelope_v1"):
             envelope = envelope.to_transaction_envelope_v1()
         xdr_b64 = _envelope_to_xdr_base64(envelope)
-        return jsonify({"transaction_xdr": xdr_b64})
+        return {"transaction_xdr": xdr_b64}, 200
     except Exception as e:
         logger.exception("build_add_signer failed")
-        return jsonify({"error": f"Build failed: {e}", "where": "build_or_serialize"}), 500
+        return {"error": f"Build failed: {e}", "where": "build_or_serialize"}, 500
+
+
+@app.route("/api/build-add-signer", methods=["POST"])
+def build_add_signer():
+    """
+    Build an unsigned Set Options (add signer) transaction. Uses Horizon REST for
+    account data and Python stellar_sdk only in the backend. Frontend gets
+    transaction_xdr and signs with Freighter, then submits via /api/claim/submit.
+    Body: account_public_key (G...), signer_public_key (secondary key to add).
+    """
+    try:
+        from horizon_client import get_account
+        import stellar_sdk  # noqa: F401
+    except ImportError as e:
+        return jsonify({"error": f"Missing dependency: {e}"}), 503
+
+    args, err = _add_signer_args(request.get_json() or {})
+    if err:
+        return jsonify({"error": err}), 400
+    body, status = _add_signer_response(*args, get_account(args[0], fresh=True))
+    return jsonify(body), status
+
+
+def _mirrored_contract_status(contract_id, vault_id=0):
+    """
+    Contract status from the vaults mirror, or None (caller simulates over RPC) if the contract is not
+    mirrored or its event lane has not been read within SOROBAN_EVENTS_MAX_LAG_SECONDS.
+    """
+    from config import SOROBAN_EVENTS_MAX_LAG_SECONDS
+
+    try:
+        from soroban_events import mirror_ledger
+    except ImportError:
+        return None
+    db = get_db()
+    ledger = mirror_ledger(db, contract_id, max_age=SOROBAN_EVENTS_MAX_LAG_SECONDS)
+    if ledger is None:
+        return None
+    row = db.execute(
+        "SELECT beneficiary, status, deadline FROM vaults WHERE contract_id = ? AND vault_id = ?",
+        (contract_id, vault_id),
+    ).fetchone()
+    active = row is not None and row["status"] == "active"
+    return {
+        "can_claim": active and ledger >= row["deadline"],
+        "beneficiary_address": row["beneficiary"] if active else None,
+        "contract_id": contract_id,
+        "vault_id": vault_id,
+        "ledger": ledger,
+        "source": "mirror",
+    }
 
 
 @app.route("/api/contract/status", methods=["GET"])
@@ -585,13 +915,25 @@ def contract_status():
     """
     Read contract state from chain (can_claim, beneficiary).
     Requires CONTRACT_ID and SOROBAN_RPC_URL. Returns 503 if not configured or RPC fails.
+    With SOROBAN_EVENTS_ENABLED=1 the answer comes from the event-fed vaults mirror (no RPC call) once
+    the ingester has run. Optional query params: contract_id (CONTRACT_ID, MULTI_VAULT_CONTRACT_ID or a
+    registered vault contract), vault_id (multi-vault contract).
     """
+    contract_id = (request.args.get("contract_id") or "").strip() or CONTRACT_ID
+    vault_id = request.args.get("vault_id", type=int, default=0)
+    if contract_id and not _known_contract(get_db(), contract_id):
+        return jsonify({"error": "Unknown contract_id"}), 400
+    if SOROBAN_EVENTS_ENABLED and contract_id:
+        status = _mirrored_contract_status(contract_id, vault_id)
+        if status is not None:
+            return jsonify(status)
+
     try:
         from soroban_client import get_contract_status, get_network_info
     except ImportError:
         return jsonify({"error": "Soroban client not available"}), 503
 
-    status = get_contract_status()
+    status = get_contract_status(contract_id or None, vault_id)
     if status is None:
         info = get_network_info()
         return (
@@ -688,97 +1030,367 @@ def get_beneficiary(stellar_address):
     )
 
 
-def _run_check_nominees():
+def _lookup_last_activity(account_ids):
     """
-    Core logic: check Horizon for nominee inactivity, create claim tokens, send SMS.
-    Must be called within an app context (get_db() uses g). Returns (message, sms_sent).
+    Fetch last activity for each account from Horizon. Requests in flight follow the adaptive limit of
+    horizon_ratelimit.limiter (at most HORIZON_LOOKUP_CONCURRENCY). Accounts Horizon rate-limited, or that got
+    no slot within HORIZON_RATELIMIT_MAX_WAIT_SECONDS, are left out of the results (stats "lookups_deferred").
+    Returns ({account_id: created_at or None}, stats).
     """
-    from datetime import datetime, timezone, timedelta
-    from horizon_client import get_last_activity
-    from sms_client import send_nominee_claim_sms
+    from concurrent.futures import ThreadPoolExecutor
+    from config import HORIZON_LOOKUP_CONCURRENCY, HORIZON_RATELIMIT_MAX_WAIT_SECONDS
+    import horizon_client
+    from horizon_ratelimit import limiter
 
-    db = get_db()
-    nominees = db.execute(
-        "SELECT id, depositor_account_id, question, beneficiary_phone, inactivity_days FROM nominees"
-    ).fetchall()
-    if not nominees:
-        return "No nominees registered.", 0
+    deferred = object()
+
+    def lookup(account_id):
+        if not limiter.acquire(HORIZON_RATELIMIT_MAX_WAIT_SECONDS):
+            return deferred
+        try:
+            return horizon_client.get_last_activity(account_id)
+        except horizon_client.RateLimited:
+            limiter.defer()
+            return deferred
+        finally:
+            limiter.release()
+
+    account_ids = list(dict.fromkeys(account_ids))
+    started = time.monotonic()
+    if HORIZON_LOOKUP_CONCURRENCY <= 1 or len(account_ids) <= 1:
+        results = {a: lookup(a) for a in account_ids}
+    else:
+        workers = min(HORIZON_LOOKUP_CONCURRENCY, len(account_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="horizon-lookup") as pool:
+            results = dict(zip(account_ids, pool.map(lookup, account_ids)))
+    elapsed = time.monotonic() - started
+    found = {a: r for a, r in results.items() if r is not deferred}
+    stats = {
+        "lookups": len(account_ids),
+        "lookup_seconds": round(elapsed, 3),
+        "lookups_per_sec": round(len(account_ids) / elapsed, 1) if elapsed > 0 else None,
+        "lookups_deferred": len(results) - len(found),
+    }
+    return found, stats
+
+
+def _parse_horizon_time(value):
+    """Parse a Horizon created_at (ISO, maybe with Z) as an aware UTC datetime, or None."""
+    from datetime import datetime, timezone
+
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except Exception:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _inactivity_threshold(inactivity_days):
+    """Inactivity period for a nominee; inactivity_days=0 is the 2-minute demo mode."""
+    from datetime import timedelta
+
+    return timedelta(minutes=2) if inactivity_days == 0 else timedelta(days=inactivity_days)
+
+
+def _is_inactive(last, inactivity_days, now):
+    """
+    True if the depositor is past the nominee's inactivity threshold.
+    In the 2-minute demo mode (inactivity_days=0), no activity at all also counts as inactive.
+    """
+    last_dt = _parse_horizon_time(last)
+    if last_dt is None:
+        return inactivity_days == 0
+    return last_dt <= now - _inactivity_threshold(inactivity_days)
+
+
+def _inactivity_days(nominee):
+    """The nominee's inactivity_days, 30 when unset or malformed."""
+    try:
+        return int(nominee["inactivity_days"]) if nominee["inactivity_days"] is not None else 30
+    except (TypeError, ValueError):
+        return 30
+
+
+def _next_check_at(last, inactivity_days, now):
+    """
+    When an active nominee can next be due: last activity + threshold (newer activity only pushes it later).
+    With no known activity, re-check after NOMINEE_RECHECK_MINUTES (capped at the threshold).
+    """
+    from datetime import timedelta
+    from config import NOMINEE_RECHECK_MINUTES
+
+    threshold = _inactivity_threshold(inactivity_days)
+    last_dt = _parse_horizon_time(last)
+    if last_dt is None:
+        due = now + min(threshold, timedelta(minutes=NOMINEE_RECHECK_MINUTES))
+    else:
+        due = max(last_dt + threshold, now)
+    return db_time(due)
+
+
+def _lease_due_nominees(db, owner, cutoff, batch_size):
+    """
+    Atomically lease up to batch_size due nominees without a claim to this agent instance, oldest
+    next_check_at first. Rows leased by another live instance are skipped; expired leases are taken over.
+    BEGIN IMMEDIATE takes SQLite's write lock up front, so concurrent agents always get disjoint batches.
+    """
+    from datetime import datetime, timedelta, timezone
+    from config import NOMINEE_LEASE_SECONDS
 
     now = datetime.now(timezone.utc)
-    sent = 0
-    for n in nominees:
-        last = get_last_activity(n["depositor_account_id"])
+    if db.in_transaction:
+        db.commit()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        rows = db.execute(
+            """
+            UPDATE nominees SET lease_owner = ?, lease_expires_at = ?
+            WHERE id IN (
+                SELECT n.id FROM nominees n LEFT JOIN nominee_claims c ON c.nominee_id = n.id
+                WHERE n.next_check_at <= ? AND c.id IS NULL
+                  AND (n.lease_expires_at IS NULL OR n.lease_expires_at < ?)
+                ORDER BY n.next_check_at, n.id
+                LIMIT ?
+            )
+            RETURNING id, depositor_account_id, question, beneficiary_phone, inactivity_days,
+                      last_activity_at, next_check_at
+            """,
+            (owner, db_time(now + timedelta(seconds=NOMINEE_LEASE_SECONDS)), cutoff, db_time(now), batch_size),
+        ).fetchall()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return sorted(rows, key=lambda r: (r["next_check_at"], r["id"]))
+
+
+class _LeaseHeartbeat:
+    """Extend this instance's leases every NOMINEE_LEASE_SECONDS / 3 while a check cycle runs."""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.stop = threading.Event()
+        self.thread = None
+
+    def _run(self, db_path):
+        from datetime import datetime, timedelta, timezone
+        from config import NOMINEE_LEASE_SECONDS
+        from db import connect
+
+        # A private connection, closed when the cycle's heartbeat stops.
+        db = connect(db_path)
         try:
-            inactivity_days = int(n["inactivity_days"]) if n["inactivity_days"] is not None else 30
-        except (TypeError, ValueError):
-            inactivity_days = 30
-        if inactivity_days == 0:
-            threshold = now - timedelta(minutes=2)
-            last_dt = None
-            if last:
+            while not self.stop.wait(max(1, NOMINEE_LEASE_SECONDS / 3)):
+                expires = db_time(datetime.now(timezone.utc) + timedelta(seconds=NOMINEE_LEASE_SECONDS))
                 try:
-                    last_dt = datetime.fromisoformat(last.replace("Z", "+00:00"))
-                    if last_dt.tzinfo is None:
-                        last_dt = last_dt.replace(tzinfo=timezone.utc)
-                except Exception:
-                    last_dt = None
-            if last_dt is not None and last_dt > threshold:
-                continue
-        else:
-            if not last:
-                continue
-            try:
-                last_dt = datetime.fromisoformat(last.replace("Z", "+00:00"))
-            except Exception:
-                continue
-            if last_dt.tzinfo is None:
-                last_dt = last_dt.replace(tzinfo=timezone.utc)
-            threshold = now - timedelta(days=inactivity_days)
-            if last_dt > threshold:
+                    with db:
+                        db.execute("UPDATE nominees SET lease_expires_at = ? WHERE lease_owner = ?", (expires, self.owner))
+                except sqlite3.Error as e:
+                    logger.warning("Lease heartbeat failed: %s", e)
+        finally:
+            db.close()
+
+    def __enter__(self):
+        self.thread = threading.Thread(
+            target=self._run, args=(app.config["DATABASE"],), name="lease-heartbeat", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join(timeout=5)
+
+
+def _check_nominee_chunk(db, nominees, owner):
+    """
+    Look up activity for one leased chunk, then apply every reschedule, retirement and claim-token insert
+    for the chunk in a single transaction, releasing the leases; each claim's SMS is queued in sms_outbox
+    in that same transaction. Rows whose lease was lost to another instance, or that already got a claim,
+    are left alone. Rows whose lookup was deferred (Horizon rate limit) are rescheduled for when the limit
+    resets, without judging inactivity. Returns (claims issued, lookup_stats plus "skipped": rows left alone,
+    and "deferred": rows rescheduled that way).
+    """
+    from datetime import datetime, timezone
+    import sms_outbox
+    from horizon_ratelimit import limiter
+
+    now = datetime.now(timezone.utc)
+    # With stream ingestion, last_activity_at is kept current by horizon_stream, so a row it shows as active
+    # needs no lookup. The stored value alone never issues a claim: the stream may be down, lagging or have
+    # started after the value was seeded, so rows that look inactive are confirmed with a direct lookup.
+    to_lookup = [
+        n for n in nominees
+        if not (HORIZON_STREAM_ENABLED and n["last_activity_at"]
+                and not _is_inactive(n["last_activity_at"], _inactivity_days(n), now))
+    ]
+    polled, stats = _lookup_last_activity(n["depositor_account_id"] for n in to_lookup)
+    deferred = {n["depositor_account_id"] for n in to_lookup} - polled.keys()
+    last_activity = dict(polled)
+    for n in nominees:
+        stored, account = n["last_activity_at"], n["depositor_account_id"]
+        if stored and (last_activity.get(account) or "") < stored:
+            last_activity[account] = stored
+
+    # At least a second out, so the row is not leased again in this cycle (its cutoff is the cycle start).
+    retry_at = db_time(datetime.fromtimestamp(max(limiter.retry_at(), now.timestamp() + 1), timezone.utc)) if deferred else None
+    ids = [n["id"] for n in nominees]
+    marks = ",".join("?" * len(ids))
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        owned = {r[0] for r in db.execute(f"SELECT id FROM nominees WHERE lease_owner = ? AND id IN ({marks})", (owner, *ids))}
+        claimed = {r[0] for r in db.execute(f"SELECT nominee_id FROM nominee_claims WHERE nominee_id IN ({marks})", ids)}
+        reschedule, retire, claims = [], [], []
+        skipped = deferred_rows = 0
+        for n in nominees:
+            if n["id"] not in owned:
+                skipped += 1
                 continue
-        existing = db.execute(
-            "SELECT 1 FROM nominee_claims WHERE nominee_id = ?", (n["id"],)
-        ).fetchone()
-        if existing:
-            continue
-        token = secrets.token_urlsafe(24)
-        db.execute(
+            inactivity_days = _inactivity_days(n)
+            last = last_activity.get(n["depositor_account_id"])
+            if n["id"] in claimed:
+                skipped += 1
+                retire.append((n["id"], owner))
+            elif n["depositor_account_id"] in deferred:
+                deferred_rows += 1
+                reschedule.append((retry_at, n["id"], owner))
+            elif _is_inactive(last, inactivity_days, now):
+                retire.append((n["id"], owner))
+                claims.append((secrets.token_urlsafe(24), n))
+            else:
+                reschedule.append((_next_check_at(last, inactivity_days, now), n["id"], owner))
+
+        seeded = [(ts, account, ts) for account, ts in polled.items() if ts]
+        db.executemany(
+            "UPDATE nominees SET last_activity_at = ? WHERE depositor_account_id = ? AND (last_activity_at IS NULL OR last_activity_at < ?)",
+            seeded,
+        )
+        db.executemany(
+            "UPDATE nominees SET next_check_at = ?, lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+            reschedule,
+        )
+        db.executemany(
+            "UPDATE nominees SET next_check_at = NULL, lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+            retire,
+        )
+        db.executemany(
             "INSERT INTO nominee_claims (claim_token, nominee_id) VALUES (?, ?)",
-            (token, n["id"]),
+            [(token, n["id"]) for token, n in claims],
         )
+        sms_outbox.enqueue(db, [(n["id"], token, n["beneficiary_phone"], n["question"]) for token, n in claims])
         db.commit()
-        if send_nominee_claim_sms(n["beneficiary_phone"], token, n["question"]):
-            sent += 1
+    except Exception:
+        db.rollback()
+        raise
+    stats["skipped"] = skipped
+    stats["deferred"] = deferred_rows
+    return claims, stats
+
+
+def _run_check_nominees():
+    """
+    Core logic: check Horizon for nominee inactivity, create claim tokens, send SMS.
+    Due, unclaimed nominees are leased to this agent instance (AGENT_INSTANCE_ID) in batches of
+    NOMINEE_CHECK_CHUNK_SIZE, so several agent processes sharing the DB split the work without
+    double-issuing claims. Each batch's Horizon lookups run concurrently and its DB writes (claims plus
+    their sms_outbox rows) are committed together. With SMS_DISPATCH_MODE=inline the batch's SMS are then
+    sent right away; otherwise the outbox dispatcher sends them.
+    Must be called within an app context (get_db() uses g). Returns (message, sms_sent, stats).
+    """
+    from datetime import datetime, timezone
+    import sms_outbox
+    from config import AGENT_INSTANCE_ID, NOMINEE_CHECK_CHUNK_SIZE, SMS_DISPATCH_MODE
 
-    return f"Checked {len(nominees)} nominees.", sent
+    db = get_db()
+    cutoff = db_time(datetime.now(timezone.utc))
+    checked = skipped = sent = queued = lookups = deferred = 0
+    lookup_seconds = 0.0
+    with _LeaseHeartbeat(AGENT_INSTANCE_ID):
+        while True:
+            chunk = _lease_due_nominees(db, AGENT_INSTANCE_ID, cutoff, NOMINEE_CHECK_CHUNK_SIZE)
+            if not chunk:
+                break
+            claims, stats = _check_nominee_chunk(db, chunk, AGENT_INSTANCE_ID)
+            checked += len(chunk)
+            skipped += stats["skipped"]
+            queued += len(claims)
+            lookups += stats["lookups"]
+            deferred += stats["deferred"]
+            lookup_seconds += stats["lookup_seconds"]
+            if SMS_DISPATCH_MODE == "inline" and claims:
+                sent += sms_outbox.dispatch(db, limit=len(claims), claim_tokens=[token for token, _ in claims])
+
+    stats = {
+        "lookups": lookups,
+        "lookup_seconds": round(lookup_seconds, 3),
+        "lookups_per_sec": round(lookups / lookup_seconds, 1) if lookup_seconds > 0 else None,
+        "sms_queued": queued,
+        "nominees_checked": checked - skipped - deferred,
+        "nominees_skipped": skipped,
+        "nominees_deferred": deferred,
+    }
+    if not checked:
+        return "No nominees due for a check.", 0, stats
+    return f"Checked {checked} due nominees.", sent, stats
 
 
 _nominee_check_lock = threading.Lock()
 
 
-def _inactivity_scheduler_loop():
+def _inactivity_scheduler_loop(stop_event=None):
     """Background loop: every N minutes run nominee check. Runs inside app context."""
     interval_sec = INACTIVITY_CHECK_INTERVAL_MINUTES * 60
     if interval_sec <= 0:
         return
+    stop_event = stop_event or threading.Event()
     logger.info("Inactivity agent started: checking every %s minutes", INACTIVITY_CHECK_INTERVAL_MINUTES)
-    while True:
-        time.sleep(interval_sec)
+    while not stop_event.wait(interval_sec):
         if not _nominee_check_lock.acquire(blocking=False):
+            metrics.SCHEDULER_CYCLES.inc("overlap")
             continue
+        started = time.monotonic()
+        profile = profiling.maybe_start("cycle", "inactivity")
         try:
             with app.app_context():
-                msg, sms_sent = _run_check_nominees()
-                logger.info("Inactivity check: %s (SMS sent: %s)", msg, sms_sent)
+                msg, sms_sent, stats = _run_check_nominees()
+                logger.info(
+                    "Inactivity check: %s (SMS sent: %s, lookups: %s in %ss, %s/s)",
+                    msg, sms_sent, stats["lookups"], stats["lookup_seconds"], stats["lookups_per_sec"],
+                )
+            metrics.SCHEDULER_CYCLES.inc("ok")
+            metrics.SCHEDULER_NOMINEES.inc("checked", amount=stats["nominees_checked"])
+            metrics.SCHEDULER_NOMINEES.inc("skipped", amount=stats["nominees_skipped"])
+            metrics.SCHEDULER_NOMINEES.inc("deferred", amount=stats["nominees_deferred"])
         except Exception as e:
+            metrics.SCHEDULER_CYCLES.inc("error")
             logger.exception("Inactivity check failed: %s", e)
         finally:
+            profiling.stop(profile)
+            metrics.SCHEDULER_CYCLE_SECONDS.observe(time.monotonic() - started)
+            metrics.SCHEDULER_LAST_CYCLE.set(time.time())
             _nominee_check_lock.release()
 
 
-if INACTIVITY_CHECK_INTERVAL_MINUTES > 0:
-    _scheduler_thread = threading.Thread(target=_inactivity_scheduler_loop, daemon=True)
-    _scheduler_thread.start()
+def _agent_check_loop(stop_event=None):
+    """Background loop: every AGENT_CHECK_INTERVAL_MINUTES run the contract claim check (standalone agent only)."""
+    from config import AGENT_CHECK_INTERVAL_MINUTES, AGENT_VAULT_MODE
+
+    interval_sec = AGENT_CHECK_INTERVAL_MINUTES * 60
+    if interval_sec <= 0 or not (CONTRACT_ID or AGENT_VAULT_MODE in ("ledger", "mirror")):
+        return
+    stop_event = stop_event or threading.Event()
+    logger.info("Contract agent started: checking every %s minutes", AGENT_CHECK_INTERVAL_MINUTES)
+    while not stop_event.wait(interval_sec):
+        try:
+            with app.app_context():
+                result = _run_agent_check()
+                logger.info("Contract check: %s", result.get("message"))
+        except Exception as e:
+            logger.exception("Contract check failed: %s", e)
 
 
 @app.route("/api/agent/check-nominees", methods=["GET", "POST"])
@@ -787,35 +1399,15 @@ def agent_check_nominees():
     Check Horizon for nominee inactivity. If depositor has had no activity for inactivity_days,
     create a claim token and send SMS to beneficiary. Also run by the in-backend scheduler if enabled.
     """
-    msg, sent = _run_check_nominees()
-    return jsonify({"message": msg, "sms_sent": sent}), 200
+    msg, sent, stats = _run_check_nominees()
+    return jsonify({"message": msg, "sms_sent": sent, **stats}), 200
 
 
-@app.route("/api/agent/check", methods=["GET", "POST"])
-def agent_check():
+def _mock_claim_and_offramp(db, contract_id, beneficiary_address, vault_id=None):
     """
-    Agent step 1: Check chain for claimable vault; if so, run mock claim + off-ramp.
-    Call this from Cloud Scheduler (e.g. every hour). Uses CONTRACT_ID from env.
+    Mock claim + Onmeta off-ramp for one claimable vault (vault_id for the multi-vault contract);
+    records an agent_runs row. Returns (bank_info, onmeta_order).
     """
-    try:
-        from soroban_client import get_contract_status
-        from config import CONTRACT_ID
-    except ImportError:
-        return jsonify({"error": "Soroban client not available"}), 503
-
-    if not CONTRACT_ID:
-        return jsonify({"message": "No CONTRACT_ID set; nothing to check.", "claim_mock": "skipped"}), 200
-
-    status = get_contract_status()
-    if not status or not status.get("can_claim"):
-        return jsonify({
-            "message": "Contract not claimable (no deposit or timeout not reached).",
-            "can_claim": status.get("can_claim") if status else None,
-            "claim_mock": "skipped",
-        }), 200
-
-    beneficiary_address = (status.get("beneficiary_address") or "").strip()
-    db = get_db()
     bank_info = None
     onmeta_order = None
     if beneficiary_address:
@@ -839,16 +1431,171 @@ def agent_check():
     try:
         db.execute(
             """
-            INSERT INTO agent_runs (contract_id, beneficiary_address, amount_mocked, offramp_mock_status)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO agent_runs (contract_id, vault_id, beneficiary_address, amount_mocked, offramp_mock_status)
+            VALUES (?, ?, ?, ?, ?)
             """,
-            (CONTRACT_ID, beneficiary_address or None, "0", "mocked_success"),
+            (contract_id, vault_id, beneficiary_address or None, "0", "mocked_success"),
         )
         db.commit()
     except sqlite3.Error:
         pass
+    return bank_info, onmeta_order
 
-    return jsonify({
+
+def _vault_contract_ids(db):
+    """Contracts the agent watches: the vault_contracts registry plus CONTRACT_ID and VAULT_CONTRACT_IDS from env."""
+    from config import VAULT_CONTRACT_IDS
+
+    ids = [r["contract_id"] for r in db.execute("SELECT contract_id FROM vault_contracts ORDER BY contract_id")]
+    return list(dict.fromkeys(([CONTRACT_ID] if CONTRACT_ID else []) + VAULT_CONTRACT_IDS + ids))
+
+
+def _known_contract(db, contract_id):
+    """True for CONTRACT_ID, MULTI_VAULT_CONTRACT_ID, VAULT_CONTRACT_IDS and contracts in the vault_contracts registry."""
+    from config import VAULT_CONTRACT_IDS
+
+    if contract_id in (CONTRACT_ID, MULTI_VAULT_CONTRACT_ID) or contract_id in VAULT_CONTRACT_IDS:
+        return True
+    return db.execute("SELECT 1 FROM vault_contracts WHERE contract_id = ?", (contract_id,)).fetchone() is not None
+
+
+def _run_vault_check():
+    """
+    Ledger mode: read every registered vault (and every vault of MULTI_VAULT_CONTRACT_ID) with batched
+    getLedgerEntries, evaluate can_claim locally, and run the mock claim + off-ramp for each claimable one.
+    Multi-vault claims are grouped into claim_many batches of CLAIM_MANY_BATCH IDs (one transaction each).
+    Must be called within an app context.
+    """
+    from config import CLAIM_MANY_BATCH, MULTI_VAULT_CONTRACT_ID
+    from soroban_client import read_multi_vaults, read_vaults
+
+    db = get_db()
+    contract_ids = _vault_contract_ids(db)
+    if not contract_ids and not MULTI_VAULT_CONTRACT_ID:
+        return {"message": "No vault contracts registered; nothing to check.", "checked": 0, "claimable": 0, "rpc_calls": 0}
+
+    vaults, stats = read_vaults(contract_ids) if contract_ids else ({}, {"rpc_calls": 0, "ledger": 0, "seconds": 0.0})
+    checked = len(contract_ids)
+    claim_many_batches = []
+    archived = 0
+    claimed = []
+    if MULTI_VAULT_CONTRACT_ID:
+        multi, multi_stats = read_multi_vaults(MULTI_VAULT_CONTRACT_ID)
+        checked += len(multi)
+        archived = multi_stats["archived"]
+        stats = {
+            "rpc_calls": stats["rpc_calls"] + multi_stats["rpc_calls"],
+            "ledger": max(stats["ledger"], multi_stats["ledger"]),
+            "seconds": round(stats["seconds"] + multi_stats["seconds"], 3),
+        }
+        due = sorted(vault_id for vault_id, vault in multi.items() if vault["can_claim"])
+        # Real claims would submit claim_many(batch) per batch as the agent (needs AGENT_SECRET_KEY); mocked here.
+        claim_many_batches = [due[i:i + CLAIM_MANY_BATCH] for i in range(0, len(due), CLAIM_MANY_BATCH)]
+        for vault_id in due:
+            beneficiary_address = (multi[vault_id].get("beneficiary_address") or "").strip()
+            bank_info, onmeta_order = _mock_claim_and_offramp(db, MULTI_VAULT_CONTRACT_ID, beneficiary_address, vault_id)
+            claimed.append({
+                "contract_id": MULTI_VAULT_CONTRACT_ID,
+                "vault_id": vault_id,
+                "beneficiary_address": beneficiary_address or None,
+                "bank_info_stored": bank_info is not None,
+                "onmeta_order": onmeta_order,
+                "restore_needed": multi[vault_id]["archived"],
+            })
+    for contract_id, vault in vaults.items():
+        if not vault or not vault["can_claim"]:
+            continue
+        beneficiary_address = (vault.get("beneficiary_address") or "").strip()
+        bank_info, onmeta_order = _mock_claim_and_offramp(db, contract_id, beneficiary_address)
+        claimed.append({
+            "contract_id": contract_id,
+            "beneficiary_address": beneficiary_address or None,
+            "bank_info_stored": bank_info is not None,
+            "onmeta_order": onmeta_order,
+        })
+    return {
+        "message": f"Checked {checked} vault(s) at ledger {stats['ledger']}; {len(claimed)} claimable (mock claim + off-ramp).",
+        "checked": checked,
+        "missing": sum(1 for v in vaults.values() if v is None),
+        "archived": archived,
+        "claimable": len(claimed),
+        "rpc_calls": stats["rpc_calls"],
+        "ledger": stats["ledger"],
+        "read_seconds": stats["seconds"],
+        "claim_many_batches": claim_many_batches,
+        "claims": claimed,
+    }
+
+
+def _run_mirror_check():
+    """
+    Mirror mode: due vaults come from the event-fed vaults table (status active, deadline reached at the
+    ledger the contract's event lane was read through), so the check itself makes no RPC call.
+    Must be called within an app context.
+    """
+    from config import CLAIM_MANY_BATCH, MULTI_VAULT_CONTRACT_ID
+    from soroban_events import due_vaults, mirror_ledger
+
+    db = get_db()
+    ledger = mirror_ledger(db)
+    if ledger is None:
+        return {"message": "Vault mirror not populated yet (enable SOROBAN_EVENTS_ENABLED).", "checked": 0, "claimable": 0, "rpc_calls": 0}
+
+    due = due_vaults(db)
+    claimed = []
+    for row in due:
+        beneficiary_address = (row["beneficiary"] or "").strip()
+        vault_id = row["vault_id"] if row["contract_id"] == MULTI_VAULT_CONTRACT_ID else None
+        bank_info, onmeta_order = _mock_claim_and_offramp(db, row["contract_id"], beneficiary_address, vault_id)
+        claimed.append({
+            "contract_id": row["contract_id"],
+            "vault_id": vault_id,
+            "beneficiary_address": beneficiary_address or None,
+            "bank_info_stored": bank_info is not None,
+            "onmeta_order": onmeta_order,
+        })
+    multi_due = [c["vault_id"] for c in claimed if c["vault_id"] is not None]
+    active = db.execute("SELECT COUNT(*) FROM vaults WHERE status = 'active'").fetchone()[0]
+    return {
+        "message": f"Checked {active} mirrored vault(s) at ledger {ledger}; {len(claimed)} claimable (mock claim + off-ramp).",
+        "checked": active,
+        "claimable": len(claimed),
+        "rpc_calls": 0,
+        "ledger": ledger,
+        "claim_many_batches": [multi_due[i:i + CLAIM_MANY_BATCH] for i in range(0, len(multi_due), CLAIM_MANY_BATCH)],
+        "claims": claimed,
+    }
+
+
+def _run_agent_check():
+    """
+    Check chain for a claimable vault; if so, run mock claim + off-ramp. Returns the result payload.
+    With AGENT_VAULT_MODE=ledger every registered vault is checked (see _run_vault_check); with
+    AGENT_VAULT_MODE=mirror the event-fed vaults table is used (see _run_mirror_check).
+    Must be called within an app context. Raises ImportError if the Soroban client is unavailable.
+    """
+    import config
+    from soroban_client import get_contract_status
+
+    if config.AGENT_VAULT_MODE == "ledger":
+        return _run_vault_check()
+    if config.AGENT_VAULT_MODE == "mirror":
+        return _run_mirror_check()
+
+    if not CONTRACT_ID:
+        return {"message": "No CONTRACT_ID set; nothing to check.", "claim_mock": "skipped"}
+
+    status = get_contract_status()
+    if not status or not status.get("can_claim"):
+        return {
+            "message": "Contract not claimable (no deposit or timeout not reached).",
+            "can_claim": status.get("can_claim") if status else None,
+            "claim_mock": "skipped",
+        }
+
+    beneficiary_address = (status.get("beneficiary_address") or "").strip()
+    bank_info, onmeta_order = _mock_claim_and_offramp(get_db(), CONTRACT_ID, beneficiary_address)
+    return {
         "message": "Claimable: ran mock claim + off-ramp (real claim would need AGENT_SECRET_KEY).",
         "can_claim": True,
         "beneficiary_address": beneficiary_address or None,
@@ -856,7 +1603,56 @@ def agent_check():
         "claim_mock": "success",
         "offramp_mock": "Onmeta Off-Ramp API mocked – fiat wire simulated",
         "onmeta_order": onmeta_order,
-    }), 200
+    }
+
+
+@app.route("/api/agent/check", methods=["GET", "POST"])
+def agent_check():
+    """
+    Agent step 1: Check chain for claimable vault; if so, run mock claim + off-ramp.
+    Call this from Cloud Scheduler (e.g. every hour), or run the standalone agent (python -m agent).
+    Uses CONTRACT_ID from env, or every registered vault when AGENT_VAULT_MODE=ledger.
+    """
+    try:
+        return jsonify(_run_agent_check()), 200
+    except ImportError:
+        return jsonify({"error": "Soroban client not available"}), 503
+
+
+@app.route("/api/vaults", methods=["GET"])
+def vaults_list():
+    """List the vault contracts the agent watches (registry plus CONTRACT_ID / VAULT_CONTRACT_IDS)."""
+    db = get_db()
+    labels = {r["contract_id"]: r["label"] for r in db.execute("SELECT contract_id, label FROM vault_contracts")}
+    return jsonify([{"contract_id": c, "label": labels.get(c)} for c in _vault_contract_ids(db)])
+
+
+@app.route("/api/vaults", methods=["POST"])
+def vaults_register():
+    """
+    Register vault contracts for the agent to watch (admin).
+    Body: contract_id (+ optional label), or contract_ids: [..] to register many at once.
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    data = request.get_json() or {}
+    contract_ids = data.get("contract_ids") or [data.get("contract_id")]
+    contract_ids = [c.strip() for c in contract_ids if isinstance(c, str) and c.strip()]
+    if not contract_ids:
+        return jsonify({"error": "contract_id or contract_ids required"}), 400
+    bad = [c for c in contract_ids if not (c.startswith("C") and len(c) == 56)]
+    if bad:
+        return jsonify({"error": "Invalid contract id(s)", "invalid": bad[:20]}), 400
+    label = (data.get("label") or "").strip() or None
+    db = get_db()
+    with db:
+        db.executemany(
+            "INSERT INTO vault_contracts (contract_id, label) VALUES (?, ?) "
+            "ON CONFLICT(contract_id) DO UPDATE SET label = COALESCE(excluded.label, label)",
+            [(c, label) for c in contract_ids],
+        )
+    return jsonify({"registered": len(contract_ids)}), 201
 
 
 @app.route("/api/agent/run", methods=["POST"])
@@ -936,7 +1732,7 @@ def agent_runs_list():
     """List recent mock agent runs."""
     db = get_db()
     rows = db.execute(
-        "SELECT contract_id, beneficiary_address, amount_mocked, offramp_mock_status, created_at FROM agent_runs ORDER BY id DESC LIMIT 20"
+        "SELECT contract_id, vault_id, beneficiary_address, amount_mocked, offramp_mock_status, created_at FROM agent_runs ORDER BY id DESC LIMIT 20"
     ).fetchall()
     return jsonify([dict(r) for r in rows])
 
@@ -946,6 +1742,64 @@ with app.app_context():
     init_db()
 
 
+def start_background_workers(stop_event=None, contract_check=False, db_path=None):
+    """
+    Start the background daemon threads: nominee inactivity scheduler, SMS outbox dispatcher, Horizon
+    stream ingestion (HORIZON_STREAM_ENABLED=1), Soroban event ingestion (SOROBAN_EVENTS_ENABLED=1) and,
+    for the standalone agent, the contract check loop.
+    db_path (default: app.config["DATABASE"] now) is resolved once; the workers keep using that file.
+    Returns the threads.
+    """
+    import horizon_stream
+    import sms_outbox
+    from config import AGENT_CHECK_INTERVAL_MINUTES, AGENT_VAULT_MODE
+    from db import get_pool
+
+    targets = []
+    if INACTIVITY_CHECK_INTERVAL_MINUTES > 0:
+        targets.append(("inactivity-scheduler", _inactivity_scheduler_loop, (stop_event,)))
+    connect = get_pool(os.path.abspath(db_path or app.config["DATABASE"])).connection
+    targets.append(("sms-dispatcher", sms_outbox.run_forever, (connect, stop_event)))
+    if SOROBAN_EVENTS_ENABLED:
+        import soroban_events
+        targets.append(("soroban-events", soroban_events.run_forever, (connect, _vault_contract_ids, stop_event)))
+    if HORIZON_STREAM_ENABLED:
+        targets.append(("horizon-stream", horizon_stream.run_forever, (connect, stop_event)))
+    if contract_check and (CONTRACT_ID or AGENT_VAULT_MODE in ("ledger", "mirror")) and AGENT_CHECK_INTERVAL_MINUTES > 0:
+        targets.append(("contract-agent", _agent_check_loop, (stop_event,)))
+    threads = []
+    for name, target, args in targets:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+_web_workers = {"stop": threading.Event(), "threads": []}
+
+
+def start_web_workers():
+    """
+    Run the agent inside a web process unless RUN_AGENT_IN_WEB=0 (then run `python -m agent` as one separate
+    process). Called by the servers' entry points (gunicorn.conf.py, the ASGI lifespan, `python app.py`), never
+    on import: tests, CLIs and kdf_pool's child processes import this module without starting any worker.
+    """
+    if not RUN_AGENT_IN_WEB or _web_workers["threads"]:
+        return _web_workers["threads"]
+    _web_workers["stop"] = threading.Event()
+    _web_workers["threads"] = start_background_workers(_web_workers["stop"], db_path=app.config["DATABASE"])
+    return _web_workers["threads"]
+
+
+def stop_web_workers(timeout=5):
+    """Stop the workers started by start_web_workers() and wait up to timeout seconds for each."""
+    threads, _web_workers["threads"] = _web_workers["threads"], []
+    _web_workers["stop"].set()
+    for thread in threads:
+        thread.join(timeout=timeout)
+
+
 if __name__ == "__main__":
+    start_web_workers()
     port = int(os.environ.get("PORT", 8080))
     app.run(host="0.0.0.0", port=port, debug=os.environ.get("FLASK_DEBUG", "0") == "1")
@@ -0,0 +1,297 @@
+"""
+Walletsurance Backend – ASGI entrypoint (async serving mode).
+The I/O-bound routes (claim data / submit, build-add-signer, build-deposit, submit) are served natively
+on the event loop with the async Horizon / Soroban clients, so a slow upstream call holds a coroutine
+instead of one of the few gunicorn threads. Every other route is passed to the Flask app, run in a
+thread pool of ASGI_WSGI_THREADS; its request and response bodies are streamed, not buffered. Request validation and response bodies come from the same helpers as
+the Flask views, so the JSON contracts are identical.
+
+Run:  uvicorn asgi:app --host 0.0.0.0 --port 8080   (or SERVER_MODE=asgi in the Docker image)
+"""
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import re
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+import app as flask_module
+import timing
+from config import ASGI_WSGI_THREADS
+
+LOG = logging.getLogger(__name__)
+
+flask_app = flask_module.app
+
+# Runs blocking work off the event loop: Flask requests and SQLite lookups (each thread has its own pooled connection).
+_executor = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix="asgi-sync")
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, body: dict):
+        super().__init__(body.get("error"))
+        self.status = status
+        self.body = body
+
+
+def _json_body(raw: bytes) -> dict:
+    """Parsed JSON object from the request body; an empty body is {} (like request.get_json() or {})."""
+    if not raw.strip():
+        return {}
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        raise HTTPError(400, {"error": "Invalid JSON body"})
+    return data if isinstance(data, dict) else {}
+
+
+async def _run_sync(fn, *args):
+    # Run in a copy of the caller's context so SQLite time lands in the request's timing spans.
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_executor, ctx.run, fn, *args)
+
+
+def _claim_row(token):
+    from db import get_pool
+
+    pool = get_pool(flask_app.config["DATABASE"])
+    conn = pool.connection()
+    try:
+        return flask_module._claim_row(conn, token)
+    finally:
+        pool.release(conn)
+
+
+async def claim_data(raw, token):
+    from horizon_client import get_account_async
+
+    row = await _run_sync(_claim_row, token)
+    if not row:
+        return {"error": "Invalid or expired claim link"}, 404
+    account = await get_account_async(row["depositor_account_id"])
+    return flask_module._claim_data_payload(row, account), 200
+
+
+async def claim_submit(raw):
+    from horizon_client import submit_transaction_async
+
+    xdr = (_json_body(raw).get("signed_envelope_xdr") or "").strip()
+    if not xdr:
+        return {"error": "signed_envelope_xdr required"}, 400
+    return flask_module._claim_submit_response(await submit_transaction_async(xdr))
+
+
+async def build_add_signer(raw):
+    from horizon_client import get_account_async
+
+    args, err = flask_module._add_signer_args(_json_body(raw))
+    if err:
+        return {"error": err}, 400
+    return flask_module._add_signer_response(*args, await get_account_async(args[0], fresh=True))
+
+
+async def build_deposit(raw):
+    from build_deposit import build_deposit_xdr_async
+
+    args, err = flask_module._deposit_args(_json_body(raw))
+    if err:
+        return {"error": err}, 400
+    xdr, err = await build_deposit_xdr_async(*args)
+    if err:
+        return {"error": err}, 400
+    return {"transaction_xdr": xdr}, 200
+
+
+async def submit(raw):
+    from build_deposit import submit_signed_envelope_async
+
+    xdr = (_json_body(raw).get("signed_envelope_xdr") or "").strip()
+    if not xdr:
+        return {"error": "signed_envelope_xdr required"}, 400
+    result, err = await submit_signed_envelope_async(xdr)
+    if err:
+        return {"error": err}, 400
+    return result, 200
+
+
+# (method, Flask rule (used in timing logs, so claim tokens are not logged), path pattern, handler)
+ROUTES = [
+    ("GET", "/api/claim/data/<token>", re.compile(r"^/api/claim/data/(?P<token>[^/]+)$"), claim_data),
+    ("POST", "/api/claim/submit", re.compile(r"^/api/claim/submit$"), claim_submit),
+    ("POST", "/api/build-add-signer", re.compile(r"^/api/build-add-signer$"), build_add_signer),
+    ("POST", "/api/build-deposit", re.compile(r"^/api/build-deposit$"), build_deposit),
+    ("POST", "/api/submit", re.compile(r"^/api/submit$"), submit),
+]
+
+
+def _match(method: str, path: str):
+    for route_method, rule, pattern, handler in ROUTES:
+        m = pattern.match(path)
+        if m and method == route_method:
+            return handler, rule, {k: unquote(v) for k, v in m.groupdict().items()}
+    return None, None, None
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def _send(send, status: int, headers: list, body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _json_response(status: int, payload) -> tuple[list, bytes]:
+    # Same serializer and trailing newline as flask.jsonify.
+    body = (flask_app.json.dumps(payload) + "\n").encode()
+    return [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())], body
+
+
+class _ReceiveStream(io.RawIOBase):
+    """
+    wsgi.input for the Flask fallback: pulls the ASGI request body from the event loop as the view reads it
+    (called from the executor thread), so a large upload such as /api/nominees/import is never held in memory.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b""
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._done:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                self._done = True
+            else:
+                self._buffer += message.get("body", b"")
+                self._done = not message.get("more_body")
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def _wsgi_environ(scope, receive, loop) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BufferedReader(_ReceiveStream(receive, loop)),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[key] = value
+        else:
+            key = f"HTTP_{key}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # A chunked body has no length: the input ends where the ASGI body does.
+    environ["wsgi.input_terminated"] = "CONTENT_LENGTH" not in environ
+    return environ
+
+
+def _call_wsgi(environ, send, loop) -> None:
+    """Run the Flask app on one request, sending each body chunk as the app yields it (streamed responses stay streamed)."""
+    started = {}
+
+    def send_sync(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    def send_start():
+        if not started.get("sent"):
+            started["sent"] = True
+            send_sync({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+
+    result = flask_app.wsgi_app(environ, start_response)
+    try:
+        for chunk in result:
+            send_start()
+            if chunk:
+                send_sync({"type": "http.response.body", "body": chunk, "more_body": True})
+        send_start()
+        send_sync({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+
+async def _lifespan(receive, send) -> None:
+    import aio_http
+    import soroban_client
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            flask_module.start_web_workers()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.get_running_loop().run_in_executor(None, flask_module.stop_web_workers)
+            await aio_http.close_all()
+            await soroban_client.close_async()
+            _executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    handler, rule, params = _match(scope["method"], scope["path"])
+    if handler is None:
+        loop = asyncio.get_running_loop()
+        await _run_sync(_call_wsgi, _wsgi_environ(scope, receive, loop), send, loop)
+        return
+    body = await _read_body(receive)
+    token = timing.start()
+    try:
+        payload, status = await handler(body, **params)
+    except HTTPError as e:
+        payload, status = e.body, e.status
+    except Exception as e:
+        LOG.error("500 Internal Server Error: %s\n%s", e, traceback.format_exc())
+        payload, status = {"error": str(e), "ok": False}, 500
+        if flask_module.SHOW_TRACEBACK_IN_RESPONSE:
+            payload["traceback"] = traceback.format_exc()
+    headers, body = _json_response(status, payload)
+    server_timing = timing.finish(token, scope["method"], rule, status)
+    if server_timing:
+        headers.append((b"server-timing", server_timing.encode("latin-1")))
+    await _send(send, status, headers, body)
@@ -0,0 +1,232 @@
+"""
+Agent loop at scale: one nominee check cycle (_run_check_nominees) over a synthetic dataset, then the SMS
+outbox drain and one ledger-mode vault check (agent_check), all against local fake Horizon, Twilio and
+Soroban RPC servers (benchmarks.fakes) with configurable latency and error injection.
+Prints one JSON document (stdout, or --out) so runs can be diffed across commits:
+cycle seconds, lookups/s, SMS/s, vault reads, peak RSS of this process, and the fakes' request counters.
+
+Run from backend: python -m benchmarks.bench_agent [--nominees 10000] [--inactive-fraction 0.05]
+    [--horizon-latency-ms 20] [--horizon-error-rate 0.01] [--twilio-latency-ms 50] [--vaults 1000]
+    [--horizon-rate-limit 200] [--sms-mode async] [--repeat 3] [--out result.json]
+Backend tuning env vars (HORIZON_LOOKUP_CONCURRENCY, NOMINEE_CHECK_CHUNK_SIZE, SMS_*, SOROBAN_*) apply as usual.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_backend, capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _reset(db_path: str) -> None:
+    """Make every nominee due again and forget the previous cycle's claims and SMS."""
+    import sqlite3
+
+    import app as web
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "UPDATE nominees SET next_check_at = ?, last_activity_at = NULL, lease_owner = NULL, lease_expires_at = NULL",
+            (web.NEXT_CHECK_UNSCHEDULED,),
+        )
+        conn.execute("DELETE FROM nominee_claims")
+        conn.execute("DELETE FROM sms_outbox")
+        conn.execute("DELETE FROM agent_runs")
+
+
+def run_once(db_path: str, sms_mode: str, vaults: int) -> dict:
+    """One nominee check cycle, the SMS outbox drain (async mode) and one vault check. Returns timings and counts."""
+    import app as web
+    import sms_outbox
+
+    result = {}
+    with web.app.app_context():
+        started = time.perf_counter()
+        _, sent, stats = web._run_check_nominees()
+        cycle = time.perf_counter() - started
+        result.update(
+            cycle_seconds=round(cycle, 3),
+            lookups=stats["lookups"],
+            lookups_per_sec=round(stats["lookups"] / cycle, 1) if cycle else None,
+            lookup_seconds=stats["lookup_seconds"],
+            sms_queued=stats["sms_queued"],
+            nominees_deferred=stats["nominees_deferred"],
+        )
+        sms_seconds = cycle
+        if sms_mode == "async":
+            db = web.get_db()
+            started = time.perf_counter()
+            while True:
+                n = sms_outbox.dispatch(db, limit=500)
+                sent += n
+                if not n:
+                    break
+            sms_seconds = time.perf_counter() - started
+        result.update(
+            sms_sent=sent,
+            sms_seconds=round(sms_seconds, 3),
+            sms_per_sec=round(sent / sms_seconds, 1) if sms_seconds and sent else 0.0,
+        )
+        if vaults:
+            started = time.perf_counter()
+            check = web._run_vault_check()
+            elapsed = time.perf_counter() - started
+            result["vault_check"] = {
+                "seconds": round(elapsed, 3),
+                "checked": check["checked"],
+                "claimable": check["claimable"],
+                "rpc_calls": check["rpc_calls"],
+                "vaults_per_sec": round(check["checked"] / elapsed, 1) if elapsed else None,
+            }
+    return result
+
+
+def _summary(runs: list[dict]) -> dict:
+    """Median of each numeric metric across runs."""
+    keys = [k for k, v in runs[0].items() if isinstance(v, (int, float))]
+    summary = {k: round(statistics.median(r[k] for r in runs if r[k] is not None), 3) for k in keys if runs[0][k] is not None}
+    if "vault_check" in runs[0]:
+        summary["vault_check"] = _summary([r["vault_check"] for r in runs])
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the agent loop against local fakes.")
+    parser.add_argument("--nominees", type=int, default=10_000)
+    parser.add_argument("--inactive-fraction", type=float, default=0.05)
+    parser.add_argument("--vaults", type=int, default=1_000, help="ledger-mode vault contracts (0 = skip)")
+    parser.add_argument("--claimable-fraction", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=1, help="cycles to run (the dataset is reset in between)")
+    parser.add_argument("--sms-mode", choices=("inline", "async"), default="async",
+                        help="inline: SMS sent inside the cycle; async: the outbox drain is timed separately")
+    parser.add_argument("--sms-rate", type=float, default=1_000_000,
+                        help="SMS_RATE_PER_SEC for the run (default: unthrottled, to measure the code path)")
+    parser.add_argument("--database", help="reuse a database from benchmarks.dataset instead of generating one")
+    parser.add_argument("--out", help="write the JSON result here instead of stdout")
+    for name in ("horizon", "twilio", "soroban"):
+        parser.add_argument(f"--{name}-latency-ms", type=float, default=0)
+        parser.add_argument(f"--{name}-jitter-ms", type=float, default=0)
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0)
+    parser.add_argument("--horizon-rate-limit", type=int, default=0,
+                        help="fake Horizon allows this many requests per second, then answers 429 (0: unlimited)")
+    args = parser.parse_args(argv)
+
+    from benchmarks.fakes import FakeStack, contract_id
+
+    settings = {
+        name: {
+            "latency_ms": getattr(args, f"{name}_latency_ms"),
+            "jitter_ms": getattr(args, f"{name}_jitter_ms"),
+            "error_rate": getattr(args, f"{name}_error_rate"),
+        }
+        for name in ("horizon", "twilio", "soroban")
+    }
+    settings["horizon"]["rate_limit"] = args.horizon_rate_limit
+    settings["soroban"]["vaults"] = {"count": args.vaults, "claimable_fraction": args.claimable_fraction}
+    stack = FakeStack(**settings).start()
+    try:
+        # Config is read at import time: point the backend at the fakes before importing it.
+        os.environ.update({
+            "RUN_AGENT_IN_WEB": "0",
+            "HORIZON_URL": stack.urls["horizon"],
+            "SOROBAN_RPC_URL": stack.urls["soroban"],
+            "TWILIO_API_BASE": stack.urls["twilio"],
+            "TWILIO_ACCOUNT_SID": "ACbench",
+            "TWILIO_AUTH_TOKEN": "bench",
+            "TWILIO_FROM_NUMBER": "+15550000000",
+            "SMS_DISPATCH_MODE": args.sms_mode,
+            "SMS_RATE_PER_SEC": str(args.sms_rate),
+            "SMS_RATE_BURST": str(max(args.sms_rate, 1)),
+            "AGENT_VAULT_MODE": "ledger",
+        })
+        import app as web
+        from benchmarks.dataset import generate
+
+        tmp = None
+        if args.database:
+            db_path = args.database
+            web.app.config["DATABASE"] = db_path
+            web.init_db()
+            dataset = {"nominees": None, "reused": db_path}
+        else:
+            fd, tmp = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            db_path = tmp
+            dataset = generate(db_path, args.nominees, args.inactive_fraction)
+        if args.vaults:
+            import sqlite3
+            with sqlite3.connect(db_path) as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO vault_contracts (contract_id) VALUES (?)",
+                    [(contract_id(i),) for i in range(1, args.vaults + 1)],
+                )
+
+        runs = []
+        try:
+            for i in range(args.repeat):
+                if i:
+                    _reset(db_path)
+                runs.append(run_once(db_path, args.sms_mode, args.vaults))
+        finally:
+            if tmp:
+                for path in (tmp, tmp + "-wal", tmp + "-shm"):
+                    if os.path.exists(path):
+                        os.unlink(path)
+    finally:
+        fakes = stack.stop()
+
+    import config
+    from horizon_ratelimit import limiter
+    result = {
+        "benchmark": "agent",
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "params": {
+            **{k: v for k, v in vars(args).items() if k not in ("out", "database")},
+            "horizon_lookup_concurrency": config.HORIZON_LOOKUP_CONCURRENCY,
+            "nominee_check_chunk_size": config.NOMINEE_CHECK_CHUNK_SIZE,
+            "sms_dispatch_concurrency": config.SMS_DISPATCH_CONCURRENCY,
+            "soroban_rpc_concurrency": config.SOROBAN_RPC_CONCURRENCY,
+        },
+        "dataset": dataset,
+        "summary": _summary(runs),
+        "runs": runs,
+        "peak_rss_mb": _peak_rss_mb(),
+        "horizon_rate_limit": limiter.state(),
+        "fakes": fakes,
+    }
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
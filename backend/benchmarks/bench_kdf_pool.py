@@ -0,0 +1,118 @@
+"""
+Registration throughput against KDF pool size.
+Runs a burst of /api/nominee/register requests from CONCURRENCY threads (like gunicorn --threads) for each
+pool size, while a probe thread times GET /health to show how much the burst starves other requests.
+Run from backend: python -m benchmarks.bench_kdf_pool [--requests 64] [--concurrency 8] [--workers 0,1,2,4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+os.environ.setdefault("RUN_AGENT_IN_WEB", "0")
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run(app, workers: int, requests: int, concurrency: int, max_pending: int) -> dict:
+    import kdf_pool
+
+    kdf_pool.configure(workers=workers, max_pending=max_pending)
+    if workers:
+        kdf_pool.encrypt("SWARMUP", "warmup")  # start the worker processes outside the timed burst
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    statuses = []
+    probe_ms = []
+    done = threading.Event()
+
+    def register():
+        client = app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            r = client.post("/api/nominee/register", json={
+                "depositor_account_id": "G" + f"{workers:02d}{i:06d}".ljust(55, "A"),
+                "beneficiary_phone": "+15550000000",
+                "question": "Pet?",
+                "answer": "rex",
+            })
+            statuses.append(r.status_code)
+
+    def probe():
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("/health")
+            probe_ms.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.005)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(register)
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    ok = statuses.count(200)
+    return {
+        "workers": workers,
+        "ok": ok,
+        "rejected_503": statuses.count(503),
+        "seconds": elapsed,
+        "registrations_per_sec": ok / elapsed if elapsed else 0.0,
+        "health_p50_ms": statistics.median(probe_ms) if probe_ms else 0.0,
+        "health_p95_ms": _percentile(probe_ms, 95),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", default="0,1,2,4", help="comma-separated pool sizes (0 = inline)")
+    parser.add_argument("--max-pending", type=int, default=10_000, help="admission limit (default: never reject)")
+    args = parser.parse_args(argv)
+
+    import app as app_module
+    import kdf_pool
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app_module.app.config["DATABASE"] = db_path
+    app_module.init_db()
+    try:
+        print(f"{'workers':>7} {'ok':>5} {'503':>5} {'reg/s':>8} {'health p50 ms':>14} {'health p95 ms':>14}")
+        for workers in (int(w) for w in args.workers.split(",")):
+            r = run(app_module.app, workers, args.requests, args.concurrency, args.max_pending)
+            print(
+                f"{r['workers']:>7} {r['ok']:>5} {r['rejected_503']:>5} {r['registrations_per_sec']:>8.1f} "
+                f"{r['health_p50_ms']:>14.1f} {r['health_p95_ms']:>14.1f}"
+            )
+    finally:
+        kdf_pool.shutdown()
+        for path in (db_path, db_path + "-wal", db_path + "-shm"):
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Synthetic nominee dataset for benchmarks: N due nominees (10k-1M+) written straight into a database
+initialised by app.init_db(), in executemany batches. Ciphertext columns hold placeholder values (the agent
+never decrypts), so generating a million rows takes seconds rather than a million PBKDF2 runs.
+A fraction of depositors are inactive (FakeHorizon reports their last transaction a year ago); the rest
+are active, so each cycle looks them all up but only the inactive ones get a claim and an SMS.
+
+Run from backend: python -m benchmarks.dataset bench.db --nominees 100000 [--inactive-fraction 0.05]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+os.environ.setdefault("RUN_AGENT_IN_WEB", "0")
+
+BATCH = 10_000
+
+
+def depositor_id(i: int, inactive: bool) -> str:
+    """56-char G... ID; the second character marks the account inactive for FakeHorizon."""
+    return "G" + ("I" if inactive else "A") + f"{i:054d}"
+
+
+def generate(db_path: str, nominees: int, inactive_fraction: float = 0.05, inactivity_days: int = 30) -> dict:
+    """
+    (Re)create db_path with init_db() and insert nominees rows, every inactive-th one inactive, all due.
+    Returns {"nominees", "inactive", "seconds"}.
+    """
+    import app as web
+
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.unlink(path)
+    web.app.config["DATABASE"] = db_path
+    web.init_db()
+
+    every = round(1 / inactive_fraction) if inactive_fraction > 0 else 0
+    started = time.perf_counter()
+    inactive = 0
+    conn = sqlite3.connect(db_path)
+    try:
+        for start in range(0, nominees, BATCH):
+            rows = []
+            for i in range(start, min(start + BATCH, nominees)):
+                is_inactive = bool(every) and i % every == 0
+                inactive += is_inactive
+                rows.append((
+                    depositor_id(i, is_inactive), "G" + f"S{i:054d}", "Y2lwaGVydGV4dA==", "bm9uY2U=", "c2FsdA==",
+                    "Name of your first pet?", f"+1555{i:07d}", inactivity_days, web.NEXT_CHECK_UNSCHEDULED,
+                ))
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO nominees
+                    (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, question, beneficiary_phone, inactivity_days, next_check_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+    finally:
+        conn.close()
+    return {"nominees": nominees, "inactive": inactive, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic nominee database.")
+    parser.add_argument("path")
+    parser.add_argument("--nominees", type=int, default=10_000)
+    parser.add_argument("--inactive-fraction", type=float, default=0.05)
+    parser.add_argument("--inactivity-days", type=int, default=30)
+    args = parser.parse_args(argv)
+    result = generate(args.path, args.nominees, args.inactive_fraction, args.inactivity_days)
+    print(f"{result['nominees']} nominees ({result['inactive']} inactive) written to {args.path} in {result['seconds']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
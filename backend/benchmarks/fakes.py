@@ -0,0 +1,424 @@
+"""
+Local stand-ins for Horizon, Soroban RPC and Twilio, for benchmarks and load tests.
+Each fake is a ThreadingHTTPServer on 127.0.0.1 (random port) with configurable latency (base + uniform
+jitter, in ms) and error injection (a fraction of requests answered with 503, or 429 for Twilio).
+They implement just the endpoints the backend calls, with responses shaped like the real services.
+
+Accounts are synthetic: a depositor ID whose second character is "I" (see dataset.depositor_id) has its
+last transaction a year ago, any other account transacted just now.
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from stellar_sdk import Address, StrKey, scval
+from stellar_sdk import xdr as stellar_xdr
+
+
+class FakeServer:
+    """
+    Base: serve handle(method, path, query, body) -> (status, payload) or (status, payload, headers) with
+    injected latency and errors.
+    """
+
+    error_status = 503
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: int = 1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.requests: dict[str, int] = {}
+        self.errors = 0
+        self._stats_lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay_and_fail(self) -> bool:
+        with self._random_lock:
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+            fail = self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def _count(self, route: str, failed: bool) -> None:
+        with self._stats_lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.errors += failed
+
+    def route_name(self, method: str, path: str) -> str:
+        return f"{method} {path}"
+
+    def handle(self, method: str, path: str, query: dict, body: bytes) -> tuple[int, object]:
+        raise NotImplementedError
+
+    def start(self) -> "FakeServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self):
+                parts = urlsplit(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                failed = fake._delay_and_fail()
+                fake._count(fake.route_name(self.command, parts.path), failed)
+                headers = ()
+                if failed:
+                    status, payload = fake.error_status, {"status": fake.error_status, "title": "Injected error"}
+                else:
+                    try:
+                        status, payload, *headers = fake.handle(self.command, parts.path, parse_qs(parts.query), body)
+                    except Exception as e:  # a bug in the fake should show up as a 500, not a hung client
+                        status, payload = 500, {"error": str(e)}
+                raw = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers[0] if headers else {}).items():
+                    self.send_header(name, str(value))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.request_queue_size = 1024
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"requests": sum(self.requests.values()), "errors": self.errors, "by_route": dict(self.requests)}
+
+
+def _horizon_time(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeHorizon(FakeServer):
+    """
+    GET /accounts/{id}, GET /accounts/{id}/transactions, POST /transactions.
+    With rate_limit > 0, allows that many requests per rate_window seconds (fixed window, like Horizon's
+    per-IP limit): responses carry X-RateLimit-Limit / -Remaining / -Reset, and requests over the limit get 429.
+    """
+
+    def __init__(self, *args, rate_limit: int = 0, rate_window: float = 1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.throttled = 0
+        self._window_start = 0.0
+        self._window_used = 0
+
+    def route_name(self, method, path):
+        return re.sub(r"/accounts/[^/]+", "/accounts/{id}", f"{method} {path}")
+
+    def _take(self) -> tuple[bool, dict]:
+        """Spend one request of the current window: (allowed, rate-limit headers)."""
+        now = time.monotonic()
+        with self._stats_lock:
+            if now - self._window_start >= self.rate_window:
+                self._window_start, self._window_used = now, 0
+            allowed = self._window_used < self.rate_limit
+            self._window_used += allowed
+            self.throttled += not allowed
+            reset = max(0.0, self._window_start + self.rate_window - now)
+            remaining = self.rate_limit - self._window_used
+        return allowed, {
+            "X-RateLimit-Limit": self.rate_limit,
+            "X-RateLimit-Remaining": remaining,
+            "X-RateLimit-Reset": math.ceil(reset),  # whole seconds, as Horizon sends it
+        }
+
+    def handle(self, method, path, query, body):
+        if self.rate_limit > 0:
+            allowed, headers = self._take()
+            if not allowed:
+                return 429, {"status": 429, "title": "Rate Limit Exceeded"}, {**headers, "Retry-After": headers["X-RateLimit-Reset"]}
+            status, payload = self._handle(method, path, body)
+            return status, payload, headers
+        return self._handle(method, path, body)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "throttled": self.throttled}
+
+    def _handle(self, method, path, body):
+        m = re.fullmatch(r"/accounts/([^/]+)(/transactions)?", path)
+        if method == "GET" and m:
+            account_id = m.group(1)
+            if m.group(2):
+                inactive = len(account_id) > 1 and account_id[1] == "I"
+                when = datetime.now(timezone.utc) - (timedelta(days=365) if inactive else timedelta(0))
+                return 200, {"_embedded": {"records": [{"created_at": _horizon_time(when), "source_account": account_id}]}}
+            return 200, {
+                "id": account_id,
+                "account_id": account_id,
+                "sequence": "4294967296",
+                "subentry_count": 0,
+                "thresholds": {"low_threshold": 0, "med_threshold": 0, "high_threshold": 0},
+                "signers": [{"key": account_id, "weight": 1, "type": "ed25519_public_key"}],
+                "balances": [{"asset_type": "native", "balance": "100.0000000"}],
+            }
+        if method == "POST" and path == "/transactions":
+            tx = parse_qs(body.decode()).get("tx", [""])[0]
+            return 200, {"hash": hashlib.sha256(tx.encode()).hexdigest(), "successful": True}
+        return 404, {"status": 404, "title": "Resource Missing"}
+
+
+class FakeTwilio(FakeServer):
+    """POST /2010-04-01/Accounts/{sid}/Messages.json."""
+
+    error_status = 429
+
+    def route_name(self, method, path):
+        return re.sub(r"/Accounts/[^/]+", "/Accounts/{sid}", f"{method} {path}")
+
+    def handle(self, method, path, query, body):
+        if method == "POST" and re.fullmatch(r"/2010-04-01/Accounts/[^/]+/Messages\.json", path):
+            form = parse_qs(body.decode())
+            return 201, {"sid": "SM" + hashlib.md5(body).hexdigest(), "to": form.get("To", [""])[0], "status": "queued"}
+        return 404, {"message": "Not found"}
+
+
+def contract_id(i: int) -> str:
+    """Deterministic synthetic contract ID number i."""
+    return StrKey.encode_contract(i.to_bytes(32, "big"))
+
+
+class FakeSorobanRpc(FakeServer):
+    """
+    JSON-RPC: getLatestLedger, getLedgerEntries (contract instances from self.vaults, any account),
+    simulateTransaction, sendTransaction, getTransaction, getEvents (always empty), getNetwork.
+    self.vaults maps contract ID -> {"depositor", "benef", "token", "amount", "last_ping", "timeout"}.
+    """
+
+    def __init__(self, ledger: int = 1_000_000, **kwargs):
+        super().__init__(**kwargs)
+        self.ledger = ledger
+        self.vaults: dict[str, dict] = {}
+        self.methods: dict[str, int] = {}
+        self.simulate_error = None  # set to a message to answer simulateTransaction with a failed simulation
+
+    def add_vaults(self, count: int, claimable_fraction: float = 0.0, start: int = 1) -> list[str]:
+        """Add count single-vault contracts, the first claimable_fraction of them past their timeout."""
+        from stellar_sdk import Keypair
+
+        ids = []
+        token = contract_id(0)
+        for n in range(count):
+            cid = contract_id(start + n)
+            claimable = n < int(count * claimable_fraction)
+            self.vaults[cid] = {
+                "depositor": Keypair.random().public_key,
+                "benef": Keypair.random().public_key,
+                "token": token,
+                "amount": 10_000_000,
+                "last_ping": self.ledger - (1000 if claimable else 10),
+                "timeout": 100,
+            }
+            ids.append(cid)
+        return ids
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._stats_lock:
+            stats["by_method"] = dict(self.methods)
+        return stats
+
+    def _instance_entry(self, cid: str, fields: dict) -> str:
+        storage = [
+            stellar_xdr.SCMapEntry(scval.to_symbol("depositor"), scval.to_address(fields["depositor"])),
+            stellar_xdr.SCMapEntry(scval.to_symbol("benef"), scval.to_address(fields["benef"])),
+            stellar_xdr.SCMapEntry(scval.to_symbol("token"), scval.to_address(fields["token"])),
+            stellar_xdr.SCMapEntry(scval.to_symbol("amount"), scval.to_int128(fields["amount"])),
+            stellar_xdr.SCMapEntry(scval.to_symbol("last_ping"), scval.to_uint32(fields["last_ping"])),
+            stellar_xdr.SCMapEntry(scval.to_symbol("timeout"), scval.to_uint32(fields["timeout"])),
+        ]
+        instance = stellar_xdr.SCVal(
+            stellar_xdr.SCValType.SCV_CONTRACT_INSTANCE,
+            instance=stellar_xdr.SCContractInstance(
+                executable=stellar_xdr.ContractExecutable(
+                    stellar_xdr.ContractExecutableType.CONTRACT_EXECUTABLE_WASM, wasm_hash=stellar_xdr.Hash(b"\x00" * 32)
+                ),
+                storage=stellar_xdr.SCMap(storage),
+            ),
+        )
+        return stellar_xdr.LedgerEntryData(
+            stellar_xdr.LedgerEntryType.CONTRACT_DATA,
+            contract_data=stellar_xdr.ContractDataEntry(
+                ext=stellar_xdr.ExtensionPoint(0),
+                contract=Address(cid).to_xdr_sc_address(),
+                key=stellar_xdr.SCVal(stellar_xdr.SCValType.SCV_LEDGER_KEY_CONTRACT_INSTANCE),
+                durability=stellar_xdr.ContractDataDurability.PERSISTENT,
+                val=instance,
+            ),
+        ).to_xdr()
+
+    @staticmethod
+    def _account_entry(key: stellar_xdr.LedgerKey) -> str:
+        return stellar_xdr.LedgerEntryData(
+            stellar_xdr.LedgerEntryType.ACCOUNT,
+            account=stellar_xdr.AccountEntry(
+                account_id=key.account.account_id,
+                balance=stellar_xdr.Int64(1_000_000_000),
+                seq_num=stellar_xdr.SequenceNumber(stellar_xdr.Int64(4294967296)),
+                num_sub_entries=stellar_xdr.Uint32(0),
+                inflation_dest=None,
+                flags=stellar_xdr.Uint32(0),
+                home_domain=stellar_xdr.String32(b""),
+                thresholds=stellar_xdr.Thresholds(b"\x01\x00\x00\x00"),
+                signers=[],
+                ext=stellar_xdr.AccountEntryExt(0),
+            ),
+        ).to_xdr()
+
+    def _ledger_entries(self, keys: list[str]) -> dict:
+        entries = []
+        for key_xdr in keys:
+            key = stellar_xdr.LedgerKey.from_xdr(key_xdr)
+            if key.type == stellar_xdr.LedgerEntryType.ACCOUNT:
+                entry = self._account_entry(key)
+            elif key.type == stellar_xdr.LedgerEntryType.CONTRACT_DATA:
+                cid = Address.from_xdr_sc_address(key.contract_data.contract).address
+                if cid not in self.vaults or key.contract_data.key.type != stellar_xdr.SCValType.SCV_LEDGER_KEY_CONTRACT_INSTANCE:
+                    continue
+                entry = self._instance_entry(cid, self.vaults[cid])
+            else:
+                continue
+            entries.append({"key": key_xdr, "xdr": entry, "lastModifiedLedgerSeq": self.ledger - 1})
+        return {"entries": entries, "latestLedger": self.ledger}
+
+    def _simulate(self) -> dict:
+        if self.simulate_error:
+            return {"error": self.simulate_error, "latestLedger": self.ledger}
+        data = stellar_xdr.SorobanTransactionData(
+            ext=stellar_xdr.SorobanTransactionDataExt(0),
+            resources=stellar_xdr.SorobanResources(
+                footprint=stellar_xdr.LedgerFootprint([], []),
+                instructions=stellar_xdr.Uint32(1_000_000),
+                disk_read_bytes=stellar_xdr.Uint32(1000),
+                write_bytes=stellar_xdr.Uint32(500),
+            ),
+            resource_fee=stellar_xdr.Int64(5000),
+        )
+        return {
+            "transactionData": data.to_xdr(),
+            "minResourceFee": "5000",
+            "results": [{"auth": [], "xdr": scval.to_void().to_xdr()}],
+            "latestLedger": self.ledger,
+        }
+
+    def handle(self, method, path, query, body):
+        req = json.loads(body or b"{}")
+        rpc_method, params = req.get("method"), req.get("params") or {}
+        with self._stats_lock:
+            self.methods[rpc_method] = self.methods.get(rpc_method, 0) + 1
+        if rpc_method == "getLatestLedger":
+            result = {"id": "0" * 64, "protocolVersion": 22, "sequence": self.ledger, "closeTime": str(int(time.time())),
+                      "headerXdr": "", "metadataXdr": ""}
+        elif rpc_method == "getLedgerEntries":
+            result = self._ledger_entries(params.get("keys") or [])
+        elif rpc_method == "simulateTransaction":
+            result = self._simulate()
+        elif rpc_method == "sendTransaction":
+            tx_hash = hashlib.sha256((params.get("transaction") or "").encode()).hexdigest()
+            result = {"hash": tx_hash, "status": "PENDING", "latestLedger": self.ledger, "latestLedgerCloseTime": "0"}
+        elif rpc_method == "getTransaction":
+            result = {"status": "NOT_FOUND", "latestLedger": self.ledger, "latestLedgerCloseTime": "0",
+                      "oldestLedger": 1, "oldestLedgerCloseTime": "0"}
+        elif rpc_method == "getEvents":
+            result = {"events": [], "latestLedger": self.ledger, "cursor": ""}
+        elif rpc_method == "getNetwork":
+            result = {"passphrase": "Test SDF Network ; September 2015", "protocolVersion": 22}
+        else:
+            return 200, {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": -32601, "message": "method not found"}}
+        return 200, {"jsonrpc": "2.0", "id": req.get("id"), "result": result}
+
+
+FAKES = {"horizon": FakeHorizon, "soroban": FakeSorobanRpc, "twilio": FakeTwilio}
+
+
+def _serve_stack(conn, settings: dict) -> None:
+    """Child process body for FakeStack: start the fakes, send their URLs, stop and send stats on request."""
+    fakes = {}
+    for name, kwargs in settings.items():
+        kwargs = dict(kwargs)
+        vaults = kwargs.pop("vaults", None)
+        fakes[name] = FAKES[name](**kwargs).start()
+        if vaults:
+            fakes[name].add_vaults(**vaults)
+    conn.send({name: fake.url for name, fake in fakes.items()})
+    conn.recv()
+    conn.send({name: fake.stats() for name, fake in fakes.items()})
+    for fake in fakes.values():
+        fake.stop()
+
+
+class FakeStack:
+    """
+    Run fakes in a separate (spawned) process, so they neither compete with the code under test for the
+    GIL nor count towards its RSS. settings: {"horizon" | "soroban" | "twilio": constructor kwargs}; the
+    soroban entry may carry "vaults": add_vaults kwargs. After start(), .urls maps each name to its base URL.
+    """
+
+    def __init__(self, **settings):
+        import multiprocessing
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self.settings = settings
+        self.urls: dict[str, str] = {}
+        self._conn = None
+        self._process = None
+        self._stats = None
+
+    def start(self) -> "FakeStack":
+        self._conn, child = self._ctx.Pipe()
+        self._process = self._ctx.Process(target=_serve_stack, args=(child, self.settings), daemon=True)
+        self._process.start()
+        self.urls = self._conn.recv()
+        return self
+
+    def stop(self) -> dict:
+        """Stop the fakes; returns their request/error counters."""
+        if self._process is not None and self._stats is None:
+            self._conn.send("stop")
+            self._stats = self._conn.recv()
+            self._process.join(5)
+        return self._stats or {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
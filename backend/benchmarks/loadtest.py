@@ -0,0 +1,360 @@
+"""
+HTTP load test of the public API: starts the backend the way it is deployed (gunicorn, default
+--workers 1 --threads 4 as in the Dockerfile; or uvicorn asgi:app, or the Flask dev server) against
+fake Horizon / Soroban RPC / Twilio servers (benchmarks.fakes, in their own process), then drives
+realistic flows from CONCURRENCY virtual users for each concurrency level:
+
+  nominee:  POST /api/nominee/register -> POST /api/build-add-signer -> sign -> POST /api/claim/submit
+  claim:    GET /api/claim/data/{token} -> sign a sweep -> POST /api/claim/submit -> POST /api/claim/offramp
+  deposit:  POST /api/build-deposit -> sign -> POST /api/submit   (optional, Soroban path)
+
+Claim tokens are seeded straight into the server's database (--claims of them). Claimants sign with a
+random key instead of decrypting the sweep secret, so the load generator doesn't spend its CPU on PBKDF2.
+Prints one JSON document (stdout, or --out): p50/p95/p99 latency, throughput and errors per route and
+per flow at each level, plus the fakes' request counters.
+
+Run from backend: python -m benchmarks.loadtest [--concurrency 1,4,16] [--duration 20]
+    [--server gunicorn|uvicorn|flask] [--workers 1] [--threads 4] [--flows nominee,claim]
+    [--horizon-latency-ms 50] [--soroban-latency-ms 80] [--horizon-error-rate 0.01] [--out result.json]
+Extra backend settings (KDF_ITERATIONS, HORIZON_ACCOUNT_CACHE_TTL_SECONDS, KDF_POOL_WORKERS, ...) are
+passed through from the environment, so cache and pool settings can be compared run by run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from itertools import cycle
+from pathlib import Path
+
+import requests
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+NETWORK_PASSPHRASE = os.environ.get("NETWORK_PASSPHRASE", "Test SDF Network ; September 2015")
+FLOWS = ("nominee", "claim", "deposit")
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(server: str, port: int, workers: int, threads: int) -> list[str]:
+    if server == "gunicorn":
+        return ["gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--threads", str(threads),
+                "--timeout", "60", "app:app"]
+    if server == "uvicorn":
+        return ["uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+                "--log-level", "warning"]
+    return [sys.executable, "app.py"]
+
+
+class Recorder:
+    """Thread-safe latency samples (ms) and status counts per route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, route: str, ms: float, status: int | str) -> None:
+        with self._lock:
+            self.latency[route].append(ms)
+            self.statuses[route][status] += 1
+
+    def report(self, seconds: float) -> dict:
+        out = {}
+        for route in sorted(self.latency):
+            ms = self.latency[route]
+            statuses = dict(self.statuses[route])
+            ok = sum(n for s, n in statuses.items() if isinstance(s, int) and s < 400)
+            out[route] = {
+                "requests": len(ms),
+                "errors": len(ms) - ok,
+                "throughput_per_sec": round(len(ms) / seconds, 2) if seconds else None,
+                "p50_ms": round(_percentile(ms, 50), 1),
+                "p95_ms": round(_percentile(ms, 95), 1),
+                "p99_ms": round(_percentile(ms, 99), 1),
+                "max_ms": round(max(ms), 1),
+                "statuses": {str(s): n for s, n in sorted(statuses.items(), key=str)},
+            }
+        return out
+
+
+class VirtualUser:
+    """Runs flows back to back with its own HTTP session, recording every step and whole flow."""
+
+    def __init__(self, base_url: str, recorder: Recorder, tokens, token_lock, contract_id: str | None, rng):
+        self.base = base_url
+        self.session = requests.Session()
+        self.recorder = recorder
+        self.tokens = tokens
+        self.token_lock = token_lock
+        self.contract_id = contract_id
+        self.rng = rng
+
+    def _call(self, route: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            r = self.session.request(method, self.base + path, timeout=60, **kwargs)
+            status = r.status_code
+        except requests.RequestException as e:
+            r, status = None, type(e).__name__
+        self.recorder.add(route, (time.perf_counter() - started) * 1000, status)
+        if r is None or r.status_code >= 400:
+            return None
+        return r.json()
+
+    @staticmethod
+    def _signed(xdr: str, keypair) -> str:
+        from stellar_sdk import TransactionBuilder
+
+        tx = TransactionBuilder.from_xdr(xdr, NETWORK_PASSPHRASE)
+        tx.sign(keypair)
+        return tx.to_xdr()
+
+    def nominee(self) -> bool:
+        from stellar_sdk import Keypair
+
+        depositor = Keypair.random()
+        reg = self._call("POST /api/nominee/register", "POST", "/api/nominee/register", json={
+            "depositor_account_id": depositor.public_key,
+            "beneficiary_phone": f"+1555{self.rng.randrange(10**7):07d}",
+            "question": "Name of your first pet?",
+            "answer": "rex",
+        })
+        if not reg:
+            return False
+        built = self._call("POST /api/build-add-signer", "POST", "/api/build-add-signer", json={
+            "account_public_key": depositor.public_key, "signer_public_key": reg["sweep_public_key"],
+        })
+        if not built:
+            return False
+        return self._call("POST /api/claim/submit", "POST", "/api/claim/submit", json={
+            "signed_envelope_xdr": self._signed(built["transaction_xdr"], depositor),
+        }) is not None
+
+    def claim(self) -> bool:
+        from stellar_sdk import Account, Asset, Keypair, TransactionBuilder
+
+        with self.token_lock:
+            token = next(self.tokens)
+        data = self._call("GET /api/claim/data/{token}", "GET", f"/api/claim/data/{token}")
+        if not data or not data.get("account"):
+            return False
+        sweep = Keypair.random()  # stands in for the decrypted sweep key
+        source = Account(data["depositor_account_id"], int(data["account"]["sequence"]))
+        tx = (
+            TransactionBuilder(source, data["network_passphrase"], base_fee=100)
+            .append_payment_op(Keypair.random().public_key, Asset.native(), "10")
+            .set_timeout(180)
+            .build()
+        )
+        tx.sign(sweep)
+        if self._call("POST /api/claim/submit", "POST", "/api/claim/submit",
+                      json={"signed_envelope_xdr": tx.to_xdr()}) is None:
+            return False
+        return self._call("POST /api/claim/offramp", "POST", "/api/claim/offramp", json={
+            "claim_token": token, "bank_account_holder": "Load Test", "bank_account_number": "000012345678",
+            "bank_ifsc": "TEST0000001", "amount_xlm": "10",
+        }) is not None
+
+    def deposit(self) -> bool:
+        from stellar_sdk import Keypair
+
+        depositor = Keypair.random()
+        built = self._call("POST /api/build-deposit", "POST", "/api/build-deposit", json={
+            "depositor_public_key": depositor.public_key, "beneficiary_address": Keypair.random().public_key,
+            "amount": 10_000_000, "timeout_ledgers": 17280, "token_address": self.contract_id,
+        })
+        if not built:
+            return False
+        return self._call("POST /api/submit", "POST", "/api/submit", json={
+            "signed_envelope_xdr": self._signed(built["transaction_xdr"], depositor),
+        }) is not None
+
+    def run(self, flows: list[str], stop_at: float) -> None:
+        while time.perf_counter() < stop_at:
+            flow = self.rng.choice(flows)
+            started = time.perf_counter()
+            try:
+                outcome = 200 if getattr(self, flow)() else "failed"
+            except Exception as e:  # e.g. an unparsable transaction_xdr: count it, keep the user running
+                outcome = type(e).__name__
+            self.recorder.add(f"flow:{flow}", (time.perf_counter() - started) * 1000, outcome)
+
+
+def seed_claims(db_path: str, count: int) -> list[str]:
+    """Insert count nominees (real depositor keys) with a claim token each; returns the tokens."""
+    from stellar_sdk import Keypair
+
+    tokens = [f"load-{i:06d}-{os.urandom(4).hex()}" for i in range(count)]
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        for token in tokens:
+            cur = conn.execute(
+                """INSERT INTO nominees
+                   (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, question, beneficiary_phone, inactivity_days)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (Keypair.random().public_key, Keypair.random().public_key, "Y2lwaGVydGV4dA==", "bm9uY2U=", "c2FsdA==",
+                 "Name of your first pet?", "+15550000000", 30),
+            )
+            conn.execute("INSERT INTO nominee_claims (claim_token, nominee_id) VALUES (?, ?)", (token, cur.lastrowid))
+    return tokens
+
+
+def run_level(base_url: str, flows: list[str], concurrency: int, duration: float, tokens: list[str],
+              contract_id: str | None, seed: int) -> dict:
+    recorder = Recorder()
+    token_iter, token_lock = cycle(tokens), threading.Lock()
+    users = [VirtualUser(base_url, recorder, token_iter, token_lock, contract_id, random.Random(seed + i))
+             for i in range(concurrency)]
+    started = time.perf_counter()
+    threads = [threading.Thread(target=u.run, args=(flows, started + duration), daemon=True) for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    report = recorder.report(elapsed)
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "routes": {k: v for k, v in report.items() if not k.startswith("flow:")},
+        "flows": {k[5:]: v for k, v in report.items() if k.startswith("flow:")},
+    }
+
+
+def _wait_healthy(url: str, process, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            if requests.get(url + "/health", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become healthy")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the public API against local fakes.")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated virtual user counts")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of unrecorded load before the first level")
+    parser.add_argument("--flows", default="nominee,claim", help=f"comma-separated, from {', '.join(FLOWS)}")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn", "flask"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--claims", type=int, default=500, help="claim tokens to seed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the JSON result here instead of stdout")
+    for name in ("horizon", "soroban", "twilio"):
+        parser.add_argument(f"--{name}-latency-ms", type=float, default=0)
+        parser.add_argument(f"--{name}-jitter-ms", type=float, default=0)
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0)
+    args = parser.parse_args(argv)
+
+    flows = [f.strip() for f in args.flows.split(",") if f.strip()]
+    unknown = sorted(set(flows) - set(FLOWS))
+    if unknown:
+        parser.error(f"unknown flow(s): {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    from benchmarks.bench_agent import _git_commit
+    from benchmarks.fakes import FakeStack, contract_id
+
+    settings = {
+        name: {
+            "latency_ms": getattr(args, f"{name}_latency_ms"),
+            "jitter_ms": getattr(args, f"{name}_jitter_ms"),
+            "error_rate": getattr(args, f"{name}_error_rate"),
+        }
+        for name in ("horizon", "soroban", "twilio")
+    }
+    tmpdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+    db_path = os.path.join(tmpdir.name, "loadtest.db")
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    stack = FakeStack(**settings).start()
+    server = None
+    log = open(os.path.join(tmpdir.name, "server.log"), "w+")
+    try:
+        env = {
+            **os.environ,
+            "PORT": str(port),
+            "DATABASE_PATH": db_path,
+            "RUN_AGENT_IN_WEB": "0",
+            "HORIZON_URL": stack.urls["horizon"],
+            "SOROBAN_RPC_URL": stack.urls["soroban"],
+            "TWILIO_API_BASE": stack.urls["twilio"],
+            "CONTRACT_ID": os.environ.get("CONTRACT_ID") or contract_id(1),
+        }
+        server = subprocess.Popen(
+            server_command(args.server, port, args.workers, args.threads),
+            cwd=_backend, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        _wait_healthy(base_url, server)
+        tokens = seed_claims(db_path, args.claims)
+        token_contract = contract_id(0)
+        if args.warmup > 0:
+            run_level(base_url, flows, max(levels), args.warmup, tokens, token_contract, args.seed)
+        results = [
+            run_level(base_url, flows, c, args.duration, tokens, token_contract, args.seed + 1000 * (i + 1))
+            for i, c in enumerate(levels)
+        ]
+    except RuntimeError:
+        log.seek(0)
+        sys.stderr.write(log.read()[-4000:])
+        raise
+    finally:
+        if server is not None and server.poll() is None:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        fakes = stack.stop()
+        log.close()
+        tmpdir.cleanup()
+
+    result = {
+        "benchmark": "loadtest",
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "levels": results,
+        "fakes": fakes,
+    }
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,219 @@
 """
 Build an unsigned Soroban transaction for the inheritance contract's deposit().
 Used by the Lock funds flow: backend builds + prepares, returns XDR for Freighter to sign.
+With MULTI_VAULT_CONTRACT_ID set, deposits go to the multi-vault contract instead (same arguments;
+it returns the new vault ID), and build_claim_many_xdr() builds the agent's batch claim.
+
+Building is cached so repeat deposits skip most RPC round trips:
+- one shared SorobanServer (soroban_client.rpc_server) instead of one per request;
+- account sequence numbers cached per depositor (DEPOSIT_SEQUENCE_TTL_SECONDS), advanced locally when
+  a submit is accepted and dropped when a submit fails;
+- the simulated footprint, resource fee and source-account auth of a deposit reused for the same
+  (contract, depositor, token) within DEPOSIT_SIM_CACHE_LEDGERS ledgers, with only the arguments swapped.
+Both caches hold at most DEPOSIT_CACHE_SIZE entries (LRU).
+build_deposit_xdr_async() / submit_signed_envelope_async() share these caches and run the RPC calls on
+the event loop (soroban_client.rpc_server_async), for the ASGI app.
 """
+import copy
+import threading
+import time
+from collections import OrderedDict
 from typing import Any
 
-from config import CONTRACT_ID, DEFAULT_TOKEN_ADDRESS, NETWORK_PASSPHRASE, SOROBAN_RPC_URL
+import timing
+from config import (
+    CONTRACT_ID,
+    DEFAULT_TOKEN_ADDRESS,
+    DEPOSIT_CACHE_SIZE,
+    DEPOSIT_SEQUENCE_TTL_SECONDS,
+    DEPOSIT_SIM_CACHE_LEDGERS,
+    MULTI_VAULT_CONTRACT_ID,
+    NETWORK_PASSPHRASE,
+)
 
+# Hit/miss counters for the sequence and simulation caches (monitoring).
+stats = {"sequence_hits": 0, "sequence_misses": 0, "simulation_hits": 0, "simulation_misses": 0}
 
-def build_deposit_xdr(
+
+class SequenceCache:
+    """
+    Last known sequence number per account, trusted for ttl seconds. A build uses it as-is (so building
+    twice before signing yields the same, still-valid sequence); record_submitted() moves it to the
+    submitted transaction's sequence and invalidate() forces the next build to reload from RPC.
+    At most maxsize accounts are kept; the least recently used is dropped first.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = DEPOSIT_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, account_id: str) -> int | None:
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[account_id]
+                return None
+            self._entries.move_to_end(account_id)
+            return entry[0]
+
+    def _put(self, account_id: str, sequence: int) -> None:
+        """Caller holds _lock."""
+        self._entries[account_id] = (sequence, time.monotonic())
+        self._entries.move_to_end(account_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def set(self, account_id: str, sequence: int) -> None:
+        with self._lock:
+            self._put(account_id, sequence)
+
+    def record_submitted(self, account_id: str, sequence: int) -> None:
+        with self._lock:
+            current = self._entries.get(account_id)
+            if current is None or current[0] < sequence:
+                self._put(account_id, sequence)
+
+    def invalidate(self, account_id: str) -> None:
+        with self._lock:
+            self._entries.pop(account_id, None)
+
+
+_sequences = SequenceCache(DEPOSIT_SEQUENCE_TTL_SECONDS)
+
+# (contract_id, depositor, token) -> (ledger simulated at, soroban_data, min_resource_fee, auth entries),
+# oldest write first; entries too old to reuse are pruned on write, and at most DEPOSIT_CACHE_SIZE are kept.
+_simulations: OrderedDict[tuple, tuple] = OrderedDict()
+_simulations_lock = threading.Lock()
+
+
+def _cached_source(account_id: str):
+    """Account with the cached sequence number, or None on a miss."""
+    from stellar_sdk import Account
+
+    sequence = _sequences.get(account_id)
+    if sequence is not None:
+        stats["sequence_hits"] += 1
+        return Account(account_id, sequence)
+    stats["sequence_misses"] += 1
+    return None
+
+
+def _load_source(server, account_id: str):
+    """Account with the cached sequence number, loading it from RPC on a miss."""
+    account = _cached_source(account_id)
+    if account is None:
+        account = server.load_account(account_id)
+        _sequences.set(account_id, account.sequence)
+    return account
+
+
+async def _load_source_async(server, account_id: str):
+    account = _cached_source(account_id)
+    if account is None:
+        account = await server.load_account(account_id)
+        _sequences.set(account_id, account.sequence)
+    return account
+
+
+def _reusable_auth(auth) -> bool:
+    """Only source-account credentials can be reused: they carry no nonce or signature."""
+    from stellar_sdk import xdr as stellar_xdr
+
+    return all(
+        a.credentials.type == stellar_xdr.SorobanCredentialsType.SOROBAN_CREDENTIALS_SOURCE_ACCOUNT
+        for a in auth
+    )
+
+
+def _rebind_auth(auth, params, amount_val):
+    """Copy cached deposit auth entries with this deposit's arguments (and token transfer amount)."""
+    entries = copy.deepcopy(auth)
+    for entry in entries:
+        root = entry.root_invocation
+        root.function.contract_fn.args = list(params)
+        for sub in root.sub_invocations:
+            fn = sub.function.contract_fn
+            if fn is not None and fn.function_name.sc_symbol == b"transfer" and len(fn.args) == 3:
+                fn.args[2] = amount_val
+    return entries
+
+
+def _cached_simulation(tx, cache_key, ledger, params, amount_val):
+    """tx with the simulation cached under cache_key applied, or None if there is none recent enough."""
+    with _simulations_lock:
+        cached = _simulations.get(cache_key) if cache_key else None
+    if not cached or ledger is None or ledger - cached[0] > DEPOSIT_SIM_CACHE_LEDGERS:
+        stats["simulation_misses"] += 1
+        return None
+    stats["simulation_hits"] += 1
+    _, soroban_data, min_resource_fee, auth = cached
+    te = copy.deepcopy(tx)
+    te.transaction.fee += min_resource_fee
+    te.transaction.soroban_data = copy.deepcopy(soroban_data)
+    te.transaction.operations[0].auth = _rebind_auth(auth, params, amount_val)
+    return te
+
+
+def _remember_simulation(cache_key, ledger, tx, prepared) -> None:
+    auth = prepared.transaction.operations[0].auth
+    if cache_key and ledger is not None and _reusable_auth(auth):
+        min_resource_fee = prepared.transaction.fee - tx.transaction.fee
+        with _simulations_lock:
+            _simulations[cache_key] = (ledger, prepared.transaction.soroban_data, min_resource_fee, auth)
+            _simulations.move_to_end(cache_key)
+            while _simulations and (
+                len(_simulations) > DEPOSIT_CACHE_SIZE
+                or next(iter(_simulations.values()))[0] < ledger - DEPOSIT_SIM_CACHE_LEDGERS
+            ):
+                _simulations.popitem(last=False)
+
+
+def _prepare_deposit(server, tx, cache_key, params, amount_val):
+    """
+    prepare_transaction with the simulation reused from cache_key when it is recent enough.
+    cache_key None disables caching (e.g. multi-vault deposits, whose footprint depends on NextId).
+    """
+    import soroban_client
+
+    ledger = soroban_client.latest_ledger() if cache_key else None
+    prepared = _cached_simulation(tx, cache_key, ledger, params, amount_val)
+    if prepared is None:
+        with timing.span("prepare"):
+            prepared = server.prepare_transaction(tx)
+        _remember_simulation(cache_key, ledger, tx, prepared)
+    return prepared
+
+
+async def _prepare_deposit_async(server, tx, cache_key, params, amount_val):
+    import soroban_client
+
+    ledger = await soroban_client.latest_ledger_async() if cache_key else None
+    prepared = _cached_simulation(tx, cache_key, ledger, params, amount_val)
+    if prepared is None:
+        with timing.span("prepare"):
+            prepared = await server.prepare_transaction(tx)
+        _remember_simulation(cache_key, ledger, tx, prepared)
+    return prepared
+
+
+def _deposit_call(
     depositor_public_key: str,
     beneficiary_address: str,
     amount: int,
     timeout_ledgers: int,
-    token_address: str | None = None,
-) -> tuple[str | None, str | None]:
+    token_address: str | None,
+) -> tuple[dict | None, str | None]:
     """
-    Build and prepare (simulate) a deposit() invoke transaction. Do not sign.
-    Returns (transaction_xdr_base64, error_message). On success error_message is None.
+    Validate deposit arguments and convert them to contract parameters.
+    Returns ({"contract_id", "params", "cache_key"}, None) or (None, error_message).
     """
     token = (token_address or DEFAULT_TOKEN_ADDRESS or "").strip()
-    if not CONTRACT_ID:
+    contract_id = MULTI_VAULT_CONTRACT_ID or CONTRACT_ID
+    if not contract_id:
         return None, "CONTRACT_ID not configured"
     if not token:
         return None, "Token address required (set DEFAULT_TOKEN_ADDRESS or pass token_address)"
@@ -29,23 +223,15 @@ def build_deposit_xdr(
         return None, "timeout_ledgers must be positive"
 
     try:
-        from stellar_sdk import Address, Network, SorobanServer, TransactionBuilder, scval
+        from stellar_sdk import Address, scval
     except ImportError as e:
         return None, f"stellar_sdk not available: {e}"
 
     try:
-        server = SorobanServer(SOROBAN_RPC_URL)
-        source = server.load_account(depositor_public_key)
-    except Exception as e:
-        return None, f"Failed to load account: {e}"
-
-    try:
-        depositor_addr = Address.from_public_key(depositor_public_key)
-        beneficiary_addr = Address.from_public_key(beneficiary_address)
-        if token.startswith("C") and len(token) == 56:
-            token_addr = Address.from_contract_id(token)
-        else:
-            token_addr = Address.from_public_key(token)
+        # Address() accepts both G... accounts and C... contracts.
+        depositor_addr = Address(depositor_public_key)
+        beneficiary_addr = Address(beneficiary_address)
+        token_addr = Address(token)
     except Exception as e:
         return None, f"Invalid address: {e}"
 
@@ -59,15 +245,120 @@ def build_deposit_xdr(
         ]
     except Exception as e:
         return None, f"Failed to build params: {e}"
+    cache_key = None if contract_id == MULTI_VAULT_CONTRACT_ID else (contract_id, depositor_public_key, token)
+    return {"contract_id": contract_id, "params": params, "cache_key": cache_key}, None
+
+
+def _deposit_tx(source, call: dict):
+    from stellar_sdk import TransactionBuilder
+
+    return (
+        TransactionBuilder(source, NETWORK_PASSPHRASE, base_fee=100)
+        .set_timeout(300)
+        .append_invoke_contract_function_op(
+            contract_id=call["contract_id"],
+            function_name="deposit",
+            parameters=call["params"],
+        )
+        .build()
+    )
+
+
+def build_deposit_xdr(
+    depositor_public_key: str,
+    beneficiary_address: str,
+    amount: int,
+    timeout_ledgers: int,
+    token_address: str | None = None,
+) -> tuple[str | None, str | None]:
+    """
+    Build and prepare (simulate) a deposit() invoke transaction. Do not sign.
+    Returns (transaction_xdr_base64, error_message). On success error_message is None.
+    """
+    call, err = _deposit_call(depositor_public_key, beneficiary_address, amount, timeout_ledgers, token_address)
+    if err:
+        return None, err
+
+    from soroban_client import rpc_server
+
+    try:
+        server = rpc_server()
+        source = _load_source(server, depositor_public_key)
+    except Exception as e:
+        return None, f"Failed to load account: {e}"
+
+    try:
+        tx = _deposit_tx(source, call)
+        tx = _prepare_deposit(server, tx, call["cache_key"], call["params"], call["params"][2])
+        return tx.to_xdr(), None
+    except Exception as e:
+        return None, str(e)
+
+
+async def build_deposit_xdr_async(
+    depositor_public_key: str,
+    beneficiary_address: str,
+    amount: int,
+    timeout_ledgers: int,
+    token_address: str | None = None,
+) -> tuple[str | None, str | None]:
+    """build_deposit_xdr() with the RPC calls awaited on the event loop."""
+    call, err = _deposit_call(depositor_public_key, beneficiary_address, amount, timeout_ledgers, token_address)
+    if err:
+        return None, err
+
+    from soroban_client import rpc_server_async
+
+    try:
+        server = rpc_server_async()
+        source = await _load_source_async(server, depositor_public_key)
+    except Exception as e:
+        return None, f"Failed to load account: {e}"
+
+    try:
+        tx = _deposit_tx(source, call)
+        tx = await _prepare_deposit_async(server, tx, call["cache_key"], call["params"], call["params"][2])
+        return tx.to_xdr(), None
+    except Exception as e:
+        return None, str(e)
+
+
+def build_claim_many_xdr(
+    source_public_key: str,
+    vault_ids: list[int],
+    contract_id: str | None = None,
+) -> tuple[str | None, str | None]:
+    """
+    Build and prepare (simulate) a claim_many(ids) invoke on the multi-vault contract. Do not sign.
+    claim_many skips IDs that are missing or not yet expired, so a stale ID does not fail the batch.
+    Returns (transaction_xdr_base64, error_message). On success error_message is None.
+    """
+    contract_id = contract_id or MULTI_VAULT_CONTRACT_ID
+    if not contract_id:
+        return None, "MULTI_VAULT_CONTRACT_ID not configured"
+    if not vault_ids:
+        return None, "vault_ids required"
+
+    try:
+        from stellar_sdk import TransactionBuilder, scval
+        from soroban_client import rpc_server
+    except ImportError as e:
+        return None, f"stellar_sdk not available: {e}"
+
+    try:
+        server = rpc_server()
+        source = _load_source(server, source_public_key)
+    except Exception as e:
+        return None, f"Failed to load account: {e}"
 
     try:
         tx = (
             TransactionBuilder(source, NETWORK_PASSPHRASE, base_fee=100)
             .set_timeout(300)
             .append_invoke_contract_function_op(
-                contract_id=CONTRACT_ID,
-                function_name="deposit",
-                parameters=params,
+                contract_id=contract_id,
+                function_name="claim_many",
+                parameters=[scval.to_vec([scval.to_uint64(int(i)) for i in vault_ids])],
             )
             .build()
         )
@@ -77,24 +368,60 @@ def build_deposit_xdr(
         return None, str(e)
 
 
+def _parse_envelope(signed_envelope_xdr: str):
+    """(envelope, None) or (None, error_message)."""
+    try:
+        from stellar_sdk import TransactionEnvelope
+    except ImportError as e:
+        return None, f"stellar_sdk not available: {e}"
+    try:
+        return TransactionEnvelope.from_xdr(signed_envelope_xdr, NETWORK_PASSPHRASE), None
+    except Exception as e:
+        return None, f"Invalid envelope XDR: {e}"
+
+
+def _submitted(envelope, resp) -> dict[str, Any]:
+    """Advance (accepted) or drop (rejected) the source account's cached sequence; return the result dict."""
+    source = envelope.transaction.source.account_id
+    status = getattr(resp.status, "value", resp.status)
+    if status in ("PENDING", "DUPLICATE"):
+        _sequences.record_submitted(source, envelope.transaction.sequence)
+    else:
+        _sequences.invalidate(source)
+    return {"hash": resp.hash, "status": status, "result": getattr(resp, "result", None)}
+
+
 def submit_signed_envelope(signed_envelope_xdr: str) -> tuple[dict[str, Any] | None, str | None]:
     """
     Submit a signed transaction envelope (base64 XDR) to the network.
     Returns (result_dict, error_message). result_dict has hash, status, etc.
+    An accepted transaction advances the source account's cached sequence; a rejected one drops it.
     """
-    try:
-        from stellar_sdk import SorobanServer, TransactionEnvelope
-    except ImportError as e:
-        return None, f"stellar_sdk not available: {e}"
+    envelope, err = _parse_envelope(signed_envelope_xdr)
+    if err:
+        return None, err
+
+    from soroban_client import rpc_server
 
     try:
-        envelope = TransactionEnvelope.from_xdr(signed_envelope_xdr, NETWORK_PASSPHRASE)
+        resp = rpc_server().send_transaction(envelope)
     except Exception as e:
-        return None, f"Invalid envelope XDR: {e}"
+        _sequences.invalidate(envelope.transaction.source.account_id)
+        return None, str(e)
+    return _submitted(envelope, resp), None
+
+
+async def submit_signed_envelope_async(signed_envelope_xdr: str) -> tuple[dict[str, Any] | None, str | None]:
+    """submit_signed_envelope() with sendTransaction awaited on the event loop."""
+    envelope, err = _parse_envelope(signed_envelope_xdr)
+    if err:
+        return None, err
+
+    from soroban_client import rpc_server_async
 
     try:
-        server = SorobanServer(SOROBAN_RPC_URL)
-        resp = server.send_transaction(envelope)
-        return {"hash": resp.hash, "status": resp.status, "result": getattr(resp, "result", None)}, None
+        resp = await rpc_server_async().send_transaction(envelope)
     except Exception as e:
+        _sequences.invalidate(envelope.transaction.source.account_id)
         return None, str(e)
+    return _submitted(envelope, resp), None
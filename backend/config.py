@@ -1,5 +1,7 @@
 """Walletsurance backend config from environment."""
 import os
+import secrets
+import socket
 
 SOROBAN_RPC_URL = os.environ.get(
     "SOROBAN_RPC_URL",
@@ -9,8 +11,40 @@ NETWORK_PASSPHRASE = os.environ.get(
     "NETWORK_PASSPHRASE",
     "Test SDF Network ; September 2015",
 )
+# Contract view results are cached per ledger; the latest ledger sequence is re-read at most this often (seconds).
+SOROBAN_LEDGER_POLL_SECONDS = float(os.environ.get("SOROBAN_LEDGER_POLL_SECONDS", "1").strip() or "1")
+# At most this many contracts keep a ContractClient and a cached view result (least recently used are dropped).
+SOROBAN_CLIENT_CACHE_SIZE = max(1, int(os.environ.get("SOROBAN_CLIENT_CACHE_SIZE", "256").strip() or "256"))
 # Deployed inheritance contract ID (set after deploy)
 CONTRACT_ID = os.environ.get("CONTRACT_ID", "").strip()
+# Multi-vault contract (walletsurance/contracts/vaults): one deployment holding many vaults keyed by vault ID.
+# When set, Lock funds deposits go to it and the ledger-mode agent reads/claims its vaults (claim_many).
+MULTI_VAULT_CONTRACT_ID = os.environ.get("MULTI_VAULT_CONTRACT_ID", "").strip()
+# Most vault IDs settled per claim_many transaction (bounded by Soroban per-transaction resource limits).
+CLAIM_MANY_BATCH = max(1, int(os.environ.get("CLAIM_MANY_BATCH", "25").strip() or "25"))
+# Mirror vault state from contract events (getEvents) into the vaults table; contract status and the
+# agent (AGENT_VAULT_MODE=mirror) then read the mirror instead of calling RPC.
+SOROBAN_EVENTS_ENABLED = os.environ.get("SOROBAN_EVENTS_ENABLED", "0").strip() == "1"
+SOROBAN_EVENTS_POLL_SECONDS = float(os.environ.get("SOROBAN_EVENTS_POLL_SECONDS", "5").strip() or "5")
+SOROBAN_EVENTS_PAGE_SIZE = max(1, int(os.environ.get("SOROBAN_EVENTS_PAGE_SIZE", "200").strip() or "200"))
+# /api/contract/status answers from the mirror only if the contract's event lane was read within this many
+# seconds; otherwise (lane behind, or contract not mirrored) it simulates over RPC.
+SOROBAN_EVENTS_MAX_LAG_SECONDS = float(os.environ.get("SOROBAN_EVENTS_MAX_LAG_SECONDS", "30").strip() or "30")
+# Deposit building: cached account sequence lifetime (seconds) and how many ledgers a deposit's
+# simulated footprint/fee is reused for the same contract, depositor and token.
+DEPOSIT_SEQUENCE_TTL_SECONDS = float(os.environ.get("DEPOSIT_SEQUENCE_TTL_SECONDS", "30").strip() or "30")
+DEPOSIT_SIM_CACHE_LEDGERS = int(os.environ.get("DEPOSIT_SIM_CACHE_LEDGERS", "12").strip() or "12")
+# Most accounts / (contract, depositor, token) simulations each of those caches holds (least recently used dropped).
+DEPOSIT_CACHE_SIZE = max(1, int(os.environ.get("DEPOSIT_CACHE_SIZE", "1024").strip() or "1024"))
+# Extra inheritance (vault) contracts for the agent to watch, comma-separated; more can be added via POST /api/vaults.
+VAULT_CONTRACT_IDS = [c.strip() for c in os.environ.get("VAULT_CONTRACT_IDS", "").split(",") if c.strip()]
+# Agent contract check: "simulate" = CONTRACT_ID via view simulation; "mirror" = due vaults from the
+# event-fed vaults table (needs SOROBAN_EVENTS_ENABLED=1, no RPC); "ledger" = every registered vault,
+# read directly from instance storage with batched getLedgerEntries.
+AGENT_VAULT_MODE = os.environ.get("AGENT_VAULT_MODE", "simulate").strip().lower() or "simulate"
+# Keys per getLedgerEntries request (RPC limit is 200) and how many such requests run at once.
+SOROBAN_LEDGER_ENTRIES_BATCH = min(200, max(1, int(os.environ.get("SOROBAN_LEDGER_ENTRIES_BATCH", "200").strip() or "200")))
+SOROBAN_RPC_CONCURRENCY = max(1, int(os.environ.get("SOROBAN_RPC_CONCURRENCY", "4").strip() or "4"))
 # Token contract address for "Lock funds" (e.g. native XLM on testnet). Required for deposit.
 DEFAULT_TOKEN_ADDRESS = os.environ.get("DEFAULT_TOKEN_ADDRESS", "").strip()
 
@@ -19,24 +53,159 @@ DEFAULT_TOKEN_ADDRESS = os.environ.get("DEFAULT_TOKEN_ADDRESS", "").strip()
 ONMETA_BASE_URL = os.environ.get("ONMETA_BASE_URL", "").strip()
 ONMETA_API_KEY = os.environ.get("ONMETA_API_KEY", "").strip()
 
+# SQLite (db.py): pragmas applied to every pooled connection.
+DB_JOURNAL_MODE = os.environ.get("DB_JOURNAL_MODE", "WAL").strip() or "WAL"
+DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", "NORMAL").strip() or "NORMAL"
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000").strip() or "5000")
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "16384").strip() or "16384")
+DB_MMAP_SIZE_MB = int(os.environ.get("DB_MMAP_SIZE_MB", "64").strip() or "0")
+
+# Outbound HTTP (horizon_client, sms_client, onmeta_client): one keep-alive pool per host.
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "4").strip() or "4")
+# Connections kept per host; keep >= HORIZON_LOOKUP_CONCURRENCY so lookups don't reconnect.
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "16").strip() or "16")
+# Retries on connection errors, 429 and 5xx (5xx only for GET-like requests), with jittered exponential backoff.
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2").strip() or "0")
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5").strip() or "0")
+HTTP_DEFAULT_TIMEOUT = float(os.environ.get("HTTP_DEFAULT_TIMEOUT", "10").strip() or "10")
+
+
+def _parse_host_timeouts(raw: str) -> dict[str, float]:
+    """Parse "host=seconds,host=seconds" (e.g. "horizon-testnet.stellar.org=5,api.twilio.com=15")."""
+    out = {}
+    for item in raw.split(","):
+        host, _, seconds = item.partition("=")
+        if host.strip() and seconds.strip():
+            out[host.strip().lower()] = float(seconds)
+    return out
+
+
+# Per-host timeout overrides (seconds); a host listed here ignores the client's own timeout.
+HTTP_HOST_TIMEOUTS = _parse_host_timeouts(os.environ.get("HTTP_HOST_TIMEOUTS", ""))
+
+# Async serving (asgi.py, run with uvicorn): most outbound connections open at once across all hosts
+# (aio_http.py) and how many requests the Flask app mounted under it may run at once (thread pool size).
+ASGI_HTTP_LIMIT = int(os.environ.get("ASGI_HTTP_LIMIT", "1000").strip() or "1000")
+ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", "8").strip() or "8")
+
 # Horizon (for inactivity detection)
 HORIZON_URL = os.environ.get(
     "HORIZON_URL",
     "https://horizon-testnet.stellar.org",
 ).rstrip("/")
 
+# Several Horizon / Soroban RPC endpoints (comma-separated; default: HORIZON_URL / SOROBAN_RPC_URL alone). Reads go
+# to the healthy endpoint with the lowest latency EWMA and are hedged (endpoints.py); writes are sent once.
+# horizon_stream and the URLs shown to the frontend keep using HORIZON_URL / SOROBAN_RPC_URL.
+HORIZON_URLS = [u.strip().rstrip("/") for u in os.environ.get("HORIZON_URLS", "").split(",") if u.strip()] or [HORIZON_URL]
+SOROBAN_RPC_URLS = [u.strip() for u in os.environ.get("SOROBAN_RPC_URLS", "").split(",") if u.strip()] or [SOROBAN_RPC_URL]
+# Weight of the newest sample in each endpoint's latency EWMA.
+ENDPOINT_EWMA_ALPHA = float(os.environ.get("ENDPOINT_EWMA_ALPHA", "0.2").strip() or "0.2")
+# After this many consecutive failures (errors, 5xx, 429) an endpoint is skipped for ENDPOINT_DOWN_SECONDS.
+ENDPOINT_FAILURE_THRESHOLD = max(1, int(os.environ.get("ENDPOINT_FAILURE_THRESHOLD", "3").strip() or "3"))
+ENDPOINT_DOWN_SECONDS = float(os.environ.get("ENDPOINT_DOWN_SECONDS", "30").strip() or "30")
+# Hedged reads: when the chosen endpoint hasn't answered after its recent HEDGE_QUANTILE latency (clamped to
+# [HEDGE_MIN_DELAY_MS, HEDGE_MAX_DELAY_MS]; HEDGE_DEFAULT_DELAY_MS until it has 20 samples), ask the next one too.
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "1").strip() != "0"
+HEDGE_QUANTILE = min(0.999, max(0.5, float(os.environ.get("HEDGE_QUANTILE", "0.95").strip() or "0.95")))
+HEDGE_MIN_DELAY_MS = float(os.environ.get("HEDGE_MIN_DELAY_MS", "20").strip() or "20")
+HEDGE_MAX_DELAY_MS = float(os.environ.get("HEDGE_MAX_DELAY_MS", "2000").strip() or "2000")
+HEDGE_DEFAULT_DELAY_MS = float(os.environ.get("HEDGE_DEFAULT_DELAY_MS", "250").strip() or "250")
+
+# horizon_client.get_account cache: entries live this many seconds (0 = no caching), at most SIZE accounts (LRU).
+HORIZON_ACCOUNT_CACHE_TTL_SECONDS = float(os.environ.get("HORIZON_ACCOUNT_CACHE_TTL_SECONDS", "5").strip() or "0")
+HORIZON_ACCOUNT_CACHE_SIZE = int(os.environ.get("HORIZON_ACCOUNT_CACHE_SIZE", "1024").strip() or "1024")
+
+# Ingest account activity from one Horizon /operations SSE stream instead of polling each depositor per check.
+HORIZON_STREAM_ENABLED = os.environ.get("HORIZON_STREAM_ENABLED", "0").strip() == "1"
+# Max seconds between checkpoints of the stream cursor (and buffered last-activity updates).
+HORIZON_STREAM_FLUSH_SECONDS = float(os.environ.get("HORIZON_STREAM_FLUSH_SECONDS", "1").strip() or "1")
+
 # Nominee flow: SMS (Twilio). Leave empty to mock SMS (log only).
 TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID", "").strip()
 TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN", "").strip()
 TWILIO_FROM_NUMBER = os.environ.get("TWILIO_FROM_NUMBER", "").strip()
 
+# Twilio REST API base (override to point at a local stand-in in tests/benchmarks).
+TWILIO_API_BASE = os.environ.get("TWILIO_API_BASE", "https://api.twilio.com").strip().rstrip("/")
+
+# SMS outbox (sms_outbox.py). "inline": the nominee check sends new claim SMS right after committing them
+# (failures are retried by the dispatcher); "async": the check only enqueues and the dispatcher sends.
+SMS_DISPATCH_MODE = os.environ.get("SMS_DISPATCH_MODE", "inline").strip().lower() or "inline"
+# Provider throughput: token bucket refilled at SMS_RATE_PER_SEC, holding up to SMS_RATE_BURST messages.
+SMS_RATE_PER_SEC = float(os.environ.get("SMS_RATE_PER_SEC", "10").strip() or "10")
+SMS_RATE_BURST = float(os.environ.get("SMS_RATE_BURST", "10").strip() or "10")
+SMS_DISPATCH_CONCURRENCY = max(1, int(os.environ.get("SMS_DISPATCH_CONCURRENCY", "4").strip() or "4"))
+SMS_DISPATCH_POLL_SECONDS = float(os.environ.get("SMS_DISPATCH_POLL_SECONDS", "2").strip() or "2")
+# Retries: attempt n waits ~SMS_RETRY_BASE_SECONDS * 2^(n-1); after SMS_MAX_ATTEMPTS the message is marked failed.
+SMS_MAX_ATTEMPTS = max(1, int(os.environ.get("SMS_MAX_ATTEMPTS", "6").strip() or "6"))
+SMS_RETRY_BASE_SECONDS = float(os.environ.get("SMS_RETRY_BASE_SECONDS", "30").strip() or "30")
+
 # Base URL for claim links in SMS (e.g. https://your-app.run.app)
 CLAIM_BASE_URL = os.environ.get("CLAIM_BASE_URL", "").strip()
 
 # In-backend agent: run nominee inactivity check every N minutes (0 = disabled). Default 1 minute.
 INACTIVITY_CHECK_INTERVAL_MINUTES = int(os.environ.get("INACTIVITY_CHECK_INTERVAL_MINUTES", "1").strip() or "0")
+# When a depositor's last activity is unknown (Horizon error or no transactions yet), check it again after this many minutes.
+NOMINEE_RECHECK_MINUTES = max(1, int(os.environ.get("NOMINEE_RECHECK_MINUTES", "15").strip() or "15"))
+# Run the background agent (scheduler + stream threads) inside each web worker. Set to 0 when the agent runs
+# as its own process (python -m agent) so gunicorn can use several workers without duplicate checks/SMS.
+RUN_AGENT_IN_WEB = os.environ.get("RUN_AGENT_IN_WEB", "1").strip() != "0"
+# Standalone agent only: run the contract claim check (same as /api/agent/check) every N minutes (0 = disabled).
+AGENT_CHECK_INTERVAL_MINUTES = int(os.environ.get("AGENT_CHECK_INTERVAL_MINUTES", "60").strip() or "0")
+# Identity of this agent instance for nominee leases (default: hostname-pid-random, unique per process).
+AGENT_INSTANCE_ID = os.environ.get("AGENT_INSTANCE_ID", "").strip() or f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(3)}"
+# How long an agent holds a leased batch of nominees before another instance may take it over (renewed by heartbeat).
+NOMINEE_LEASE_SECONDS = max(3, int(os.environ.get("NOMINEE_LEASE_SECONDS", "120").strip() or "120"))
+# Due nominees are read, looked up and written back in chunks of this many rows (one transaction per chunk).
+NOMINEE_CHECK_CHUNK_SIZE = max(1, int(os.environ.get("NOMINEE_CHECK_CHUNK_SIZE", "500").strip() or "500"))
+# Max Horizon last-activity lookups in flight during one nominee check (1 = one at a time).
+HORIZON_LOOKUP_CONCURRENCY = max(1, int(os.environ.get("HORIZON_LOOKUP_CONCURRENCY", "8").strip() or "1"))
+# Adaptive lookup concurrency (horizon_ratelimit.py): HORIZON_LOOKUP_CONCURRENCY is the ceiling; on a 429 or a
+# nearly spent X-RateLimit budget it is multiplied by HORIZON_AIMD_DECREASE (not below the minimum), then grows by 1.
+HORIZON_AIMD_MIN_CONCURRENCY = max(1, int(os.environ.get("HORIZON_AIMD_MIN_CONCURRENCY", "1").strip() or "1"))
+HORIZON_AIMD_DECREASE = min(0.9, max(0.1, float(os.environ.get("HORIZON_AIMD_DECREASE", "0.5").strip() or "0.5")))
+# Back off before X-RateLimit-Remaining drops below this fraction of X-RateLimit-Limit.
+HORIZON_RATELIMIT_LOW_WATERMARK = float(os.environ.get("HORIZON_RATELIMIT_LOW_WATERMARK", "0.1").strip() or "0.1")
+# Pause after a 429 that carries no Retry-After / X-RateLimit-Reset header.
+HORIZON_RATELIMIT_COOLDOWN_SECONDS = float(os.environ.get("HORIZON_RATELIMIT_COOLDOWN_SECONDS", "1").strip() or "1")
+# Longest a lookup waits for a slot (or the end of a pause) before its nominee is deferred to a later cycle.
+HORIZON_RATELIMIT_MAX_WAIT_SECONDS = float(os.environ.get("HORIZON_RATELIMIT_MAX_WAIT_SECONDS", "5").strip() or "5")
 
 # When nominee chooses "Send to bank", swept funds go to this address; then we call Onmeta to send fiat to their bank.
 PLATFORM_SWEEP_PUBLIC_KEY = os.environ.get("PLATFORM_SWEEP_PUBLIC_KEY", "").strip()
 # Rough XLM → INR for off-ramp (e.g. 10); used when creating Onmeta order from amount_xlm.
 RATE_XLM_TO_INR = float(os.environ.get("RATE_XLM_TO_INR", "10").strip() or "10")
+
+# PBKDF2 iterations for new nominee records (stored per record, so changing it keeps old claims working).
+# Pick a value for your latency budget with: python kdf_calibrate.py
+KDF_ITERATIONS = max(1, int(os.environ.get("KDF_ITERATIONS", "100000").strip() or "100000"))
+
+# Nominee registration KDF (kdf_pool.py): PBKDF2 + encrypt runs in this many worker processes (0 = inline in
+# the request thread). At most KDF_POOL_MAX_PENDING jobs may be running or queued; beyond that registration
+# answers 503 with Retry-After instead of queueing.
+KDF_POOL_WORKERS = max(0, int(os.environ.get("KDF_POOL_WORKERS", "2").strip() or "0"))
+KDF_POOL_MAX_PENDING = max(1, int(os.environ.get("KDF_POOL_MAX_PENDING", "16").strip() or "16"))
+KDF_POOL_TIMEOUT_SECONDS = float(os.environ.get("KDF_POOL_TIMEOUT_SECONDS", "30").strip() or "30")
+# Bulk nominee import (nominee_import.py): rows per encryption task and per insert transaction.
+NOMINEE_IMPORT_BATCH_SIZE = max(1, int(os.environ.get("NOMINEE_IMPORT_BATCH_SIZE", "200").strip() or "200"))
+
+# Bearer token for admin endpoints (bulk nominee import). Empty = those endpoints are disabled.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "").strip()
+
+# GET /metrics (Prometheus text format, metrics.py). METRICS_ENABLED=0 turns the endpoint and SQLite timing off.
+# Scrapes must send Authorization: Bearer <METRICS_TOKEN>, or ADMIN_TOKEN when METRICS_TOKEN is unset;
+# with neither set the endpoint answers 403.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").strip() != "0"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "").strip()
+
+# Per-request timing (timing.py): Server-Timing header plus one JSON log line per request (logger
+# walletsurance.timing) for requests taking at least REQUEST_TIMING_LOG_MIN_MS (-1 = header only).
+REQUEST_TIMING_ENABLED = os.environ.get("REQUEST_TIMING_ENABLED", "1").strip() != "0"
+REQUEST_TIMING_LOG_MIN_MS = float(os.environ.get("REQUEST_TIMING_LOG_MIN_MS", "0").strip() or "0")
+# Sampled profiling (profiling.py): fraction of requests / inactivity check cycles run under cProfile at
+# startup (changeable at runtime via POST /api/admin/profiling); the newest PROFILE_MAX_FILES are kept in PROFILE_DIR.
+PROFILE_REQUEST_RATE = float(os.environ.get("PROFILE_REQUEST_RATE", "0").strip() or "0")
+PROFILE_CYCLE_RATE = float(os.environ.get("PROFILE_CYCLE_RATE", "0").strip() or "0")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles").strip() or "profiles"
+PROFILE_MAX_FILES = max(1, int(os.environ.get("PROFILE_MAX_FILES", "50").strip() or "50"))
@@ -0,0 +1,149 @@
+"""
+SQLite connection pool: one long-lived connection per thread per database file, closed when its thread exits.
+Every connection is opened in WAL mode with tuned pragmas, so the scheduler's writes
+don't block request threads' reads and we don't pay a connect() per request.
+With METRICS_ENABLED, connections time their statements into metrics (see TimedConnection).
+"""
+import sqlite3
+import threading
+import time
+import weakref
+from pathlib import Path
+
+import metrics
+from config import (
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_JOURNAL_MODE,
+    DB_MMAP_SIZE_MB,
+    DB_SYNCHRONOUS,
+    METRICS_ENABLED,
+)
+
+
+def db_time(dt) -> str:
+    """UTC datetime as 'YYYY-MM-DD HH:MM:SS' (the format of next_check_at, lease_expires_at, next_attempt_at)."""
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose execute()/executemany() are timed into metrics (statement type, latency, errors)."""
+
+    def execute(self, sql, parameters=(), /):
+        started = time.perf_counter()
+        ok = False
+        try:
+            cursor = super().execute(sql, parameters)
+            ok = True
+            return cursor
+        finally:
+            metrics.observe_db(sql, time.perf_counter() - started, ok)
+
+    def executemany(self, sql, parameters, /):
+        started = time.perf_counter()
+        ok = False
+        try:
+            cursor = super().executemany(sql, parameters)
+            ok = True
+            return cursor
+        finally:
+            metrics.observe_db(sql, time.perf_counter() - started, ok)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a new connection with WAL, synchronous, cache, mmap and busy_timeout pragmas applied."""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    # check_same_thread=False only so close_all() can close it; each connection is used by its own thread.
+    conn = sqlite3.connect(
+        db_path,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        factory=TimedConnection if METRICS_ENABLED else sqlite3.Connection,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE_MB) * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class _Slot:
+    """Holds a thread's connection in the pool's thread-local; collected (and the connection closed) with the thread."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class ConnectionPool:
+    """
+    Per-thread connections to one database file. A thread always gets back its own connection; when the
+    thread exits, its thread-local slot is dropped and the connection is closed and forgotten, so threads
+    that come and go (request threads, executors) don't keep file descriptors and page caches open.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._all: set[sqlite3.Connection] = set()
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            conn = connect(self.db_path)
+            slot = self._local.slot = _Slot(conn)
+            weakref.finalize(slot, self._discard, conn)
+            with self._lock:
+                self._all.add(conn)
+        return slot.conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Close the connection of a thread that has exited."""
+        with self._lock:
+            self._all.discard(conn)
+        conn.close()
+
+    def open_connections(self) -> int:
+        with self._lock:
+            return len(self._all)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Hand a connection back after a request: roll back anything left uncommitted, keep it open."""
+        if conn.in_transaction:
+            conn.rollback()
+
+    def close_all(self) -> None:
+        with self._lock:
+            conns, self._all = self._all, set()
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Return the pool for a database file (one per path, created on first use)."""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path)
+    return pool
+
+
+def close_pools() -> None:
+    """Close every pooled connection (tests, shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
@@ -0,0 +1,261 @@
+"""
+Latency-aware selection and hedged reads across several endpoints of one service (HORIZON_URLS,
+SOROBAN_RPC_URLS). Each endpoint keeps a latency EWMA, a window of recent latencies and a health state
+(ENDPOINT_FAILURE_THRESHOLD consecutive failures take it out for ENDPOINT_DOWN_SECONDS).
+A read goes to the healthy endpoint with the lowest EWMA (untried endpoints first, so each gets measured);
+if it has not answered after that endpoint's recent HEDGE_QUANTILE latency, the same read is sent to the
+next endpoint and the first good answer wins. A failed answer moves on to the next endpoint at once.
+Writes (hedge=False) go to one endpoint only: a transaction is never sent twice.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+from config import (
+    ENDPOINT_DOWN_SECONDS,
+    ENDPOINT_EWMA_ALPHA,
+    ENDPOINT_FAILURE_THRESHOLD,
+    HEDGE_DEFAULT_DELAY_MS,
+    HEDGE_ENABLED,
+    HEDGE_MAX_DELAY_MS,
+    HEDGE_MIN_DELAY_MS,
+    HEDGE_QUANTILE,
+)
+
+SAMPLE_WINDOW = 200  # latencies kept per endpoint for the hedge quantile
+MIN_SAMPLES = 20
+
+# Reads of every pool run here while they are raced; a hedge that can't get a thread just starts later.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="endpoint")
+
+
+def failed_response(result) -> bool:
+    """An HTTP response worth trying elsewhere: 429 or 5xx."""
+    status = getattr(result, "status_code", 200)
+    return status == 429 or status >= 500
+
+
+class Endpoint:
+    __slots__ = ("url", "ewma", "samples", "failures", "down_until", "requests", "errors", "hedge_wins")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ewma = None  # seconds
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+        self.failures = 0  # consecutive
+        self.down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.hedge_wins = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+
+class EndpointPool:
+    """Endpoints of one service (name is the metrics label: horizon, soroban)."""
+
+    def __init__(self, name: str, urls: list[str]):
+        self.name = name
+        self.endpoints = [Endpoint(u) for u in dict.fromkeys(urls)]
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def ranked(self) -> list[Endpoint]:
+        """Healthy endpoints by latency EWMA (untried first), then the unhealthy ones, soonest back first."""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.healthy(now)]
+            down = sorted((e for e in self.endpoints if not e.healthy(now)), key=lambda e: e.down_until)
+        healthy.sort(key=lambda e: -1.0 if e.ewma is None else e.ewma)
+        return healthy + down
+
+    def record(self, endpoint: Endpoint, seconds: float, ok: bool, sample: bool = True) -> None:
+        """One finished call. sample=False keeps writes (slow by nature) out of the latency estimates."""
+        with self._lock:
+            endpoint.requests += 1
+            if ok:
+                endpoint.failures = 0
+                endpoint.down_until = 0.0
+                if sample:
+                    endpoint.samples.append(seconds)
+                    endpoint.ewma = seconds if endpoint.ewma is None else (
+                        ENDPOINT_EWMA_ALPHA * seconds + (1 - ENDPOINT_EWMA_ALPHA) * endpoint.ewma)
+            else:
+                endpoint.errors += 1
+                endpoint.failures += 1
+                if endpoint.failures >= ENDPOINT_FAILURE_THRESHOLD:
+                    endpoint.down_until = time.monotonic() + ENDPOINT_DOWN_SECONDS
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        """Seconds to wait on endpoint before hedging: its recent HEDGE_QUANTILE latency, clamped."""
+        with self._lock:
+            samples = sorted(endpoint.samples) if len(endpoint.samples) >= MIN_SAMPLES else None
+        if samples is None:
+            delay_ms = HEDGE_DEFAULT_DELAY_MS
+        else:
+            delay_ms = samples[min(len(samples) - 1, int(len(samples) * HEDGE_QUANTILE))] * 1000
+        return min(max(delay_ms, HEDGE_MIN_DELAY_MS), HEDGE_MAX_DELAY_MS) / 1000
+
+    def _timed(self, endpoint: Endpoint, fn, failed, sample: bool):
+        started = time.perf_counter()
+        try:
+            result = fn(endpoint.url)
+        except Exception:
+            self.record(endpoint, time.perf_counter() - started, False)
+            raise
+        self.record(endpoint, time.perf_counter() - started, not failed(result), sample)
+        return result
+
+    def call(self, fn, hedge: bool = True, failed=failed_response):
+        """
+        fn(base_url) on the best endpoint; returns its result or raises its exception. With hedge, slow or
+        failed answers are raced / retried on the next endpoints; the last failure is returned or raised.
+        """
+        order = self.ranked()
+        if not hedge:
+            return self._timed(order[0], fn, failed, sample=False)
+        if len(order) == 1 or not HEDGE_ENABLED:
+            return self._call_sequential(order, fn, failed)
+        ctx = contextvars.copy_context()
+        running = {}
+        last = None
+
+        def launch(endpoint):
+            running[_executor.submit(ctx.copy().run, self._timed, endpoint, fn, failed, True)] = endpoint
+
+        launch(order.pop(0))
+        primary = next(iter(running.values()))
+        while running:
+            timeout = self.hedge_delay(primary) if order else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:  # the hedge delay passed with no answer
+                self._hedged(order[0], sent=True)
+                launch(order.pop(0))
+                continue
+            for future in done:
+                endpoint = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last = e
+                else:
+                    if not failed(result):
+                        if endpoint is not primary:
+                            self._hedged(endpoint, sent=False)
+                        return result
+                    last = result
+            if order and not running:
+                launch(order.pop(0))
+        if isinstance(last, Exception):
+            raise last
+        return last
+
+    def _call_sequential(self, order, fn, failed):
+        """Without hedging: try endpoints in order until one gives a good answer."""
+        last = None
+        for i, endpoint in enumerate(order):
+            try:
+                result = self._timed(endpoint, fn, failed, True)
+            except Exception as e:
+                if i == len(order) - 1:
+                    raise
+                last = e
+                continue
+            if not failed(result):
+                return result
+            last = result
+        if isinstance(last, Exception):
+            raise last
+        return last
+
+    async def call_async(self, fn, hedge: bool = True, failed=failed_response):
+        """call() for a coroutine function fn(base_url); losing requests are cancelled."""
+        order = self.ranked()
+        if not hedge:
+            return await self._timed_async(order[0], fn, failed, sample=False)
+        running = {}
+        last = None
+
+        def launch(endpoint):
+            running[asyncio.ensure_future(self._timed_async(endpoint, fn, failed, True))] = endpoint
+
+        launch(order.pop(0))
+        primary = next(iter(running.values()))
+        try:
+            while running:
+                timeout = self.hedge_delay(primary) if order and HEDGE_ENABLED else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._hedged(order[0], sent=True)
+                    launch(order.pop(0))
+                    continue
+                for task in done:
+                    endpoint = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last = e
+                    else:
+                        if not failed(result):
+                            if endpoint is not primary:
+                                self._hedged(endpoint, sent=False)
+                            return result
+                        last = result
+                if order and not running:
+                    launch(order.pop(0))
+        finally:
+            for task in running:
+                task.cancel()
+        if isinstance(last, Exception):
+            raise last
+        return last
+
+    async def _timed_async(self, endpoint: Endpoint, fn, failed, sample: bool):
+        started = time.perf_counter()
+        try:
+            result = await fn(endpoint.url)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.record(endpoint, time.perf_counter() - started, False)
+            raise
+        self.record(endpoint, time.perf_counter() - started, not failed(result), sample)
+        return result
+
+    def _hedged(self, endpoint: Endpoint, sent: bool) -> None:
+        if sent:
+            with self._lock:
+                self.hedges += 1
+            metrics.HEDGED_REQUESTS.inc(self.name, "sent")
+        else:
+            with self._lock:
+                endpoint.hedge_wins += 1
+            metrics.HEDGED_REQUESTS.inc(self.name, "won")
+
+    def state(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            endpoints = [
+                {
+                    "url": e.url,
+                    "healthy": e.healthy(now),
+                    "ewma_ms": round(e.ewma * 1000, 2) if e.ewma is not None else None,
+                    "requests": e.requests,
+                    "errors": e.errors,
+                    "consecutive_failures": e.failures,
+                    "hedge_wins": e.hedge_wins,
+                }
+                for e in self.endpoints
+            ]
+            hedges = self.hedges
+        for entry, e in zip(endpoints, self.endpoints):
+            entry["hedge_delay_ms"] = round(self.hedge_delay(e) * 1000, 1)
+        return {"endpoints": endpoints, "hedges_sent": hedges, "hedging": HEDGE_ENABLED and len(endpoints) > 1}
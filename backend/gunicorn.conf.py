@@ -0,0 +1,16 @@
+"""
+Gunicorn hooks (loaded from the working directory): each worker starts the in-process agent once the app is
+loaded, unless RUN_AGENT_IN_WEB=0.
+"""
+
+
+def post_worker_init(worker):
+    import app
+
+    app.start_web_workers()
+
+
+def worker_exit(server, worker):
+    import app
+
+    app.stop_web_workers()
@@ -1,17 +1,165 @@
 """
 Horizon client: last activity (for inactivity detection) and submit classic transaction.
+The *_async variants do the same over aio_http, for the ASGI app (asgi.py).
+Accounts are cached for HORIZON_ACCOUNT_CACHE_TTL_SECONDS (the claim pages load the same account several
+times in a row); concurrent misses for one account share a single Horizon request, and submitting a
+transaction drops its source account so the next lookup sees the new sequence number.
+Every response's rate-limit headers feed horizon_ratelimit.limiter (adaptive scheduler concurrency).
+With several HORIZON_URLS, reads go to the fastest healthy one and are hedged (endpoints.py); submits are not.
 """
-import requests
-from config import HORIZON_URL
+import asyncio
+import threading
+import time
+from collections import OrderedDict
 
+import aio_http
+import http_session
+import metrics
+from config import HORIZON_ACCOUNT_CACHE_SIZE, HORIZON_ACCOUNT_CACHE_TTL_SECONDS, HORIZON_URL, HORIZON_URLS
+from endpoints import EndpointPool
+from horizon_ratelimit import limiter
 
-def get_account(account_id: str) -> dict | None:
+endpoint_pool = EndpointPool("horizon", HORIZON_URLS)
+
+
+def _get(path: str, **kwargs):
     """
-    Return full account from Horizon (balances, subentry_count, sequence, etc.)
-    for building sweep transaction on claim page.
+    GET a Horizon path: from HORIZON_URL, or the best of HORIZON_URLS (hedged) when several are set.
+    A 429 is returned as is (no transport retry) so horizon_ratelimit sees it and backs off.
+    """
+    kwargs.setdefault("retry_429", False)
+    if len(endpoint_pool) < 2:
+        return http_session.get(f"{HORIZON_URL}{path}", **kwargs)
+    return endpoint_pool.call(lambda base: http_session.get(f"{base}{path}", **kwargs))
+
+
+def _post(path: str, **kwargs):
+    """POST to one Horizon endpoint; never hedged or retried elsewhere."""
+    if len(endpoint_pool) < 2:
+        return http_session.post(f"{HORIZON_URL}{path}", **kwargs)
+    return endpoint_pool.call(lambda base: http_session.post(f"{base}{path}", **kwargs), hedge=False)
+
+
+async def _get_async(path: str, **kwargs):
+    kwargs.setdefault("retry_429", False)
+    if len(endpoint_pool) < 2:
+        return await aio_http.get(f"{HORIZON_URL}{path}", **kwargs)
+    return await endpoint_pool.call_async(lambda base: aio_http.get(f"{base}{path}", **kwargs))
+
+
+async def _post_async(path: str, **kwargs):
+    if len(endpoint_pool) < 2:
+        return await aio_http.post(f"{HORIZON_URL}{path}", **kwargs)
+    return await endpoint_pool.call_async(lambda base: aio_http.post(f"{base}{path}", **kwargs), hedge=False)
+
+
+class AccountCache:
     """
+    TTL + LRU cache of Horizon accounts with singleflight misses: while one caller fetches an account,
+    others asking for it wait for that result instead of sending their own request.
+    Only found accounts are cached; a miss that returns None is retried by the next caller.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._inflight: dict[str, list] = {}  # account_id -> [Event, result] of the fetch in progress
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _fresh(self, account_id: str) -> dict | None:
+        """Cached account if still within ttl (moved to the LRU end). Caller holds _lock."""
+        entry = self._entries.get(account_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            del self._entries[account_id]
+            return None
+        self._entries.move_to_end(account_id)
+        return entry[1]
+
+    def put(self, account_id: str, account: dict | None) -> None:
+        if account is None or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[account_id] = (time.monotonic(), account)
+            self._entries.move_to_end(account_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, account_id: str) -> dict | None:
+        """Cached account or None, counting a hit."""
+        with self._lock:
+            account = self._fresh(account_id)
+            if account is not None:
+                self.hits += 1
+            return account
+
+    def get(self, account_id: str, fetch) -> dict | None:
+        """Cached account, else fetch(account_id) once for all concurrent callers."""
+        with self._lock:
+            account = self._fresh(account_id)
+            if account is not None:
+                self.hits += 1
+                return account
+            flight = self._inflight.get(account_id)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[account_id] = [threading.Event(), None]
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight[0].wait()
+            return flight[1]
+        try:
+            flight[1] = fetch(account_id)
+            self.put(account_id, flight[1])
+            return flight[1]
+        finally:
+            with self._lock:
+                del self._inflight[account_id]
+            flight[0].set()
+
+    def invalidate(self, account_id: str) -> None:
+        with self._lock:
+            self._entries.pop(account_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "max_size": self.maxsize,
+        }
+
+
+account_cache = AccountCache(HORIZON_ACCOUNT_CACHE_TTL_SECONDS, HORIZON_ACCOUNT_CACHE_SIZE)
+
+
+def invalidate_account(account_id: str) -> None:
+    """Drop a cached account, e.g. before building a transaction that needs its current sequence number."""
+    account_cache.invalidate(account_id)
+
+
+def _fetch_account(account_id: str) -> dict | None:
     try:
-        r = requests.get(f"{HORIZON_URL}/accounts/{account_id}", timeout=10)
+        with metrics.outbound("horizon", "get_account") as call:
+            r = _get(f"/accounts/{account_id}", timeout=10)
+            call.status = r.status_code
+        limiter.observe(r.status_code, r.headers)
         if r.status_code != 200:
             return None
         return r.json()
@@ -19,26 +167,64 @@ def get_account(account_id: str) -> dict | None:
         return None
 
 
+def get_account(account_id: str, fresh: bool = False) -> dict | None:
+    """
+    Return full account from Horizon (balances, subentry_count, sequence, etc.)
+    for building sweep transaction on claim page. Served from account_cache when fresh.
+    fresh=True skips the cached copy (and refreshes it): use it whenever a transaction is built from the
+    account's sequence number, since a cached one goes stale as soon as the account submits anything.
+    """
+    if fresh:
+        invalidate_account(account_id)
+    return account_cache.get(account_id, _fetch_account)
+
+
+class RateLimited(Exception):
+    """Horizon answered 429 Too Many Requests."""
+
+
 def get_last_activity(account_id: str) -> str | None:
     """
     Return last transaction created_at (ISO) for account, or None.
     GET /accounts/{id}/transactions?order=desc&limit=1
+    Raises RateLimited on a 429, so the caller can retry later instead of reading it as no activity.
     """
     try:
-        r = requests.get(
-            f"{HORIZON_URL}/accounts/{account_id}/transactions",
-            params={"order": "desc", "limit": 1},
-            timeout=10,
-        )
-        if r.status_code != 200:
-            return None
-        data = r.json()
-        recs = data.get("_embedded", {}).get("records", [])
-        if not recs:
-            return None
-        return recs[0].get("created_at")
+        with metrics.outbound("horizon", "get_last_activity") as call:
+            r = _get(
+                f"/accounts/{account_id}/transactions",
+                params={"order": "desc", "limit": 1},
+                timeout=10,
+            )
+            call.status = r.status_code
     except Exception:
         return None
+    limiter.observe(r.status_code, r.headers)
+    if r.status_code == 429:
+        raise RateLimited(account_id)
+    if r.status_code != 200:
+        return None
+    try:
+        recs = r.json().get("_embedded", {}).get("records", [])
+    except Exception:
+        return None
+    if not recs:
+        return None
+    return recs[0].get("created_at")
+
+
+def _invalidate_source(envelope_xdr: str) -> None:
+    """Drop the cached source account of a submitted transaction (its sequence number has moved on)."""
+    from config import NETWORK_PASSPHRASE
+    from stellar_sdk import FeeBumpTransactionEnvelope, TransactionBuilder
+
+    try:
+        envelope = TransactionBuilder.from_xdr(envelope_xdr.strip(), NETWORK_PASSPHRASE)
+    except Exception:
+        return
+    if isinstance(envelope, FeeBumpTransactionEnvelope):
+        envelope = envelope.transaction.inner_transaction_envelope
+    invalidate_account(envelope.transaction.source.account_id)
 
 
 def submit_transaction(envelope_xdr: str) -> dict:
@@ -46,11 +232,70 @@ def submit_transaction(envelope_xdr: str) -> dict:
     Submit a signed classic transaction envelope to Horizon. Returns Horizon response dict.
     Horizon expects POST body: tx=<base64_xdr> (application/x-www-form-urlencoded).
     """
-    r = requests.post(
-        f"{HORIZON_URL}/transactions",
-        data={"tx": envelope_xdr.strip()},
-        timeout=30,
-    )
+    with metrics.outbound("horizon", "submit_transaction") as call:
+        r = _post(
+            "/transactions",
+            data={"tx": envelope_xdr.strip()},
+            timeout=30,
+        )
+        call.status = r.status_code
+    limiter.observe(r.status_code, r.headers)
+    _invalidate_source(envelope_xdr)
+    try:
+        return r.json()
+    except Exception:
+        return {"error": r.text or str(r.status_code)}
+
+
+_inflight_async: dict = {}
+
+
+async def _fetch_account_async(account_id: str) -> dict | None:
+    try:
+        with metrics.outbound("horizon", "get_account") as call:
+            r = await _get_async(f"/accounts/{account_id}", timeout=10)
+            call.status = r.status_code
+        limiter.observe(r.status_code, r.headers)
+        if r.status_code != 200:
+            return None
+        return r.json()
+    except Exception:
+        return None
+
+
+async def get_account_async(account_id: str, fresh: bool = False) -> dict | None:
+    """get_account() without blocking the event loop; same cache, misses coalesced per event loop."""
+    if fresh:
+        invalidate_account(account_id)
+    account = account_cache.lookup(account_id)
+    if account is not None:
+        return account
+    key = (asyncio.get_running_loop(), account_id)
+    task = _inflight_async.get(key)
+    if task is not None:
+        account_cache.coalesced += 1
+        return await asyncio.shield(task)
+    account_cache.misses += 1
+    task = _inflight_async[key] = asyncio.ensure_future(_fetch_account_async(account_id))
+    try:
+        account = await asyncio.shield(task)
+    finally:
+        _inflight_async.pop(key, None)
+    account_cache.put(account_id, account)
+    return account
+
+
+async def submit_transaction_async(envelope_xdr: str) -> dict:
+    """submit_transaction() without blocking the event loop."""
+    with metrics.outbound("horizon", "submit_transaction") as call:
+        r = await _post_async(
+            "/transactions",
+            data={"tx": envelope_xdr.strip()},
+            timeout=30,
+        )
+        call.status = r.status_code
+    limiter.observe(r.status_code, r.headers)
+    _invalidate_source(envelope_xdr)
     try:
         return r.json()
     except Exception:
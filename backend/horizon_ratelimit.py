@@ -0,0 +1,163 @@
+"""
+Adaptive concurrency for Horizon lookups, driven by its rate-limit headers.
+Every Horizon response (horizon_client) is fed to limiter.observe(): X-RateLimit-Limit / -Remaining /
+-Reset are recorded, and the allowed number of concurrent lookups follows AIMD: +1 per window of `limit`
+successful responses, halved (HORIZON_AIMD_DECREASE) on a 429 or when the remaining budget falls under
+HORIZON_RATELIMIT_LOW_WATERMARK of the window. A 429, or an exhausted budget, pauses new lookups until the
+window resets (Reset / Retry-After, else HORIZON_RATELIMIT_COOLDOWN_SECONDS).
+The inactivity scheduler takes a slot per lookup (acquire/release); a lookup that cannot get one within
+HORIZON_RATELIMIT_MAX_WAIT_SECONDS, or is answered 429, is deferred to a later cycle rather than read as
+"no activity".
+"""
+import threading
+import time
+
+import metrics
+from config import (
+    HORIZON_AIMD_DECREASE,
+    HORIZON_AIMD_MIN_CONCURRENCY,
+    HORIZON_LOOKUP_CONCURRENCY,
+    HORIZON_RATELIMIT_COOLDOWN_SECONDS,
+    HORIZON_RATELIMIT_LOW_WATERMARK,
+)
+
+
+def _header_number(headers, name: str) -> float | None:
+    """Numeric header value (headers may be a case-insensitive mapping or a plain dict), else None."""
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    if not isinstance(value, (str, bytes, int, float)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class AimdLimiter:
+    """Concurrency limit in [min_limit, max_limit] with additive increase / multiplicative decrease."""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease: float = 0.5, low_watermark: float = 0.1,
+                 cooldown: float = 1.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.decrease = decrease
+        self.low_watermark = low_watermark
+        self.cooldown = cooldown
+        self.limit = float(self.max_limit)
+        self.inflight = 0
+        self.paused_until = 0.0  # monotonic; no new slots before this
+        self.rate_limit = None  # last X-RateLimit-Limit / -Remaining seen, and when the window resets
+        self.rate_remaining = None
+        self.rate_reset_at = None  # unix time
+        self.throttled = 0  # 429 responses
+        self.decreases = 0
+        self.deferred = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def observe(self, status_code, headers) -> None:
+        """Record one Horizon response."""
+        limit = _header_number(headers, "X-RateLimit-Limit")
+        remaining = _header_number(headers, "X-RateLimit-Remaining")
+        reset = _header_number(headers, "X-RateLimit-Reset")  # seconds until the window resets
+        retry_after = _header_number(headers, "Retry-After")
+        now = time.monotonic()
+        with self._cond:
+            if limit is not None:
+                self.rate_limit = int(limit)
+            if remaining is not None:
+                self.rate_remaining = int(remaining)
+            if reset is not None:
+                self.rate_reset_at = time.time() + reset
+            wait = retry_after if retry_after is not None else reset
+            if status_code == 429:
+                self.throttled += 1
+                self._pause(now, wait if wait is not None else self.cooldown)
+                self._decrease(now)
+            elif remaining is not None and limit and remaining < limit * self.low_watermark:
+                self._decrease(now)
+                if remaining <= 0 and wait is not None:
+                    self._pause(now, wait)
+            elif 200 <= (status_code or 0) < 400 and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self._cond.notify()
+
+    def _pause(self, now: float, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, now + max(0.0, seconds))
+
+    def _decrease(self, now: float) -> None:
+        # One decrease per throttling episode: responses to requests sent before the last cut don't count again.
+        if now - self._last_decrease < max(self.cooldown, self.paused_until - now):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease)
+        self.decreases += 1
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take a lookup slot, waiting up to max_wait seconds; False when none frees up in time (caller defers)."""
+        deadline = time.monotonic() + max_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now >= self.paused_until and self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return True
+                # Don't sit out a pause that outlasts the wait budget.
+                if now >= deadline or self.paused_until > deadline:
+                    self.deferred += 1
+                    return False
+                until = self.paused_until if now < self.paused_until else deadline
+                self._cond.wait(min(until, deadline) - now)
+
+    def release(self) -> None:
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify()
+
+    def defer(self) -> None:
+        """Count a lookup deferred after it was answered 429."""
+        with self._cond:
+            self.deferred += 1
+
+    def retry_at(self) -> float:
+        """Unix time when deferred lookups are worth retrying (end of the current pause, or now)."""
+        return time.time() + max(0.0, self.paused_until - time.monotonic())
+
+    def reset(self) -> None:
+        with self._cond:
+            self.limit = float(self.max_limit)
+            self.inflight = 0
+            self.paused_until = self._last_decrease = 0.0
+            self.rate_limit = self.rate_remaining = self.rate_reset_at = None
+            self.throttled = self.decreases = self.deferred = 0
+
+    def state(self) -> dict:
+        with self._cond:
+            paused = max(0.0, self.paused_until - time.monotonic())
+            return {
+                "concurrency_limit": int(self.limit),
+                "concurrency_max": self.max_limit,
+                "concurrency_min": self.min_limit,
+                "inflight": self.inflight,
+                "paused_seconds": round(paused, 3),
+                "rate_limit": self.rate_limit,
+                "rate_remaining": self.rate_remaining,
+                "rate_reset_at": int(self.rate_reset_at) if self.rate_reset_at else None,
+                "throttled": self.throttled,
+                "decreases": self.decreases,
+                "deferred": self.deferred,
+            }
+
+
+limiter = AimdLimiter(
+    HORIZON_LOOKUP_CONCURRENCY,
+    min_limit=HORIZON_AIMD_MIN_CONCURRENCY,
+    decrease=HORIZON_AIMD_DECREASE,
+    low_watermark=HORIZON_RATELIMIT_LOW_WATERMARK,
+    cooldown=HORIZON_RATELIMIT_COOLDOWN_SECONDS,
+)
+
+metrics.HORIZON_CONCURRENCY_LIMIT.set_function(lambda: int(limiter.limit))
+metrics.HORIZON_RATE_REMAINING.set_function(lambda: limiter.rate_remaining)
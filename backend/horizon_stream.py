@@ -0,0 +1,165 @@
+"""
+Horizon stream ingestion: one SSE stream of /operations instead of polling every depositor.
+Operations whose participants include a watched nominees.depositor_account_id update
+nominees.last_activity_at. The stream cursor is checkpointed in SQLite in the same
+transaction as those updates, so a restart resumes exactly where the last flush left off.
+"""
+import json
+import logging
+import time
+
+import http_session
+from config import HORIZON_STREAM_FLUSH_SECONDS, HORIZON_URL
+
+LOG = logging.getLogger(__name__)
+
+CURSOR_NAME = "horizon_operations"
+
+# Operation record fields that hold an account taking part in the operation
+# (source_account is always set by Horizon, defaulting to the transaction source).
+PARTICIPANT_FIELDS = ("source_account", "from", "to", "funder", "account", "into", "trustor", "trustee")
+
+
+def iter_sse(lines):
+    """
+    Parse Server-Sent Events from an iterable of text lines.
+    Yields (event_id, data_str) per event; comments and retry hints are skipped.
+    """
+    event_id = None
+    data = []
+    for line in lines:
+        if line is None:
+            continue
+        if line == "":
+            if data:
+                yield event_id, "\n".join(data)
+            event_id = None
+            data = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            data.append(value)
+        elif field == "id":
+            event_id = value
+    if data:
+        yield event_id, "\n".join(data)
+
+
+def operation_accounts(op: dict) -> set[str]:
+    """Return the set of G... accounts that take part in a Horizon operation record."""
+    out = set()
+    for field in PARTICIPANT_FIELDS:
+        value = op.get(field)
+        if isinstance(value, str) and value.startswith("G"):
+            out.add(value)
+    return out
+
+
+def load_cursor(db, name: str = CURSOR_NAME) -> str | None:
+    row = db.execute("SELECT cursor FROM stream_cursors WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+class _Watchlist:
+    """Watched depositor accounts, refreshed incrementally by nominees.id (registrations only add rows)."""
+
+    def __init__(self):
+        self.accounts: set[str] = set()
+        self.max_id = 0
+
+    def refresh(self, db) -> None:
+        rows = db.execute(
+            "SELECT id, depositor_account_id FROM nominees WHERE id > ? ORDER BY id", (self.max_id,)
+        ).fetchall()
+        for nominee_id, account in rows:
+            self.accounts.add(account)
+            self.max_id = nominee_id
+
+
+def flush(db, cursor: str | None, activity: dict[str, str], name: str = CURSOR_NAME) -> None:
+    """Apply buffered last-activity updates and advance the checkpoint in one transaction."""
+    with db:
+        if activity:
+            db.executemany(
+                """
+                UPDATE nominees SET last_activity_at = ?
+                WHERE depositor_account_id = ? AND (last_activity_at IS NULL OR last_activity_at < ?)
+                """,
+                [(ts, account, ts) for account, ts in activity.items()],
+            )
+        if cursor:
+            db.execute(
+                """
+                INSERT INTO stream_cursors (name, cursor, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(name) DO UPDATE SET cursor = excluded.cursor, updated_at = excluded.updated_at
+                """,
+                (name, cursor),
+            )
+
+
+def ingest(db, events, watchlist: _Watchlist | None = None, flush_seconds: float = HORIZON_STREAM_FLUSH_SECONDS, stop_event=None) -> str | None:
+    """
+    Consume (event_id, data_str) pairs from the operations stream and persist matches.
+    Returns the last checkpointed cursor when the event iterator ends.
+    """
+    watchlist = watchlist or _Watchlist()
+    watchlist.refresh(db)
+    pending: dict[str, str] = {}
+    cursor = None
+    last_flush = time.monotonic()
+    for event_id, data in events:
+        if stop_event and stop_event.is_set():
+            break
+        try:
+            op = json.loads(data)
+        except ValueError:
+            continue
+        if not isinstance(op, dict):
+            continue  # the initial "hello" message
+        created_at = op.get("created_at")
+        if created_at:
+            for account in operation_accounts(op) & watchlist.accounts:
+                if account not in pending or pending[account] < created_at:
+                    pending[account] = created_at
+        cursor = op.get("paging_token") or event_id or cursor
+        if time.monotonic() - last_flush >= flush_seconds:
+            flush(db, cursor, pending)
+            pending = {}
+            last_flush = time.monotonic()
+            watchlist.refresh(db)
+    flush(db, cursor, pending)
+    return cursor
+
+
+def run_forever(connect, stop_event=None) -> None:
+    """
+    Stream Horizon /operations from the checkpointed cursor (or "now" on first start), reconnecting with backoff.
+    connect is a zero-argument callable returning a sqlite3 connection.
+    """
+    db = connect()
+    watchlist = _Watchlist()
+    backoff = 1.0
+    LOG.info("Horizon stream ingestion started")
+    while not (stop_event and stop_event.is_set()):
+        cursor = load_cursor(db) or "now"
+        try:
+            # Long-lived stream: use the pooled session but keep a stream-specific read timeout.
+            url = f"{HORIZON_URL}/operations"
+            with http_session.session_for(url).get(
+                url,
+                params={"cursor": cursor},
+                headers={"Accept": "text/event-stream"},
+                stream=True,
+                timeout=(10, 60),
+            ) as r:
+                r.raise_for_status()
+                backoff = 1.0
+                ingest(db, iter_sse(r.iter_lines(decode_unicode=True)), watchlist, stop_event=stop_event)
+        except Exception as e:
+            LOG.warning("Horizon stream interrupted at cursor %s: %s", cursor, e)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
@@ -0,0 +1,110 @@
+"""
+Shared outbound HTTP layer for horizon_client, sms_client and onmeta_client.
+One requests.Session per host, so connections (TCP + TLS) are kept alive and reused across calls
+and threads. Adds retries with jittered exponential backoff on 429/5xx and per-host timeouts.
+Callers that handle 429 themselves (Horizon reads, which feed horizon_ratelimit) pass retry_429=False:
+they get a second session per host whose retries leave 429 responses alone.
+"""
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    HTTP_BACKOFF_FACTOR,
+    HTTP_DEFAULT_TIMEOUT,
+    HTTP_HOST_TIMEOUTS,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES,
+)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitterRetry(Retry):
+    """
+    urllib3 Retry with full jitter: sleep a random time in [0, exponential backoff].
+    5xx is only retried for idempotent methods; 429 (rejected, not processed) is retried for any method.
+    """
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+    def is_retry(self, method, status_code, has_retry_after=False) -> bool:
+        if status_code == 429:  # only when listed: Retry.is_retry would also retry any 429 with Retry-After
+            return bool(self.total and self.status_forcelist and 429 in self.status_forcelist)
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _build_session(retry_429: bool = True) -> requests.Session:
+    retry = JitterRetry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        status_forcelist=RETRY_STATUSES if retry_429 else tuple(s for s in RETRY_STATUSES if s != 429),
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last response back; callers already check status codes
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_sessions: dict[tuple[str, bool], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def session_for(url: str, retry_429: bool = True) -> requests.Session:
+    """Return the shared keep-alive session for the URL's scheme + host (and 429 retry policy)."""
+    key = (_host_key(url), retry_429)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = _build_session(retry_429)
+    return session
+
+
+def timeout_for(url: str, default: float | tuple | None = None):
+    """HTTP_HOST_TIMEOUTS entry for the URL's host if set, else the caller's default, else HTTP_DEFAULT_TIMEOUT."""
+    host = (urlsplit(url).hostname or "").lower()
+    if host in HTTP_HOST_TIMEOUTS:
+        return HTTP_HOST_TIMEOUTS[host]
+    return default if default is not None else HTTP_DEFAULT_TIMEOUT
+
+
+def request(method: str, url: str, retry_429: bool = True, **kwargs) -> requests.Response:
+    """Like requests.request, over the pooled session for the URL's host. retry_429=False returns a 429 at once."""
+    kwargs["timeout"] = timeout_for(url, kwargs.get("timeout"))
+    return session_for(url, retry_429).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def close_all() -> None:
+    """Close every pooled session (e.g. in tests or at shutdown)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pick KDF_ITERATIONS for a latency budget.
+Registration derives the key once on the server (kdf_pool); a claim derives it once in the nominee's
+browser, often a low-end phone. This measures the server's PBKDF2-SHA256 speed, takes the browser's
+speed from a measurement (--browser-ms-per-100k, see --browser-snippet) or a reference slowdown factor,
+and recommends the most iterations that keep both derives within budget.
+
+Usage:
+  python kdf_calibrate.py                                   # server measured, phone = server x 6
+  python kdf_calibrate.py --browser-snippet                 # JS to run in a phone's browser console
+  python kdf_calibrate.py --browser-ms-per-100k 900 --claim-budget-ms 2000 --register-budget-ms 150
+Set the printed KDF_ITERATIONS in .env; existing records keep the parameters stored with them.
+"""
+import argparse
+import hashlib
+import json
+import os
+import secrets
+import statistics
+import sys
+import time
+
+# Reference low-end phone: WebCrypto PBKDF2 on a budget Android device vs one server core (rough ratio;
+# measure a real device with --browser-snippet when it matters).
+REFERENCE_PHONE_FACTOR = 6.0
+PROBE_ITERATIONS = 50_000
+ITERATION_STEP = 10_000
+
+BROWSER_SNIPPET = """(async () => {
+  const enc = new TextEncoder(), salt = crypto.getRandomValues(new Uint8Array(16)), runs = [];
+  const key = await crypto.subtle.importKey('raw', enc.encode('calibrate'), 'PBKDF2', false, ['deriveBits']);
+  for (let i = 0; i < 5; i++) {
+    const t = performance.now();
+    await crypto.subtle.deriveBits({name: 'PBKDF2', salt, iterations: 100000, hash: 'SHA-256'}, key, 256);
+    runs.push(performance.now() - t);
+  }
+  runs.sort((a, b) => a - b);
+  console.log('ms per 100k iterations (median):', runs[2].toFixed(1));
+})();"""
+
+
+def measure_server_ms_per_100k(runs: int = 5, iterations: int = PROBE_ITERATIONS) -> float:
+    """Median wall time of one PBKDF2-HMAC-SHA256 derive on this machine, scaled to 100k iterations."""
+    salt = secrets.token_bytes(16)
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"calibrate", salt, iterations, dklen=32)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000 * 100_000 / iterations
+
+
+def recommend_iterations(
+    server_ms_per_100k: float,
+    browser_ms_per_100k: float,
+    claim_budget_ms: float,
+    register_budget_ms: float,
+    min_iterations: int = 100_000,
+    step: int = ITERATION_STEP,
+) -> dict:
+    """
+    Most iterations (a multiple of step) with browser derive <= claim_budget_ms and server derive
+    <= register_budget_ms. Never below min_iterations; "within_budget" is False when that floor wins.
+    """
+    by_claim = claim_budget_ms / browser_ms_per_100k * 100_000
+    by_register = register_budget_ms / server_ms_per_100k * 100_000
+    fit = int(min(by_claim, by_register) // step * step)
+    iterations = max(fit, min_iterations)
+    return {
+        "iterations": iterations,
+        "limited_by": "claim" if by_claim <= by_register else "register",
+        "within_budget": fit >= min_iterations,
+        "server_ms": round(server_ms_per_100k * iterations / 100_000, 1),
+        "browser_ms": round(browser_ms_per_100k * iterations / 100_000, 1),
+        # One kdf_pool worker process does about this many registrations per second.
+        "registrations_per_sec_per_worker": round(1000 / (server_ms_per_100k * iterations / 100_000), 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pick KDF_ITERATIONS for a latency budget.")
+    parser.add_argument("--claim-budget-ms", type=float, default=1500, help="max key derive time in the browser")
+    parser.add_argument("--register-budget-ms", type=float, default=200, help="max key derive time on the server")
+    parser.add_argument("--browser-ms-per-100k", type=float, help="measured browser time (see --browser-snippet)")
+    parser.add_argument("--browser-factor", type=float, default=REFERENCE_PHONE_FACTOR,
+                        help="browser slowdown vs this server when not measured")
+    parser.add_argument("--min-iterations", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--browser-snippet", action="store_true", help="print the JS measurement snippet and exit")
+    args = parser.parse_args(argv)
+
+    if args.browser_snippet:
+        print(BROWSER_SNIPPET)
+        return 0
+
+    server = measure_server_ms_per_100k(args.runs)
+    browser = args.browser_ms_per_100k or server * args.browser_factor
+    result = recommend_iterations(server, browser, args.claim_budget_ms, args.register_budget_ms, args.min_iterations)
+    result.update(
+        server_ms_per_100k=round(server, 1),
+        browser_ms_per_100k=round(browser, 1),
+        browser_source="measured" if args.browser_ms_per_100k else f"server x {args.browser_factor}",
+        current_iterations=int(os.environ.get("KDF_ITERATIONS", "100000") or 100_000),
+    )
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"Server:  {result['server_ms_per_100k']} ms per 100k iterations (this machine, median of {args.runs})")
+    print(f"Browser: {result['browser_ms_per_100k']} ms per 100k iterations ({result['browser_source']})")
+    print(
+        f"At {result['iterations']} iterations: register {result['server_ms']} ms, claim {result['browser_ms']} ms, "
+        f"~{result['registrations_per_sec_per_worker']} registrations/s per KDF pool worker "
+        f"(limited by the {result['limited_by']} budget)"
+    )
+    if not result["within_budget"]:
+        print(f"Warning: budgets allow fewer than --min-iterations={args.min_iterations}; using the minimum.",
+              file=sys.stderr)
+    print(f"\nKDF_ITERATIONS={result['iterations']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Nominee registration crypto off the request thread: key_encrypt.encrypt_secret_with_answer (KDF_ITERATIONS
+PBKDF2 rounds) runs in a small process pool, so a registration burst uses other cores instead of holding the
+web worker's GIL. Admission control bounds the work in flight: past KDF_POOL_MAX_PENDING running or
+queued jobs, encrypt() raises PoolBusy (the route answers 503 + Retry-After) instead of queueing more.
+"""
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import key_encrypt
+from config import KDF_POOL_MAX_PENDING, KDF_POOL_TIMEOUT_SECONDS, KDF_POOL_WORKERS
+
+LOG = logging.getLogger(__name__)
+
+
+class PoolBusy(Exception):
+    """Too many KDF jobs in flight; retry_after is a suggested wait in whole seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"KDF pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+_settings = {"workers": KDF_POOL_WORKERS, "max_pending": KDF_POOL_MAX_PENDING}
+_pool: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+_pending = 0
+# Moving average of one job's wall time (seconds), for Retry-After.
+_job_seconds = 0.1
+stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+
+def _encrypt_job(secret_key: str, answer: str, params: dict | None) -> tuple[str, str, str]:
+    """Runs in a worker process."""
+    return key_encrypt.encrypt_secret_with_answer(secret_key, answer, params)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                # spawn, not fork: forking a threaded web worker can copy held locks into the child.
+                _pool = ProcessPoolExecutor(
+                    max_workers=_settings["workers"], mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def configure(workers: int | None = None, max_pending: int | None = None) -> None:
+    """Change pool size / admission limit (benchmarks, tests); the next job starts a new pool."""
+    global _pool
+    with _lock:
+        if workers is not None:
+            _settings["workers"] = workers
+        if max_pending is not None:
+            _settings["max_pending"] = max_pending
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def shutdown() -> None:
+    configure()
+
+
+def _retry_after() -> int:
+    lanes = max(1, _settings["workers"])
+    return max(1, math.ceil(_pending / lanes * _job_seconds))
+
+
+def _admit() -> None:
+    global _pending
+    with _lock:
+        if _pending >= _settings["max_pending"]:
+            stats["rejected"] += 1
+            raise PoolBusy(_retry_after())
+        _pending += 1
+        stats["submitted"] += 1
+
+
+def _done(started: float, ok: bool, jobs: int = 1) -> None:
+    """jobs: how many encryptions the finished task did (its time is averaged per encryption)."""
+    global _pending, _job_seconds
+    with _lock:
+        _pending -= 1
+        stats["completed" if ok else "failed"] += 1
+        if ok:
+            _job_seconds = 0.8 * _job_seconds + 0.2 * (time.monotonic() - started) / max(1, jobs)
+
+
+def _track(future: Future, started: float, jobs: int = 1) -> None:
+    """Release the task's pending slot when it really ends: a job that timed out keeps its worker busy."""
+    future.add_done_callback(lambda f: _done(started, not f.cancelled() and f.exception() is None, jobs))
+
+
+def _pool_broken() -> None:
+    global _pool
+    LOG.warning("KDF pool broken (worker died); restarting it")
+    with _lock:
+        _pool = None
+
+
+def encrypt(secret_key: str, answer: str, params: dict | None = None) -> tuple[str, str, str]:
+    """
+    key_encrypt.encrypt_secret_with_answer in the pool (inline when KDF_POOL_WORKERS=0).
+    Raises PoolBusy when saturated; other errors propagate as from the inline call.
+    """
+    _admit()
+    started = time.monotonic()
+    if _settings["workers"] <= 0:
+        ok = False
+        try:
+            result = key_encrypt.encrypt_secret_with_answer(secret_key, answer, params)
+            ok = True
+            return result
+        finally:
+            _done(started, ok)
+    try:
+        future = _get_pool().submit(_encrypt_job, secret_key, answer, params)
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _pool_broken()
+        _done(started, False)
+        raise
+    _track(future, started)
+    try:
+        return future.result(timeout=KDF_POOL_TIMEOUT_SECONDS)
+    except BrokenProcessPool:
+        _pool_broken()
+        raise
+
+
+def submit(fn, *args, jobs: int = 1) -> Future:
+    """
+    Run fn(*args) in the pool (inline when KDF_POOL_WORKERS=0) without admission control, for callers
+    that bound their own in-flight work (nominee_import). Counted in pending while it runs, so
+    single registrations see the load. fn must be a module-level function (it is pickled by name);
+    jobs is how many encryptions it does, for the per-job time average.
+    Raises if the pool cannot take the task (e.g. BrokenProcessPool; the pool is restarted on next use).
+    """
+    global _pending
+    with _lock:
+        _pending += 1
+        stats["submitted"] += 1
+    started = time.monotonic()
+    if _settings["workers"] <= 0:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+    else:
+        try:
+            future = _get_pool().submit(fn, *args)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _pool_broken()
+            _done(started, False)
+            raise
+    _track(future, started, jobs)
+    return future
+
+
+def workers() -> int:
+    return _settings["workers"]
+
+
+def snapshot() -> dict:
+    """Current settings, in-flight count and counters."""
+    return {**_settings, "pending": _pending, "job_seconds": round(_job_seconds, 4), **stats}
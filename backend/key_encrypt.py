@@ -2,34 +2,59 @@
 Nominee flow: derive key from answer (KDF), encrypt sweep secret key.
 Decryption happens in the browser; we only encrypt and store ciphertext here.
 KDF + AES-GCM so the same can be done in JS (Web Crypto API).
+Each nominee record stores the KDF parameters its ciphertext was made with (nominees.kdf_params), so
+KDF_ITERATIONS can be retuned (see kdf_calibrate.py) without breaking existing claims; records from
+before that column use LEGACY_KDF_PARAMS.
 """
 import base64
 import hashlib
+import json
 import os
 import secrets
 from typing import Tuple
 
-# PBKDF2 params (must match claim page JS)
-KDF_ITERATIONS = 100_000
+from config import KDF_ITERATIONS
+
+KDF_ALGORITHM = "PBKDF2-SHA256"  # the only algorithm the claim page implements
+KDF_PARAMS_VERSION = 1
 KDF_KEY_LENGTH = 32  # AES-256
 SALT_LENGTH = 16
 NONCE_LENGTH = 12
 
+# Parameters of every record written before they were stored per record.
+LEGACY_KDF_PARAMS = {
+    "version": KDF_PARAMS_VERSION,
+    "algorithm": KDF_ALGORITHM,
+    "iterations": 100_000,
+    "keyLength": KDF_KEY_LENGTH,
+    "saltLength": SALT_LENGTH,
+    "nonceLength": NONCE_LENGTH,
+}
+
+
+def current_kdf_params() -> dict:
+    """Parameters for new records (KDF_ITERATIONS from config)."""
+    return {**LEGACY_KDF_PARAMS, "iterations": KDF_ITERATIONS}
 
-def _derive_key(answer: str, salt: bytes) -> bytes:
+
+def _derive_key(answer: str, salt: bytes, params: dict | None = None) -> bytes:
     """PBKDF2-HMAC-SHA256. Same logic must run in browser."""
+    params = params or LEGACY_KDF_PARAMS
+    if params.get("algorithm", KDF_ALGORITHM) != KDF_ALGORITHM:
+        raise ValueError(f"Unsupported KDF algorithm: {params.get('algorithm')}")
     return hashlib.pbkdf2_hmac(
         "sha256",
         answer.encode("utf-8"),
         salt,
-        KDF_ITERATIONS,
-        dklen=KDF_KEY_LENGTH,
+        int(params["iterations"]),
+        dklen=int(params.get("keyLength", KDF_KEY_LENGTH)),
     )
 
 
-def encrypt_secret_with_answer(secret_key: str, answer: str) -> Tuple[str, str, str]:
+def encrypt_secret_with_answer(secret_key: str, answer: str, params: dict | None = None) -> Tuple[str, str, str]:
     """
-    Encrypt a Stellar secret key (S...) with the answer.
+    Encrypt a Stellar secret key (S...) with the answer, deriving the key with params
+    (default: current_kdf_params(); store them with the record).
     Returns (ciphertext_b64, nonce_b64, salt_b64) for storage.
     """
     try:
@@ -37,9 +62,10 @@ def encrypt_secret_with_answer(secret_key: str, answer: str) -> Tuple[str, str,
     except ImportError:
         raise RuntimeError("cryptography package required: pip install cryptography")
 
-    salt = secrets.token_bytes(SALT_LENGTH)
-    nonce = secrets.token_bytes(NONCE_LENGTH)
-    key = _derive_key(answer, salt)
+    params = params or current_kdf_params()
+    salt = secrets.token_bytes(int(params.get("saltLength", SALT_LENGTH)))
+    nonce = secrets.token_bytes(int(params.get("nonceLength", NONCE_LENGTH)))
+    key = _derive_key(answer, salt, params)
     aes = AESGCM(key)
     plaintext = secret_key.encode("utf-8")
     ciphertext = aes.encrypt(nonce, plaintext, None)
@@ -50,11 +76,11 @@ def encrypt_secret_with_answer(secret_key: str, answer: str) -> Tuple[str, str,
     )
 
 
-def get_kdf_params() -> dict:
-    """Return KDF params for the claim page so JS can derive the same key."""
-    return {
-        "iterations": KDF_ITERATIONS,
-        "keyLength": KDF_KEY_LENGTH,
-        "saltLength": SALT_LENGTH,
-        "nonceLength": NONCE_LENGTH,
-    }
+def get_kdf_params(stored: str | None = None) -> dict:
+    """
+    KDF params for the claim page so JS can derive the same key: the record's stored params
+    (nominees.kdf_params JSON), or LEGACY_KDF_PARAMS for records that predate them.
+    """
+    if not stored:
+        return dict(LEGACY_KDF_PARAMS)
+    return {**LEGACY_KDF_PARAMS, **json.loads(stored)}
@@ -0,0 +1,255 @@
+"""
+In-process metrics in the Prometheus text exposition format (served by GET /metrics).
+Counters, gauges and fixed-bucket histograms with label values, kept in plain dicts under one lock per
+metric; recording a sample costs a dict lookup and a few additions. Values are per process: with
+several gunicorn workers, scrape each worker or keep WEB_CONCURRENCY=1.
+
+Instrumented: outbound calls (horizon_client, soroban_client, sms_client, onmeta_client) via outbound(),
+SQLite statements on pooled connections (db.py), and the inactivity scheduler's cycles (app.py).
+Outbound and SQLite times also feed the current request's timing spans (timing.py).
+Per-endpoint latency and health of multi-endpoint services are in endpoints.py (GET /api/endpoints).
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+import timing
+
+# Seconds; covers a sub-millisecond SQLite read up to a Horizon call that times out.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CYCLE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+_registry: list["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labelvalues) -> tuple:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        return tuple(map(str, labelvalues))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(self._key(labelvalues), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """A gauge set directly, or read from a callback at scrape time (set_function; no labels)."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._function = None
+
+    def set(self, value: float, *labelvalues) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn) -> None:
+        self._function = fn
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_number(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues) -> None:
+        key = self._key(labelvalues)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labelvalues) -> int:
+        state = self._values.get(self._key(labelvalues))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = []
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip((*self.buckets, float("inf")), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+def reset() -> None:
+    """Clear every recorded value (tests)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    for m in metrics:
+        m.clear()
+
+
+OUTBOUND_REQUESTS = Counter(
+    "walletsurance_outbound_requests_total",
+    "Calls to external services by outcome (HTTP status code, ok, or error for an exception).",
+    ("service", "operation", "status"),
+)
+OUTBOUND_LATENCY = Histogram(
+    "walletsurance_outbound_request_duration_seconds",
+    "Latency of calls to external services, including the HTTP layer's retries.",
+    ("service", "operation"),
+)
+DB_LATENCY = Histogram(
+    "walletsurance_db_query_duration_seconds",
+    "SQLite execute()/executemany() time by statement type (for a SELECT: up to the first row).",
+    ("statement",),
+)
+DB_ERRORS = Counter("walletsurance_db_query_errors_total", "SQLite statements that raised, by statement type.",
+                    ("statement",))
+SCHEDULER_CYCLES = Counter("walletsurance_scheduler_cycles_total", "Inactivity check cycles, by outcome.",
+                           ("status",))
+SCHEDULER_CYCLE_SECONDS = Histogram("walletsurance_scheduler_cycle_duration_seconds",
+                                    "Duration of inactivity check cycles.", buckets=CYCLE_BUCKETS)
+SCHEDULER_NOMINEES = Counter(
+    "walletsurance_scheduler_nominees_total",
+    "Nominees handled by inactivity check cycles: checked (claimed or rescheduled), skipped "
+    "(lease lost to another instance, or already claimed) or deferred (Horizon rate limit).",
+    ("result",),
+)
+HORIZON_CONCURRENCY_LIMIT = Gauge("walletsurance_horizon_lookup_concurrency_limit",
+                                  "Current adaptive limit on concurrent Horizon lookups (horizon_ratelimit).")
+HORIZON_RATE_REMAINING = Gauge("walletsurance_horizon_ratelimit_remaining",
+                               "X-RateLimit-Remaining from the last Horizon response that carried it.")
+HEDGED_REQUESTS = Counter(
+    "walletsurance_hedged_requests_total",
+    "Hedged reads across endpoints (endpoints.py): sent (a duplicate was issued) or won (the duplicate answered first).",
+    ("service", "result"),
+)
+SCHEDULER_LAST_CYCLE = Gauge("walletsurance_scheduler_last_cycle_timestamp_seconds",
+                             "Unix time the last inactivity check cycle finished.")
+
+
+class _Call:
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = "ok"
+
+
+@contextmanager
+def outbound(service: str, operation: str):
+    """
+    Time one external call: `with metrics.outbound("horizon", "get_account") as call: ...`.
+    Set call.status to the HTTP status code when there is one; an exception records status "error".
+    """
+    call = _Call()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        OUTBOUND_LATENCY.observe(elapsed, service, operation)
+        OUTBOUND_REQUESTS.inc(service, operation, call.status)
+        timing.add(service, elapsed)
+
+
+_statement_types: dict[str, str] = {}
+
+
+def statement_type(sql: str) -> str:
+    """First keyword of a SQL statement, upper-cased (SELECT, INSERT, BEGIN, PRAGMA, ...)."""
+    kind = _statement_types.get(sql)
+    if kind is None:
+        word = sql.lstrip()[:16].split(None, 1)
+        kind = word[0].upper() if word else ""
+        if len(_statement_types) < 4096:  # statements are mostly constants; don't grow without bound
+            _statement_types[sql] = kind
+    return kind
+
+
+def observe_db(sql: str, seconds: float, ok: bool = True) -> None:
+    statement = statement_type(sql)
+    DB_LATENCY.observe(seconds, statement)
+    timing.add("db", seconds)
+    if not ok:
+        DB_ERRORS.inc(statement)
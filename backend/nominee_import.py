@@ -0,0 +1,216 @@
+"""
+Bulk nominee import (partner onboarding): the same records as /api/nominee/register, for a stream of
+NDJSON or CSV rows with the register body's fields.
+Rows are read and processed in batches of NOMINEE_IMPORT_BATCH_SIZE: each batch's keypairs are
+generated and their secrets encrypted in one kdf_pool task (secrets never leave the worker process
+unencrypted), at most 2 x KDF_POOL_WORKERS batches are in flight, and each finished batch is inserted
+with one executemany in its own transaction. Results stream back per row in input order, so memory
+stays flat however long the input is. A row for a depositor that already has a nominee replaces it,
+as /api/nominee/register does, and its result says so ("replaced": true).
+
+CLI (writes straight to the database, results as NDJSON on stdout):
+  python -m nominee_import users.csv [--format csv] [--database walletsurance.db]
+"""
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import sys
+from collections import deque
+from concurrent.futures import Future
+from itertools import islice
+
+import kdf_pool
+import key_encrypt
+from config import NOMINEE_IMPORT_BATCH_SIZE
+
+LOG = logging.getLogger(__name__)
+
+INSERT_SQL = """
+    INSERT OR REPLACE INTO nominees
+    (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, kdf_params, question, beneficiary_phone, beneficiary_stellar_address, inactivity_days)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def validate_nominee(data: dict) -> tuple[dict | None, str | None]:
+    """
+    Validate a register body / import row. Returns (fields, None) or (None, error message).
+    fields: depositor, phone, beneficiary_address, question, answer, inactivity_days.
+    """
+    depositor = (data.get("depositor_account_id") or "").strip()
+    phone = (data.get("beneficiary_phone") or "").strip()
+    beneficiary_address = (data.get("beneficiary_stellar_address") or "").strip()
+    question = (data.get("question") or "").strip()
+    answer = (data.get("answer") or "").strip()
+    inactivity_days = data.get("inactivity_days", 30)
+    if isinstance(inactivity_days, str) and inactivity_days.isdigit():
+        inactivity_days = int(inactivity_days)
+    else:
+        try:
+            inactivity_days = int(inactivity_days) if inactivity_days not in (None, "") else 30
+        except (TypeError, ValueError):
+            inactivity_days = 30
+
+    if not depositor or not phone or not question or not answer:
+        return None, "depositor_account_id, beneficiary_phone, question, and answer required"
+    if len(depositor) != 56 or not depositor.startswith("G"):
+        return None, "depositor_account_id must be a Stellar public key (G..., 56 chars)"
+    return {
+        "depositor": depositor,
+        "phone": phone,
+        "beneficiary_address": beneficiary_address,
+        "question": question,
+        "answer": answer,
+        "inactivity_days": inactivity_days,
+    }, None
+
+
+def read_rows(stream, fmt: str = "ndjson"):
+    """Yield (line number, row dict or None if unparsable) from a binary or text stream of NDJSON or CSV."""
+    text = stream if isinstance(stream, io.TextIOBase) else io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def _keypair_batch(answers: list[str], params: dict) -> list[tuple[str, str, str, str]]:
+    """Runs in a kdf_pool worker: (sweep public key, ciphertext, nonce, salt) per answer."""
+    from stellar_sdk import Keypair
+
+    out = []
+    for answer in answers:
+        kp = Keypair.random()
+        out.append((kp.public_key, *key_encrypt.encrypt_secret_with_answer(kp.secret, answer, params)))
+    return out
+
+
+def _finish(db, batch, future, params_json, summary):
+    """Insert one encrypted batch and yield its per-row results in input order."""
+    valid = [entry for entry in batch if "fields" in entry]
+    try:
+        encrypted = future.result() if valid else []
+    except Exception as e:
+        LOG.warning("nominee import: encryption failed for a batch of %s rows: %s", len(valid), e)
+        encrypted = None
+        for entry in valid:
+            entry["error"] = f"Encryption failed: {e}"
+    if encrypted:
+        rows = []
+        for entry, (public, ciphertext_b64, nonce_b64, salt_b64) in zip(valid, encrypted):
+            f = entry.pop("fields")
+            entry["sweep_public_key"] = public
+            entry["depositor_account_id"] = f["depositor"]
+            rows.append((
+                f["depositor"], public, ciphertext_b64, nonce_b64, salt_b64, params_json, f["question"],
+                f["phone"], f["beneficiary_address"] or None, f["inactivity_days"],
+            ))
+        try:
+            with db:
+                depositors = [r[0] for r in rows]
+                seen = {
+                    r[0] for r in db.execute(
+                        f"SELECT depositor_account_id FROM nominees WHERE depositor_account_id IN ({','.join('?' * len(rows))})",
+                        depositors,
+                    )
+                }
+                for entry, depositor in zip(valid, depositors):  # also a repeat of an earlier row in the batch
+                    entry["replaced"] = depositor in seen
+                    seen.add(depositor)
+                db.executemany(INSERT_SQL, rows)
+        except sqlite3.Error as e:
+            LOG.warning("nominee import: insert failed for a batch of %s rows: %s", len(rows), e)
+            for entry in valid:
+                entry.pop("sweep_public_key", None)
+                entry.pop("replaced", None)
+                entry["error"] = f"Database error: {e}"
+    for entry in batch:
+        entry.pop("fields", None)
+        summary["failed" if "error" in entry else "imported"] += 1
+        summary["replaced"] += bool(entry.get("replaced"))
+        yield entry
+
+
+def import_rows(db, rows, batch_size: int = NOMINEE_IMPORT_BATCH_SIZE, window: int | None = None):
+    """
+    Import (line number, row) pairs (see read_rows). Yields one result per row,
+    {"line", "depositor_account_id", "sweep_public_key", "replaced"} or {"line", "error"},
+    then {"summary": {"imported", "failed", "replaced"}}.
+    """
+    params = key_encrypt.current_kdf_params()
+    params_json = json.dumps(params)
+    window = window or 2 * max(1, kdf_pool.workers())
+    summary = {"imported": 0, "failed": 0, "replaced": 0}
+    inflight = deque()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        batch = []
+        for line_no, row in chunk:
+            if row is None:
+                batch.append({"line": line_no, "error": "Invalid row"})
+                continue
+            fields, err = validate_nominee(row)
+            if err:
+                batch.append({"line": line_no, "error": err})
+            else:
+                batch.append({"line": line_no, "fields": fields})
+        answers = [entry["fields"]["answer"] for entry in batch if "fields" in entry]
+        future = None
+        if answers:
+            try:
+                future = kdf_pool.submit(_keypair_batch, answers, params, jobs=len(answers))
+            except Exception as e:  # e.g. BrokenProcessPool: fail this batch's rows, keep importing
+                future = Future()
+                future.set_exception(e)
+        inflight.append((batch, future))
+        if len(inflight) >= window:
+            yield from _finish(db, *inflight.popleft(), params_json, summary)
+    while inflight:
+        yield from _finish(db, *inflight.popleft(), params_json, summary)
+    yield {"summary": summary}
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    import app as web
+    from db import connect
+
+    parser = argparse.ArgumentParser(description="Bulk-import nominees from NDJSON or CSV.")
+    parser.add_argument("path", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=("ndjson", "csv"), help="default: from the file extension")
+    parser.add_argument("--database", default=os.environ.get("DATABASE_PATH", "walletsurance.db"))
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    web.app.config["DATABASE"] = args.database
+    web.init_db()
+    stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    db = connect(args.database)
+    try:
+        for result in import_rows(db, read_rows(stream, fmt)):
+            print(json.dumps(result), flush="summary" in result)
+    finally:
+        stream.close()
+        db.close()
+        kdf_pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,26 +5,15 @@ API ref: https://documenter.getpostman.com/view/20857383/UzXNTwpM
 """
 import os
 import uuid
-import requests
+
+import http_session
+import metrics
 from config import ONMETA_BASE_URL, ONMETA_API_KEY
 
 
-def create_offramp_order(
-    *,
-    sell_token_symbol: str = "XLM",
-    chain_id: int = 1,
-    fiat_currency: str = "inr",
-    fiat_amount: float,
-    payment_mode: str = "INR_IMPS",
-    account_number: str,
-    account_name: str,
-    ifsc: str,
-    metadata: dict | None = None,
+def _order_body(
+    *, sell_token_symbol, chain_id, fiat_currency, fiat_amount, payment_mode, account_number, account_name, ifsc, metadata,
 ) -> dict:
-    """
-    Create an off-ramp order (crypto → INR bank payout).
-    If ONMETA_BASE_URL and ONMETA_API_KEY are set, calls real Onmeta; else returns mock.
-    """
     body = {
         "sellTokenSymbol": sell_token_symbol,
         "chainId": chain_id,
@@ -39,29 +28,61 @@ def create_offramp_order(
     }
     if metadata:
         body["metaData"] = metadata
+    return body
+
+
+def _order_request(body: dict) -> dict:
+    """URL, JSON body and headers for the real Onmeta order endpoint."""
+    return {
+        "url": f"{ONMETA_BASE_URL.rstrip('/')}/v1/offramp/order",
+        "json": body,
+        "headers": {
+            "x-api-key": ONMETA_API_KEY,
+            "Authorization": f"Bearer {ONMETA_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        "timeout": 30,
+    }
 
-    if ONMETA_BASE_URL and ONMETA_API_KEY:
-        # Real Onmeta API
-        url = f"{ONMETA_BASE_URL.rstrip('/')}/v1/offramp/order"
-        resp = requests.post(
-            url,
-            json=body,
-            headers={
-                "x-api-key": ONMETA_API_KEY,
-                "Authorization": f"Bearer {ONMETA_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            timeout=30,
-        )
-        resp.raise_for_status()
-        return resp.json()
 
+def _mock_order(body: dict) -> dict:
     # Mock response (same shape as Onmeta for swap-in later)
     return {
         "orderId": f"mock-order-{uuid.uuid4().hex[:12]}",
         "status": "created",
-        "fiatAmount": fiat_amount,
-        "fiatCurrency": fiat_currency,
-        "paymentMode": payment_mode,
+        "fiatAmount": body["fiatAmount"],
+        "fiatCurrency": body["fiatCurrency"],
+        "paymentMode": body["paymentMode"],
         "message": "Mock Onmeta Off-Ramp order (set ONMETA_BASE_URL and ONMETA_API_KEY for real).",
     }
+
+
+def create_offramp_order(
+    *,
+    sell_token_symbol: str = "XLM",
+    chain_id: int = 1,
+    fiat_currency: str = "inr",
+    fiat_amount: float,
+    payment_mode: str = "INR_IMPS",
+    account_number: str,
+    account_name: str,
+    ifsc: str,
+    metadata: dict | None = None,
+) -> dict:
+    """
+    Create an off-ramp order (crypto → INR bank payout).
+    If ONMETA_BASE_URL and ONMETA_API_KEY are set, calls real Onmeta; else returns mock.
+    """
+    body = _order_body(
+        sell_token_symbol=sell_token_symbol, chain_id=chain_id, fiat_currency=fiat_currency,
+        fiat_amount=fiat_amount, payment_mode=payment_mode, account_number=account_number,
+        account_name=account_name, ifsc=ifsc, metadata=metadata,
+    )
+    if ONMETA_BASE_URL and ONMETA_API_KEY:
+        # Real Onmeta API
+        with metrics.outbound("onmeta", "create_offramp_order") as call:
+            resp = http_session.post(**_order_request(body))
+            call.status = resp.status_code
+        resp.raise_for_status()
+        return resp.json()
+    return _mock_order(body)
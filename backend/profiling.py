@@ -0,0 +1,130 @@
+"""
+Sampled cProfile capture for requests and inactivity check cycles. A configurable fraction of requests
+(optionally only paths under a prefix) and of scheduler cycles runs under cProfile; each capture is saved
+as <PROFILE_DIR>/<kind>-<name>-<timestamp>-<n>-<ms>ms.prof (open with snakeviz, or python -m pstats) and only
+the newest PROFILE_MAX_FILES are kept. At most one profile runs at a time per process, since cProfile
+hooks the interpreter and overlapping captures would mix their stacks.
+Sample rates start from PROFILE_REQUEST_RATE / PROFILE_CYCLE_RATE and can be changed at runtime through
+the admin endpoint (POST /api/admin/profiling).
+"""
+import cProfile
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from config import PROFILE_CYCLE_RATE, PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_REQUEST_RATE
+
+LOG = logging.getLogger(__name__)
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+\.prof$")
+
+_settings = {"request_rate": PROFILE_REQUEST_RATE, "cycle_rate": PROFILE_CYCLE_RATE, "path_prefix": ""}
+_settings_lock = threading.Lock()
+_active = threading.Lock()
+_seq = itertools.count(1)  # keeps file names unique within a second
+
+
+def settings() -> dict:
+    with _settings_lock:
+        return dict(_settings)
+
+
+def configure(request_rate=None, cycle_rate=None, path_prefix=None) -> dict:
+    """Update sampling; rates are clamped to [0, 1]. Returns the new settings."""
+    with _settings_lock:
+        if request_rate is not None:
+            _settings["request_rate"] = min(max(float(request_rate), 0.0), 1.0)
+        if cycle_rate is not None:
+            _settings["cycle_rate"] = min(max(float(cycle_rate), 0.0), 1.0)
+        if path_prefix is not None:
+            _settings["path_prefix"] = str(path_prefix)
+        return dict(_settings)
+
+
+def profile_dir() -> Path:
+    return Path(PROFILE_DIR)
+
+
+def maybe_start(kind: str, name: str = ""):
+    """Start a profile for this request ("request", with name = path) or cycle ("cycle") if sampled; else None."""
+    with _settings_lock:
+        rate = _settings["cycle_rate"] if kind == "cycle" else _settings["request_rate"]
+        prefix = _settings["path_prefix"] if kind == "request" else ""
+    if rate <= 0 or (prefix and not name.startswith(prefix)) or random.random() >= rate:
+        return None
+    if not _active.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler (e.g. a debugger's) is already active in this thread
+        _active.release()
+        return None
+    return profiler, kind, name, time.perf_counter()
+
+
+def stop(handle) -> str | None:
+    """Stop a profile from maybe_start() and save it. Returns the file name, or None."""
+    if handle is None:
+        return None
+    profiler, kind, name, started = handle
+    try:
+        profiler.disable()
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        label = re.sub(r"[^A-Za-z0-9_-]+", "_", name.strip("/")).strip("_")[:60] or "root"
+        filename = f"{kind}-{label}-{time.strftime('%Y%m%dT%H%M%S')}-{next(_seq)}-{elapsed_ms}ms.prof"
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(directory / filename))
+        _prune(directory)
+        return filename
+    except Exception as e:
+        LOG.warning("Could not save profile: %s", e)
+        return None
+    finally:
+        _active.release()
+
+
+def _prune(directory: Path) -> None:
+    files = sorted(directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    for old in files[:-PROFILE_MAX_FILES]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def list_profiles() -> list[dict]:
+    """Saved profiles, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    files = sorted(directory.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [{"name": p.name, "bytes": p.stat().st_size, "created": int(p.stat().st_mtime)} for p in files]
+
+
+def profile_path(name: str) -> Path | None:
+    """Path of a saved profile, or None for a name that is not a plain .prof file in PROFILE_DIR."""
+    if not _NAME_RE.match(name or ""):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def top_functions(name: str, limit: int = 20) -> list[dict] | None:
+    """The limit functions with the highest cumulative time in a saved profile."""
+    import pstats
+
+    path = profile_path(name)
+    if path is None:
+        return None
+    stats = pstats.Stats(str(path))
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {"function": f"{file}:{line}({func})", "calls": nc, "tottime": round(tt, 6), "cumtime": round(ct, 6)}
+        for (file, line, func), (cc, nc, tt, ct, _callers) in rows
+    ]
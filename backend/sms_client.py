@@ -3,7 +3,9 @@ Send SMS (Twilio). If Twilio not configured, log only (mock).
 """
 import logging
 import secrets
-from config import CLAIM_BASE_URL, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER
+
+import metrics
+from config import CLAIM_BASE_URL, TWILIO_ACCOUNT_SID, TWILIO_API_BASE, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER
 
 LOG = logging.getLogger(__name__)
 
@@ -26,13 +28,15 @@ def send_nominee_claim_sms(phone: str, claim_token: str, question_preview: str =
         return True
 
     try:
-        import requests
-        r = requests.post(
-            f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json",
-            auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-            data={"To": phone, "From": TWILIO_FROM_NUMBER, "Body": body},
-            timeout=10,
-        )
+        import http_session
+        with metrics.outbound("twilio", "send_sms") as call:
+            r = http_session.post(
+                f"{TWILIO_API_BASE}/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json",
+                auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+                data={"To": phone, "From": TWILIO_FROM_NUMBER, "Body": body},
+                timeout=10,
+            )
+            call.status = r.status_code
         if r.status_code in (200, 201):
             return True
         LOG.error("Twilio error: %s %s", r.status_code, r.text)
@@ -0,0 +1,182 @@
+"""
+Durable SMS outbox for nominee claim links.
+The nominee check writes one sms_outbox row in the same transaction as each nominee_claims insert;
+a dispatcher drains the table with a few concurrent senders, a token-bucket rate limit matching the
+provider's throughput, and exponential-backoff retries. Status: pending -> sending -> sent | failed.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from config import (
+    SMS_DISPATCH_CONCURRENCY,
+    SMS_DISPATCH_POLL_SECONDS,
+    SMS_MAX_ATTEMPTS,
+    SMS_RATE_BURST,
+    SMS_RATE_PER_SEC,
+    SMS_RETRY_BASE_SECONDS,
+)
+from db import db_time
+
+LOG = logging.getLogger(__name__)
+
+# A row stuck in "sending" this long (e.g. the dispatcher died mid-send) becomes eligible again.
+SENDING_TIMEOUT_SECONDS = 120
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sms_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nominee_id INTEGER NOT NULL,
+    claim_token TEXT NOT NULL UNIQUE,
+    phone TEXT NOT NULL,
+    question TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT NOT NULL DEFAULT '1970-01-01 00:00:00',
+    last_error TEXT,
+    sent_at TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, up to burst tokens banked."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(rate, 0.001)
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until one token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_bucket = TokenBucket(SMS_RATE_PER_SEC, SMS_RATE_BURST)
+
+
+def enqueue(db, rows) -> None:
+    """
+    Add outbox rows [(nominee_id, claim_token, phone, question), ...] on the caller's connection.
+    Call inside the transaction that inserts the matching nominee_claims so both commit together.
+    """
+    db.executemany(
+        "INSERT INTO sms_outbox (nominee_id, claim_token, phone, question) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+
+
+def _claim(db, limit: int, claim_tokens=None) -> list:
+    """Mark up to limit due rows (optionally only these claim tokens) as sending and return them."""
+    now = _now()
+    where = "(status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND next_attempt_at < ?)"
+    params = [db_time(now), db_time(now)]
+    if claim_tokens is not None:
+        where = f"({where}) AND claim_token IN ({','.join('?' * len(claim_tokens))})"
+        params += list(claim_tokens)
+    if db.in_transaction:
+        db.commit()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        rows = db.execute(
+            f"""
+            UPDATE sms_outbox SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+            WHERE id IN (SELECT id FROM sms_outbox WHERE {where} ORDER BY id LIMIT ?)
+            RETURNING id, claim_token, phone, question, attempts
+            """,
+            [db_time(now + timedelta(seconds=SENDING_TIMEOUT_SECONDS)), *params, limit],
+        ).fetchall()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return sorted(rows, key=lambda r: r["id"])
+
+
+def _send(row) -> tuple[bool, str | None]:
+    import sms_client
+
+    _bucket.acquire()
+    try:
+        ok = sms_client.send_nominee_claim_sms(row["phone"], row["claim_token"], row["question"] or "")
+    except Exception as e:
+        return False, str(e)
+    return ok, None if ok else "provider rejected or unreachable"
+
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base * 2^(attempts-1), +/- 25%."""
+    delay = SMS_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.75, 1.25)
+
+
+def dispatch(db, limit: int = 100, claim_tokens=None) -> int:
+    """
+    Send one batch of due outbox rows concurrently and record each outcome. Returns the number sent.
+    With claim_tokens, only those rows are attempted (used to send right after a check cycle commits).
+    """
+    if claim_tokens is not None and not claim_tokens:
+        return 0
+    rows = _claim(db, limit, claim_tokens)
+    if not rows:
+        return 0
+    workers = max(1, min(SMS_DISPATCH_CONCURRENCY, len(rows)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sms-send") as pool:
+        results = list(pool.map(_send, rows))
+
+    now = _now()
+    sent, retry, failed = [], [], []
+    for row, (ok, error) in zip(rows, results):
+        if ok:
+            sent.append((db_time(now), row["id"]))
+        elif row["attempts"] >= SMS_MAX_ATTEMPTS:
+            failed.append((error, row["id"]))
+            LOG.error("SMS to %s failed permanently after %s attempts: %s", row["phone"], row["attempts"], error)
+        else:
+            retry.append((db_time(now + timedelta(seconds=_retry_delay(row["attempts"]))), error, row["id"]))
+    with db:
+        db.executemany("UPDATE sms_outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?", sent)
+        db.executemany("UPDATE sms_outbox SET status = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?", retry)
+        db.executemany("UPDATE sms_outbox SET status = 'failed', last_error = ? WHERE id = ?", failed)
+    return len(sent)
+
+
+def status_counts(db) -> dict[str, int]:
+    """Number of outbox rows per status (for monitoring)."""
+    return {r[0]: r[1] for r in db.execute("SELECT status, COUNT(*) FROM sms_outbox GROUP BY status")}
+
+
+def run_forever(connect, stop_event=None) -> None:
+    """
+    Dispatcher loop: drain due outbox rows, then poll every SMS_DISPATCH_POLL_SECONDS.
+    connect is a zero-argument callable returning a sqlite3 connection.
+    """
+    db = connect()
+    stop_event = stop_event or threading.Event()
+    LOG.info("SMS outbox dispatcher started (%s msg/s, %s senders)", SMS_RATE_PER_SEC, SMS_DISPATCH_CONCURRENCY)
+    while not stop_event.is_set():
+        try:
+            if dispatch(db):
+                continue
+        except Exception as e:
+            LOG.exception("SMS dispatch failed: %s", e)
+        stop_event.wait(SMS_DISPATCH_POLL_SECONDS)
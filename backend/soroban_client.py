@@ -1,41 +1,277 @@
 """
 Soroban RPC client for Walletsurance inheritance contract.
 Uses stellar_sdk ContractClient to simulate view calls (can_claim, beneficiary).
+Clients are long-lived (one per contract, reusing the RPC connection), and view results are cached
+per contract and ledger sequence: a result is reused until a new ledger closes, and concurrent
+lookups for the same contract wait for one simulation instead of each running their own.
+For many contracts, read_vaults() reads instance storage directly with batched getLedgerEntries;
+read_multi_vaults() does the same for the vault-ID keyed entries of the multi-vault contract.
+rpc_server_async() / latest_ledger_async() are the event-loop counterparts used by the ASGI app.
+Every JSON-RPC call made through these servers is timed into metrics (operation = RPC method).
+With several SOROBAN_RPC_URLS, calls go to the fastest healthy endpoint and reads are hedged (endpoints.py);
+sendTransaction is sent to one endpoint only.
 """
-import os
-from typing import Any
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
-from stellar_sdk import Network, scval
+from stellar_sdk import Address, SorobanServer, SorobanServerAsync, scval
+from stellar_sdk import xdr as stellar_xdr
 from stellar_sdk.contract import ContractClient
-from stellar_sdk.exceptions import BadResponseError, SorobanRpcErrorResponse
+from stellar_sdk.exceptions import BadResponseError, SorobanRpcErrorResponse, raise_request_exception
+from stellar_sdk.soroban_rpc import Response
 
-from config import CONTRACT_ID, NETWORK_PASSPHRASE, SOROBAN_RPC_URL
+import metrics
+from endpoints import EndpointPool
+from config import (
+    CONTRACT_ID,
+    MULTI_VAULT_CONTRACT_ID,
+    NETWORK_PASSPHRASE,
+    SOROBAN_CLIENT_CACHE_SIZE,
+    SOROBAN_LEDGER_ENTRIES_BATCH,
+    SOROBAN_LEDGER_POLL_SECONDS,
+    SOROBAN_RPC_CONCURRENCY,
+    SOROBAN_RPC_URL,
+    SOROBAN_RPC_URLS,
+)
 
+rpc_endpoints = EndpointPool("soroban", SOROBAN_RPC_URLS)
+# JSON-RPC methods that change state: sent to a single endpoint, never hedged.
+_WRITE_METHODS = frozenset({"sendTransaction"})
 
-def _client() -> ContractClient | None:
-    if not CONTRACT_ID:
+
+def _rpc_result(data, response_body_type):
+    """Parse a JSON-RPC reply as SorobanServer._post does, but return an RPC error: it is an answer, not an outage."""
+    try:
+        raw = Response[Any].model_validate(data.json())
+    except json.JSONDecodeError:
+        raise_request_exception(data)
+        raise
+    if raw.error:
+        return SorobanRpcErrorResponse(raw.error.code, raw.error.message, raw.error.data)
+    return response_body_type.model_validate(raw.result)
+
+
+def _raise_rpc_error(result):
+    if isinstance(result, SorobanRpcErrorResponse):
+        raise result
+    return result
+
+
+def _no_failover(result) -> bool:
+    return False  # an RPC answer, even an error, is not retried elsewhere; outages surface as exceptions
+
+
+def _failed(result) -> bool:
+    """An answer that reports a failure: a JSON-RPC error, or a simulation that returned an error."""
+    return isinstance(result, SorobanRpcErrorResponse) or bool(getattr(result, "error", None))
+
+
+def _metered(call, result):
+    """Record a failed answer as status "error" in metrics (JSON-RPC errors raise and are recorded as such)."""
+    if _failed(result):
+        call.status = "error"
+    return result
+
+
+class _MeteredSorobanServer(SorobanServer):
+    def _post(self, request_body, response_body_type):
+        with metrics.outbound("soroban", request_body.method) as call:
+            if len(rpc_endpoints) < 2:
+                return _metered(call, super()._post(request_body, response_body_type))
+            payload = json.loads(request_body.model_dump_json(by_alias=True))
+            return _metered(call, _raise_rpc_error(rpc_endpoints.call(
+                lambda url: _rpc_result(self._client.post(url, json_data=payload), response_body_type),
+                hedge=request_body.method not in _WRITE_METHODS,
+                failed=_no_failover,
+            )))
+
+
+class _MeteredSorobanServerAsync(SorobanServerAsync):
+    async def _post(self, request_body, response_body_type):
+        with metrics.outbound("soroban", request_body.method) as call:
+            if len(rpc_endpoints) < 2:
+                return _metered(call, await super()._post(request_body, response_body_type))
+            payload = json.loads(request_body.model_dump_json(by_alias=True))
+
+            async def post(url):
+                return _rpc_result(await self._client.post(url, json_data=payload), response_body_type)
+
+            return _metered(call, _raise_rpc_error(await rpc_endpoints.call_async(
+                post, hedge=request_body.method not in _WRITE_METHODS, failed=_no_failover,
+            )))
+
+
+# ContractClient per contract id, least recently used dropped past SOROBAN_CLIENT_CACHE_SIZE. They all use the
+# shared rpc_server(), so an evicted client holds no connection of its own.
+_clients: OrderedDict[str, ContractClient] = OrderedDict()
+_clients_lock = threading.RLock()
+
+
+def _client(contract_id: str | None = None) -> ContractClient | None:
+    contract_id = contract_id or CONTRACT_ID
+    if not contract_id:
         return None
-    return ContractClient(
-        contract_id=CONTRACT_ID,
-        rpc_url=SOROBAN_RPC_URL,
-        network_passphrase=NETWORK_PASSPHRASE,
-    )
+    with _clients_lock:
+        client = _clients.get(contract_id)
+        if client is None:
+            server = rpc_server()
+            client = ContractClient(
+                contract_id=contract_id,
+                rpc_url=SOROBAN_RPC_URL,
+                network_passphrase=NETWORK_PASSPHRASE,
+                request_client=server._client,  # don't open a session for the SorobanServer replaced below
+            )
+            client.server = server
+            _clients[contract_id] = client
+            while len(_clients) > SOROBAN_CLIENT_CACHE_SIZE:
+                _clients.popitem(last=False)
+        else:
+            _clients.move_to_end(contract_id)
+    return client
+
+
+_server: SorobanServer | None = None
+
 
+def rpc_server() -> SorobanServer:
+    """Shared SorobanServer (keeps its HTTP connection alive between calls)."""
+    global _server
+    if _server is None:
+        with _clients_lock:
+            if _server is None:
+                _server = _MeteredSorobanServer(SOROBAN_RPC_URL)
+    return _server
 
-def get_contract_status() -> dict[str, Any] | None:
+
+_async_servers: dict = {}
+
+
+def rpc_server_async() -> SorobanServerAsync:
+    """SorobanServerAsync of the running event loop, over one shared aiohttp session."""
+    from stellar_sdk import AiohttpClient
+
+    loop = asyncio.get_running_loop()
+    server = _async_servers.get(loop)
+    if server is None:
+        server = _async_servers[loop] = _MeteredSorobanServerAsync(SOROBAN_RPC_URL, client=AiohttpClient())
+    return server
+
+
+async def close_async() -> None:
+    """Close the running loop's async RPC client (ASGI lifespan shutdown)."""
+    server = _async_servers.pop(asyncio.get_running_loop(), None)
+    if server is not None:
+        await server.close()
+
+
+_ledger = {"sequence": None, "checked_at": 0.0}
+_ledger_lock = threading.Lock()
+_ledger_async_locks: dict = {}
+
+
+def latest_ledger() -> int | None:
     """
-    Call contract views can_claim and beneficiary via simulation.
-    Returns None if CONTRACT_ID or RPC is not configured or on RPC error.
+    Latest closed ledger sequence from RPC. Re-fetched at most every SOROBAN_LEDGER_POLL_SECONDS;
+    concurrent callers share one getLatestLedger request. Returns None if RPC is unreachable.
+    """
+    if time.monotonic() - _ledger["checked_at"] < SOROBAN_LEDGER_POLL_SECONDS:
+        return _ledger["sequence"]
+    with _ledger_lock:
+        if time.monotonic() - _ledger["checked_at"] < SOROBAN_LEDGER_POLL_SECONDS:
+            return _ledger["sequence"]
+        try:
+            sequence = rpc_server().get_latest_ledger().sequence
+        except Exception:
+            sequence = None
+        _ledger.update(sequence=sequence, checked_at=time.monotonic())
+        return sequence
+
+
+async def latest_ledger_async() -> int | None:
+    """latest_ledger() for the event loop; shares its cached value with the threaded callers."""
+    if time.monotonic() - _ledger["checked_at"] < SOROBAN_LEDGER_POLL_SECONDS:
+        return _ledger["sequence"]
+    lock = _ledger_async_locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+    async with lock:
+        if time.monotonic() - _ledger["checked_at"] < SOROBAN_LEDGER_POLL_SECONDS:
+            return _ledger["sequence"]
+        try:
+            sequence = (await rpc_server_async().get_latest_ledger()).sequence
+        except Exception:
+            sequence = None
+        _ledger.update(sequence=sequence, checked_at=time.monotonic())
+        return sequence
+
+
+class LedgerCache:
+    """
+    Values keyed by (key, ledger sequence). A lookup for the current ledger returns the cached value;
+    a miss is computed once while concurrent callers for the same key wait on its lock (singleflight).
+    At most maxsize keys are kept; the least recently used key (value and lock) is dropped first.
     """
-    client = _client()
-    if not client:
-        return None
 
+    def __init__(self, maxsize: int = SOROBAN_CLIENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Any, tuple[int, Any]] = OrderedDict()
+        self._locks: dict[Any, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cached(self, key, sequence: int):
+        """Value cached for key at this ledger (moved to the LRU end), else None."""
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != sequence:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get(self, key, sequence: int | None, compute: Callable[[], Any]):
+        if sequence is None:
+            return compute()
+        value = self._cached(key, sequence)
+        if value is not None:
+            return value
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            value = self._cached(key, sequence)
+            if value is not None:
+                return value
+            self.misses += 1
+            value = compute()
+            with self._guard:
+                if value is not None:
+                    self._entries[key] = (sequence, value)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._locks.pop(evicted, None)
+                    self.evictions += 1
+                if key not in self._entries:
+                    self._locks.pop(key, None)
+            return value
+
+
+_status_cache = LedgerCache()
+
+
+def _simulate_status(client: ContractClient, vault_id: int | None = None) -> dict[str, Any] | None:
+    # The multi-vault contract's views take the vault id (u64); the inheritance contract's take nothing.
+    parameters = None if vault_id is None else [scval.to_uint64(vault_id)]
     try:
         # can_claim() -> bool
         can_claim_tx = client.invoke(
             "can_claim",
-            parameters=None,
+            parameters=parameters,
             simulate=True,
         )
         can_claim_val = can_claim_tx.result()
@@ -44,7 +280,7 @@ def get_contract_status() -> dict[str, Any] | None:
         # beneficiary() -> Address (may error if vault empty)
         beneficiary_address: str | None = None
         try:
-            ben_tx = client.invoke("beneficiary", parameters=None, simulate=True)
+            ben_tx = client.invoke("beneficiary", parameters=parameters, simulate=True)
             ben_val = ben_tx.result()
             if ben_val:
                 addr = scval.from_address(ben_val)
@@ -52,15 +288,187 @@ def get_contract_status() -> dict[str, Any] | None:
         except Exception:
             pass
 
-        return {
+        status = {
             "can_claim": can_claim,
             "beneficiary_address": beneficiary_address,
-            "contract_id": CONTRACT_ID,
+            "contract_id": client.contract_id,
         }
+        if vault_id is not None:
+            status["vault_id"] = vault_id
+        return status
     except (SorobanRpcErrorResponse, BadResponseError, Exception):
         return None
 
 
+def get_contract_status(contract_id: str | None = None, vault_id: int = 0) -> dict[str, Any] | None:
+    """
+    Call contract views can_claim and beneficiary via simulation, at most once per contract (and vault) per
+    ledger. vault_id selects the vault of MULTI_VAULT_CONTRACT_ID and is ignored for other contracts.
+    Returns None if CONTRACT_ID or RPC is not configured or on RPC error.
+    """
+    client = _client(contract_id)
+    if not client:
+        return None
+    vault = vault_id if MULTI_VAULT_CONTRACT_ID and client.contract_id == MULTI_VAULT_CONTRACT_ID else None
+    sequence = latest_ledger()
+    status = _status_cache.get((client.contract_id, vault), sequence, lambda: _simulate_status(client, vault))
+    if status is None:
+        return None
+    return {**status, "ledger": sequence}
+
+
+def _instance_key(contract_id: str) -> stellar_xdr.LedgerKey:
+    """Ledger key of a contract's instance entry (where the inheritance contract keeps its vault)."""
+    return stellar_xdr.LedgerKey(
+        stellar_xdr.LedgerEntryType.CONTRACT_DATA,
+        contract_data=stellar_xdr.LedgerKeyContractData(
+            contract=Address(contract_id).to_xdr_sc_address(),
+            key=stellar_xdr.SCVal(stellar_xdr.SCValType.SCV_LEDGER_KEY_CONTRACT_INSTANCE),
+            durability=stellar_xdr.ContractDataDurability.PERSISTENT,
+        ),
+    )
+
+
+def native(val: stellar_xdr.SCVal) -> Any:
+    value = scval.to_native(val)
+    return value.address if isinstance(value, Address) else value
+
+
+def _vault_from_storage(contract_id: str, storage: dict[str, Any], ledger: int) -> dict[str, Any]:
+    """Vault fields from the contract's storage symbols, with can_claim computed like the contract does."""
+    last_ping = storage.get("last_ping")
+    timeout = storage.get("timeout")
+    can_claim = last_ping is not None and timeout is not None and ledger >= last_ping + timeout
+    return {
+        "contract_id": contract_id,
+        "depositor": storage.get("depositor"),
+        "beneficiary_address": storage.get("benef"),
+        "token": storage.get("token"),
+        "amount": storage.get("amount"),
+        "last_ping": last_ping,
+        "timeout": timeout,
+        "can_claim": can_claim,
+    }
+
+
+def _storage_key_name(key: stellar_xdr.SCVal) -> str | None:
+    """Name of a storage key: a symbol_short! symbol, or the variant name of a #[contracttype] enum key."""
+    if key.type == stellar_xdr.SCValType.SCV_SYMBOL:
+        return key.sym.sc_symbol.decode()
+    if key.type == stellar_xdr.SCValType.SCV_VEC and key.vec and key.vec.sc_vec:
+        first = key.vec.sc_vec[0]
+        if first.type == stellar_xdr.SCValType.SCV_SYMBOL:
+            return first.sym.sc_symbol.decode()
+    return None
+
+
+def decode_map(scmap: stellar_xdr.SCMap | None) -> dict[str, Any]:
+    out = {}
+    for item in (scmap.sc_map if scmap else []):
+        name = _storage_key_name(item.key)
+        if name is not None:
+            out[name] = native(item.val)
+    return out
+
+
+def decode_instance_storage(entry_xdr: str) -> dict[str, Any]:
+    """Decode a contract instance LedgerEntryData (base64) into {symbol: native value}."""
+    data = stellar_xdr.LedgerEntryData.from_xdr(entry_xdr)
+    return decode_map(data.contract_data.val.instance.storage)
+
+
+def _fetch_entries(keys: list[stellar_xdr.LedgerKey]) -> tuple[list, int, int]:
+    """
+    getLedgerEntries for any number of keys: SOROBAN_LEDGER_ENTRIES_BATCH keys per request, up to
+    SOROBAN_RPC_CONCURRENCY requests in flight. Returns (entries, latest ledger, number of requests).
+    """
+    batches = [
+        keys[i:i + SOROBAN_LEDGER_ENTRIES_BATCH]
+        for i in range(0, len(keys), SOROBAN_LEDGER_ENTRIES_BATCH)
+    ]
+    if not batches:
+        return [], 0, 0
+    server = rpc_server()
+    workers = max(1, min(SOROBAN_RPC_CONCURRENCY, len(batches)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="soroban-read") as pool:
+        responses = list(pool.map(server.get_ledger_entries, batches))
+    entries = [entry for resp in responses for entry in (resp.entries or [])]
+    return entries, max(r.latest_ledger for r in responses), len(batches)
+
+
+def read_vaults(contract_ids: list[str]) -> tuple[dict[str, dict[str, Any] | None], dict[str, Any]]:
+    """
+    Read the vault of many inheritance contracts straight from their instance storage using batched
+    getLedgerEntries (see _fetch_entries), and compute can_claim locally against the latest ledger.
+    No simulation is involved.
+    Returns ({contract_id: vault dict, or None if the contract instance was not found}, stats).
+    Raises on RPC errors.
+    """
+    contract_ids = list(dict.fromkeys(contract_ids))
+    started = time.monotonic()
+    entries, ledger, calls = _fetch_entries([_instance_key(c) for c in contract_ids])
+    vaults: dict[str, dict[str, Any] | None] = {c: None for c in contract_ids}
+    for entry in entries:
+        key = stellar_xdr.LedgerKey.from_xdr(entry.key)
+        contract_id = Address.from_xdr_sc_address(key.contract_data.contract).address
+        vaults[contract_id] = _vault_from_storage(contract_id, decode_instance_storage(entry.xdr), ledger)
+    stats = {
+        "vaults": len(contract_ids),
+        "rpc_calls": calls,
+        "ledger": ledger,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    return vaults, stats
+
+
+def _vault_key(contract_id: str, vault_id: int) -> stellar_xdr.LedgerKey:
+    """Ledger key of DataKey::Vault(vault_id) in the multi-vault contract's persistent storage."""
+    return stellar_xdr.LedgerKey(
+        stellar_xdr.LedgerEntryType.CONTRACT_DATA,
+        contract_data=stellar_xdr.LedgerKeyContractData(
+            contract=Address(contract_id).to_xdr_sc_address(),
+            key=scval.to_vec([scval.to_symbol("Vault"), scval.to_uint64(vault_id)]),
+            durability=stellar_xdr.ContractDataDurability.PERSISTENT,
+        ),
+    )
+
+
+def read_multi_vaults(contract_id: str) -> tuple[dict[int, dict[str, Any]], dict[str, Any]]:
+    """
+    Read every vault of a multi-vault contract: NextId from its instance storage, then
+    DataKey::Vault(1..NextId-1) with batched getLedgerEntries. Claimed vaults are deleted on-chain and
+    simply come back missing. can_claim is computed locally against the latest ledger.
+    A vault whose entry outlived its TTL (live_until_ledger before the latest ledger) still exists but is
+    archived: it is returned with archived=True (restorable: a claim must restore it first), not as missing.
+    Returns ({vault_id: vault dict}, stats). Raises on RPC errors.
+    """
+    started = time.monotonic()
+    entries, ledger, calls = _fetch_entries([_instance_key(contract_id)])
+    next_id = decode_instance_storage(entries[0].xdr).get("NextId", 1) if entries else 1
+    keys = [_vault_key(contract_id, vault_id) for vault_id in range(1, next_id)]
+    entries, vault_ledger, vault_calls = _fetch_entries(keys)
+    ledger = max(ledger, vault_ledger)
+    vaults = {}
+    for entry in entries:
+        key = stellar_xdr.LedgerKey.from_xdr(entry.key)
+        vault_id = key.contract_data.key.vec.sc_vec[1].u64.uint64
+        data = stellar_xdr.LedgerEntryData.from_xdr(entry.xdr)
+        fields = decode_map(data.contract_data.val.map)
+        # Struct field names differ from the single-vault contract's symbols; map them onto the same shape.
+        fields["benef"] = fields.pop("beneficiary", None)
+        archived = entry.live_until_ledger is not None and entry.live_until_ledger < ledger
+        vaults[vault_id] = {**_vault_from_storage(contract_id, fields, ledger), "vault_id": vault_id, "archived": archived}
+    stats = {
+        "vault_ids": max(next_id - 1, 0),
+        "vaults": len(vaults),
+        "archived": sum(1 for v in vaults.values() if v["archived"]),
+        "rpc_calls": calls + vault_calls,
+        "ledger": ledger,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    return vaults, stats
+
+
 def get_network_info() -> dict[str, Any]:
     """Return RPC and network config (no secrets)."""
     return {
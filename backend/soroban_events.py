@@ -0,0 +1,345 @@
+"""
+Soroban event ingestion: mirror vault state from contract deposit / ping / claim events.
+Watched contracts are polled with getEvents in lanes of up to 25 contracts (5 filters x 5 IDs, the
+RPC limit per request). A contract is assigned to a lane once (event_lanes table) and keeps it, so a
+newly registered contract never moves others onto a different cursor. A contract joining a lane is
+seeded from a getLedgerEntries snapshot and then follows events from that ledger on; each page's
+updates, the lane cursor and the ledger each contract is mirrored up to are committed in one
+transaction, so a restart resumes exactly where the last page left off. A lane whose cursor has fallen
+out of the RPC's event retention is re-seeded from a fresh snapshot.
+Readers (contract status, the agent) answer from the vaults table plus the ledger each contract's lane
+has been read through, without any RPC call.
+"""
+import logging
+import re
+import threading
+import time
+
+from stellar_sdk import xdr as stellar_xdr
+from stellar_sdk.exceptions import SorobanRpcErrorResponse
+from stellar_sdk.soroban_rpc import EventFilter, EventFilterType
+
+import soroban_client
+from config import SOROBAN_EVENTS_PAGE_SIZE, SOROBAN_EVENTS_POLL_SECONDS
+from horizon_stream import load_cursor
+
+LOG = logging.getLogger(__name__)
+
+# getEvents accepts at most 5 filters of at most 5 contract IDs each.
+LANE_SIZE = 25
+
+# getEvents error for a start ledger / cursor older than the RPC keeps events for.
+_RETENTION_ERROR = re.compile(r"oldest ledger|out of range|before the retention", re.IGNORECASE)
+
+
+def parse_event(event) -> dict | None:
+    """
+    Decode one getEvents record from the inheritance / multi-vault contracts.
+    Returns {"name", "contract_id", "vault_id", "ledger", **data fields} or None for other events.
+    Single-vault contracts have vault_id 0; the multi-vault contract puts the ID in the second topic.
+    """
+    topics = [stellar_xdr.SCVal.from_xdr(t) for t in event.topic]
+    if not topics or topics[0].type != stellar_xdr.SCValType.SCV_SYMBOL:
+        return None
+    name = topics[0].sym.sc_symbol.decode()
+    if name not in ("deposit", "ping", "claim"):
+        return None
+    vault_id = 0
+    if len(topics) > 1 and topics[1].type == stellar_xdr.SCValType.SCV_U64:
+        vault_id = topics[1].u64.uint64
+    value = stellar_xdr.SCVal.from_xdr(event.value)
+    data = soroban_client.decode_map(value.map) if value.type == stellar_xdr.SCValType.SCV_MAP else {}
+    # The address topic is the depositor for deposit/ping and the beneficiary for claim.
+    addresses = [soroban_client.native(t) for t in topics[1:] if t.type == stellar_xdr.SCValType.SCV_ADDRESS]
+    if addresses:
+        data["beneficiary" if name == "claim" else "depositor"] = addresses[0]
+    return {**data, "name": name, "contract_id": event.contract_id, "vault_id": vault_id, "ledger": event.ledger}
+
+
+def _save_cursor(db, name: str, cursor) -> None:
+    db.execute(
+        """
+        INSERT INTO stream_cursors (name, cursor, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET cursor = excluded.cursor, updated_at = excluded.updated_at
+        """,
+        (name, str(cursor)),
+    )
+
+
+def _upsert(db, contract_id, vault_id, vault, ledger) -> None:
+    db.execute(
+        """
+        INSERT INTO vaults (contract_id, vault_id, depositor, beneficiary, token, amount, last_ping, timeout,
+                            deadline, status, updated_ledger, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(contract_id, vault_id) DO UPDATE SET
+            depositor = excluded.depositor, beneficiary = excluded.beneficiary, token = excluded.token,
+            amount = excluded.amount, last_ping = excluded.last_ping, timeout = excluded.timeout,
+            deadline = excluded.deadline, status = 'active', updated_ledger = excluded.updated_ledger,
+            updated_at = excluded.updated_at
+        WHERE vaults.updated_ledger <= excluded.updated_ledger
+        """,
+        (
+            contract_id, vault_id, vault.get("depositor"), vault.get("beneficiary"), vault.get("token"),
+            None if vault.get("amount") is None else str(vault["amount"]),
+            vault.get("last_ping"), vault.get("timeout"),
+            vault["last_ping"] + vault["timeout"], ledger,
+        ),
+    )
+
+
+def apply_events(db, events) -> int:
+    """Apply parsed events in order on the caller's transaction. Returns how many changed the mirror."""
+    applied = 0
+    for ev in events:
+        key = (ev["contract_id"], ev["vault_id"])
+        if ev["name"] == "deposit":
+            _upsert(db, *key, ev, ev["ledger"])
+            applied += 1
+        elif ev["name"] == "ping":
+            applied += db.execute(
+                """
+                UPDATE vaults SET last_ping = ?, deadline = ? + timeout, updated_ledger = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE contract_id = ? AND vault_id = ? AND updated_ledger <= ?
+                """,
+                (ev["last_ping"], ev["last_ping"], ev["ledger"], *key, ev["ledger"]),
+            ).rowcount
+        elif ev["name"] == "claim":
+            applied += db.execute(
+                """
+                UPDATE vaults SET status = 'claimed', updated_ledger = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE contract_id = ? AND vault_id = ? AND updated_ledger <= ?
+                """,
+                (ev["ledger"], *key, ev["ledger"]),
+            ).rowcount
+    return applied
+
+
+def seed(db, contract_ids: list[str], multi_vault_contract_id: str | None = None) -> int:
+    """
+    Snapshot the given contracts' current vaults from ledger entries into the mirror.
+    Returns the snapshot ledger, from which event ingestion for these contracts continues.
+    """
+    single = [c for c in contract_ids if c != multi_vault_contract_id]
+    ledger = 0
+    rows = []
+    gone = []  # mirrored vaults that no longer exist on-chain (claimed while nobody was watching)
+    if single:
+        vaults, stats = soroban_client.read_vaults(single)
+        ledger = stats["ledger"]
+        for contract_id, v in vaults.items():
+            if v and v["last_ping"] is not None:
+                rows.append((contract_id, 0, v))
+            else:
+                gone.append((contract_id, 0))
+    if multi_vault_contract_id and multi_vault_contract_id in contract_ids:
+        vaults, stats = soroban_client.read_multi_vaults(multi_vault_contract_id)
+        ledger = max(ledger, stats["ledger"])
+        rows += [(multi_vault_contract_id, vault_id, v) for vault_id, v in vaults.items()]
+        gone += [
+            (multi_vault_contract_id, r[0])
+            for r in db.execute(
+                "SELECT vault_id FROM vaults WHERE contract_id = ? AND status = 'active'", (multi_vault_contract_id,)
+            )
+            if r[0] not in vaults
+        ]
+    with db:
+        for contract_id, vault_id, v in rows:
+            _upsert(db, contract_id, vault_id, {**v, "beneficiary": v["beneficiary_address"]}, ledger)
+        db.executemany(
+            "UPDATE vaults SET status = 'claimed', updated_ledger = ? WHERE contract_id = ? AND vault_id = ? AND updated_ledger <= ?",
+            [(ledger, contract_id, vault_id, ledger) for contract_id, vault_id in gone],
+        )
+    return ledger
+
+
+def assign_lanes(db, contract_ids: list[str]) -> dict[int, list[str]]:
+    """
+    Lane number -> watched contract IDs. Known contracts keep their lane; new ones fill the last lane,
+    then open new lanes of LANE_SIZE. Contracts no longer watched are dropped (their lane keeps its cursor).
+    """
+    ids = sorted(set(contract_ids))
+    known = {r["contract_id"]: r["lane"] for r in db.execute("SELECT contract_id, lane FROM event_lanes")}
+    stale = [c for c in known if c not in set(ids)]
+    counts: dict[int, int] = {}
+    for c, lane in known.items():
+        if c not in stale:
+            counts[lane] = counts.get(lane, 0) + 1
+    lane = max(known.values(), default=0)
+    added = []
+    for c in ids:
+        if c in known:
+            continue
+        if counts.get(lane, 0) >= LANE_SIZE:
+            lane += 1
+        counts[lane] = counts.get(lane, 0) + 1
+        known[c] = lane
+        added.append((c, lane))
+    if added or stale:
+        with db:
+            db.executemany("INSERT INTO event_lanes (contract_id, lane) VALUES (?, ?)", added)
+            db.executemany("DELETE FROM event_lanes WHERE contract_id = ?", [(c,) for c in stale])
+    lanes: dict[int, list[str]] = {}
+    for c in ids:
+        lanes.setdefault(known[c], []).append(c)
+    return lanes
+
+
+def _lane_cursor(lane: int) -> str:
+    return f"soroban_events:lane:{lane}"
+
+
+def _contract_ledgers(db, contract_ids: list[str]) -> dict[str, int | None]:
+    marks = ",".join("?" * len(contract_ids))
+    return {
+        r["contract_id"]: r["ledger"]
+        for r in db.execute(f"SELECT contract_id, ledger FROM event_lanes WHERE contract_id IN ({marks})", contract_ids)
+    }
+
+
+def _mark_read(db, contract_ids: list[str], ledger: int, polled: bool) -> None:
+    """Record that these contracts are mirrored through ledger (and, if polled, when their lane was read)."""
+    marks = ",".join("?" * len(contract_ids))
+    db.execute(
+        f"""
+        UPDATE event_lanes SET ledger = MAX(COALESCE(ledger, 0), ?), polled_at = COALESCE(?, polled_at)
+        WHERE contract_id IN ({marks})
+        """,
+        (ledger, time.time() if polled else None, *contract_ids),
+    )
+
+
+def _outside_retention(error: Exception) -> bool:
+    return isinstance(error, SorobanRpcErrorResponse) and bool(_RETENTION_ERROR.search(error.message or ""))
+
+
+def _reseed(db, server, name: str, contract_ids: list[str], multi_vault_contract_id: str | None) -> int:
+    """Drop the lane's cursor and snapshot its contracts again; returns the ledger to read events from."""
+    ledger = seed(db, contract_ids, multi_vault_contract_id) or server.get_latest_ledger().sequence
+    with db:
+        db.execute("DELETE FROM stream_cursors WHERE name = ?", (name,))
+        _mark_read(db, contract_ids, ledger, polled=False)
+    return ledger
+
+
+def poll_lane(db, server, lane: int, contract_ids: list[str], multi_vault_contract_id: str | None = None) -> int:
+    """
+    Ingest all new events for one lane (<= 25 contracts), page by page. Returns the number of events read.
+    Contracts new to the lane are seeded first; events older than their snapshot are ignored by _upsert's
+    updated_ledger check.
+    """
+    name = _lane_cursor(lane)
+    cursor = load_cursor(db, name)
+    ledgers = _contract_ledgers(db, contract_ids)
+    unseeded = [c for c in contract_ids if ledgers.get(c) is None]
+    if unseeded:
+        snapshot = seed(db, unseeded, multi_vault_contract_id) or server.get_latest_ledger().sequence
+        with db:
+            _mark_read(db, unseeded, snapshot, polled=False)
+        ledgers.update(dict.fromkeys(unseeded, snapshot))
+    lane_ledger = min(ledgers.values())
+    start_ledger = None if cursor else lane_ledger
+    filters = [
+        EventFilter(event_type=EventFilterType.CONTRACT, contract_ids=contract_ids[i:i + 5])
+        for i in range(0, len(contract_ids), 5)
+    ]
+    total = 0
+    while True:
+        try:
+            if cursor:
+                resp = server.get_events(filters=filters, cursor=cursor, limit=SOROBAN_EVENTS_PAGE_SIZE)
+            else:
+                resp = server.get_events(start_ledger=start_ledger, filters=filters, limit=SOROBAN_EVENTS_PAGE_SIZE)
+        except SorobanRpcErrorResponse as e:
+            if not _outside_retention(e):
+                raise
+            LOG.warning("Event lane %s fell out of RPC retention (%s); re-seeding", lane, e.message)
+            cursor, start_ledger = None, _reseed(db, server, name, contract_ids, multi_vault_contract_id)
+            lane_ledger = start_ledger
+            continue
+        if resp.oldest_ledger and lane_ledger + 1 < resp.oldest_ledger:
+            # Events between the last ledger read and the RPC's oldest are gone: snapshot again.
+            LOG.warning("Event lane %s missed ledgers %s-%s; re-seeding", lane, lane_ledger + 1, resp.oldest_ledger - 1)
+            cursor, start_ledger = None, _reseed(db, server, name, contract_ids, multi_vault_contract_id)
+            lane_ledger = start_ledger
+            continue
+        events = resp.events or []
+        parsed = [ev for ev in (parse_event(e) for e in events) if ev]
+        cursor = resp.cursor or (events[-1].id if events else cursor)
+        last_page = len(events) < SOROBAN_EVENTS_PAGE_SIZE
+        # Mid-way, only ledgers before the last event read are known to be complete.
+        read_through = resp.latest_ledger if last_page else max(lane_ledger, events[-1].ledger - 1)
+        with db:
+            apply_events(db, parsed)
+            if cursor:
+                _save_cursor(db, name, cursor)
+            _mark_read(db, contract_ids, read_through, polled=last_page)
+        lane_ledger = read_through
+        total += len(events)
+        if last_page:
+            return total
+
+
+def poll_once(db, contract_ids: list[str], multi_vault_contract_id: str | None = None) -> int:
+    """Poll every lane of the watched contracts once. Returns the number of events read."""
+    server = soroban_client.rpc_server()
+    return sum(
+        poll_lane(db, server, lane, ids, multi_vault_contract_id)
+        for lane, ids in sorted(assign_lanes(db, contract_ids).items())
+    )
+
+
+def mirror_ledger(db, contract_id: str | None = None, max_age: float | None = None) -> int | None:
+    """
+    Ledger the mirror is complete through: for one contract, the ledger its lane has been read through
+    (None if it is not mirrored, or its lane was last read more than max_age seconds ago); overall, the
+    minimum across watched contracts (None if the ingester has not run yet).
+    """
+    if contract_id is None:
+        row = db.execute("SELECT MIN(ledger) FROM event_lanes WHERE ledger IS NOT NULL").fetchone()
+        return row[0]
+    row = db.execute("SELECT ledger, polled_at FROM event_lanes WHERE contract_id = ?", (contract_id,)).fetchone()
+    if row is None or row["ledger"] is None or row["polled_at"] is None:
+        return None
+    if max_age is not None and time.time() - row["polled_at"] > max_age:
+        return None
+    return row["ledger"]
+
+
+def get_vault(db, contract_id: str, vault_id: int = 0):
+    return db.execute(
+        "SELECT * FROM vaults WHERE contract_id = ? AND vault_id = ?", (contract_id, vault_id)
+    ).fetchone()
+
+
+def due_vaults(db, limit: int | None = None) -> list:
+    """Active mirrored vaults whose deadline (last_ping + timeout) has been reached at the ledger their lane was read through."""
+    sql = """
+        SELECT v.* FROM vaults v JOIN event_lanes e ON e.contract_id = v.contract_id
+        WHERE v.status = 'active' AND v.deadline <= e.ledger ORDER BY v.contract_id, v.vault_id
+    """
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return db.execute(sql).fetchall()
+
+
+def run_forever(connect, list_contracts, stop_event=None) -> None:
+    """
+    Poll getEvents every SOROBAN_EVENTS_POLL_SECONDS for the contracts returned by list_contracts(db).
+    connect is a zero-argument callable returning a sqlite3 connection.
+    """
+    from config import MULTI_VAULT_CONTRACT_ID
+
+    db = connect()
+    stop_event = stop_event or threading.Event()
+    LOG.info("Soroban event ingestion started (every %ss)", SOROBAN_EVENTS_POLL_SECONDS)
+    while not stop_event.is_set():
+        try:
+            contract_ids = list_contracts(db)
+            if MULTI_VAULT_CONTRACT_ID and MULTI_VAULT_CONTRACT_ID not in contract_ids:
+                contract_ids.append(MULTI_VAULT_CONTRACT_ID)
+            if contract_ids:
+                poll_once(db, contract_ids, MULTI_VAULT_CONTRACT_ID)
+        except Exception as e:
+            LOG.warning("Soroban event ingestion failed: %s", e)
+        stop_event.wait(SOROBAN_EVENTS_POLL_SECONDS)
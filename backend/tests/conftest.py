@@ -0,0 +1,46 @@
+"""
+Shared fixtures: the Flask app on a temporary SQLite database, and a helper to seed nominees.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+@pytest.fixture
+def app_and_client():
+    """Flask app on a temporary DB file, its test client and the DB path."""
+    import app as app_module
+    app = app_module.app
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app.config["DATABASE"] = db_path
+    app.config["TESTING"] = True
+    app_module.init_db()
+    yield app, app.test_client(), db_path
+    import db
+    # Workers a test started hold pooled connections: stop them before the pools are closed under them.
+    app_module.stop_web_workers()
+    db.close_pools()
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        try:
+            os.unlink(path)
+        except Exception:
+            pass
+
+
+def _insert_nominee(db_path, depositor="G" + "A" * 55, inactivity_days=0, phone="+15551234567", question="Test?"):
+    with sqlite3.connect(db_path) as c:
+        c.execute(
+            """INSERT INTO nominees
+               (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, question, beneficiary_phone, beneficiary_stellar_address, inactivity_days)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (depositor, "G" + "B" * 55, "cipher", "nonce", "salt", question, phone, None, inactivity_days),
+        )
@@ -0,0 +1,94 @@
+"""
+Tests for lease-based partitioning of the nominee check across several agent processes sharing one DB.
+Run from backend: pytest tests/test_agent_leases.py -v
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+def _agent_process(db_path, results):
+    """One agent instance: run a full nominee check against the shared DB and report the SMS it sent."""
+    os.environ["RUN_AGENT_IN_WEB"] = "0"
+    os.environ["NOMINEE_CHECK_CHUNK_SIZE"] = "5"
+    from unittest.mock import patch
+    import app as app_module
+
+    app_module.app.config["DATABASE"] = db_path
+    sent = []
+
+    def slow_lookup(account_id):
+        time.sleep(0.01)
+        return "2020-01-01T00:00:00Z"
+
+    def record_sms(phone, token, question=""):
+        sent.append(phone)
+        return True
+
+    with patch("horizon_client.get_last_activity", side_effect=slow_lookup):
+        with patch("sms_client.send_nominee_claim_sms", side_effect=record_sms):
+            with app_module.app.app_context():
+                app_module._run_check_nominees()
+    results.put(sent)
+
+
+def test_agents_in_separate_processes_split_work_without_duplicates():
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        import app as app_module
+        app_module.app.config["DATABASE"] = db_path
+        app_module.init_db()
+        with sqlite3.connect(db_path) as c:
+            c.executemany(
+                """INSERT INTO nominees
+                   (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, question, beneficiary_phone, inactivity_days)
+                   VALUES (?, ?, 'c', 'n', 's', 'Q?', ?, 7)""",
+                [(f"G{i:055d}", "G" + "B" * 55, f"+1555{i:07d}") for i in range(40)],
+            )
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_agent_process, args=(db_path, results)) for _ in range(3)]
+        for p in procs:
+            p.start()
+        sent = [phone for _ in procs for phone in results.get(timeout=60)]
+        for p in procs:
+            p.join(timeout=10)
+
+        assert sorted(sent) == sorted(f"+1555{i:07d}" for i in range(40))
+        with sqlite3.connect(db_path) as c:
+            claims = c.execute("SELECT COUNT(*), COUNT(DISTINCT nominee_id) FROM nominee_claims").fetchone()
+            leased = c.execute("SELECT COUNT(*) FROM nominees WHERE lease_owner IS NOT NULL").fetchone()[0]
+        assert claims == (40, 40)
+        assert leased == 0
+    finally:
+        import db
+        db.close_pools()
+        for path in (db_path, db_path + "-wal", db_path + "-shm"):
+            try:
+                os.unlink(path)
+            except Exception:
+                pass
+
+
+def test_lease_heartbeat_does_not_keep_pooled_connections(app_and_client):
+    import app as app_module
+    import db
+
+    app, client, db_path = app_and_client
+    pool = db.get_pool(db_path)
+    with app.app_context():
+        app_module.get_db()
+        before = len(pool._all)
+        for _ in range(5):
+            with app_module._LeaseHeartbeat("agent-a"):
+                pass
+    assert len(pool._all) == before
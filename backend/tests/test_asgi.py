@@ -0,0 +1,129 @@
+"""
+Tests for the ASGI serving mode: native async routes return the same JSON as the Flask views,
+and other routes are served by the mounted Flask app.
+Run from backend: pytest tests/test_asgi.py -v
+"""
+import asyncio
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from stellar_sdk import Keypair
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from tests.conftest import _insert_nominee  # noqa: E402
+
+DEPOSITOR = Keypair.random().public_key
+
+
+def _call(method, path, body=None):
+    """Run one request through asgi.app; returns (status, parsed JSON or raw bytes)."""
+    import asgi
+
+    raw = json.dumps(body).encode() if body is not None else b""
+    sent = []
+    messages = [{"type": "http.request", "body": raw, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query.encode(),
+        "headers": [(b"content-type", b"application/json")], "http_version": "1.1", "scheme": "http",
+    }
+    asyncio.run(asgi.app(scope, receive, send))
+    status = sent[0]["status"]
+    payload = b"".join(m.get("body", b"") for m in sent[1:])
+    headers = dict(sent[0]["headers"])
+    if headers.get(b"content-type", b"").startswith(b"application/json"):
+        return status, json.loads(payload)
+    return status, payload
+
+
+def test_async_routes_match_flask_json(app_and_client):
+    app, client, db_path = app_and_client
+    _insert_nominee(db_path, depositor=DEPOSITOR)
+    with sqlite3.connect(db_path) as c:
+        c.execute("INSERT INTO nominee_claims (claim_token, nominee_id) VALUES ('tok', 1)")
+    account = {"id": DEPOSITOR, "sequence": "41", "balances": []}
+    rejected = {"title": "Transaction Failed", "extras": {"result_codes": {"transaction": "tx_bad_seq"}}}
+
+    async def get_account_async(account_id, fresh=False):
+        return account if account_id == DEPOSITOR else None
+
+    async def submit_transaction_async(xdr):
+        return rejected
+
+    with patch("horizon_client.get_account", side_effect=lambda a, fresh=False: account if a == DEPOSITOR else None), \
+            patch("horizon_client.get_account_async", side_effect=get_account_async), \
+            patch("horizon_client.submit_transaction", return_value=rejected), \
+            patch("horizon_client.submit_transaction_async", side_effect=submit_transaction_async):
+        signer = {"account_public_key": DEPOSITOR, "signer_public_key": Keypair.random().public_key}
+        cases = [
+            ("GET", "/api/claim/data/tok", None),
+            ("GET", "/api/claim/data/nope", None),
+            ("POST", "/api/claim/submit", {"signed_envelope_xdr": "AAAA"}),
+            ("POST", "/api/claim/submit", {}),
+            ("POST", "/api/build-add-signer", signer),
+            ("POST", "/api/build-add-signer", {**signer, "account_public_key": Keypair.random().public_key}),
+            ("POST", "/api/build-deposit", {"depositor_public_key": DEPOSITOR}),
+            ("POST", "/api/build-deposit", {"depositor_public_key": DEPOSITOR, "beneficiary_address": DEPOSITOR, "amount": "x"}),
+            ("POST", "/api/submit", {}),
+        ]
+        for method, path, body in cases:
+            expected = client.open(path, method=method, json=body)
+            assert _call(method, path, body) == (expected.status_code, expected.get_json()), path
+
+        status, data = _call("GET", "/api/claim/data/tok")
+    assert (status, data["account"]["sequence"]) == (200, "41")
+
+
+def test_other_routes_are_served_by_flask(app_and_client):
+    assert _call("GET", "/health") == (200, {"status": "ok", "service": "walletsurance"})
+    status, data = _call("POST", "/api/beneficiary", {"stellar_address": ""})
+    assert status == 400 and "error" in data
+
+
+def test_flask_fallback_streams_request_and_response_bodies(app_and_client):
+    import asgi
+    import config
+    import kdf_pool
+
+    rows = [{"depositor_account_id": "G" + f"{i:04d}".rjust(55, "A"), "beneficiary_phone": f"+1555000{i:04d}",
+             "question": "Pet?", "answer": "rex"} for i in range(3)]
+    raw = "".join(json.dumps(r) + "\n" for r in rows).encode()
+    chunks = [raw[i:i + 40] for i in range(0, len(raw), 40)]  # split mid-line, no content-length
+    messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    received, sent = [], []
+
+    async def receive():
+        received.append(1)
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/nominees/import", "query_string": b"",
+        "headers": [(b"authorization", b"Bearer s3cret")], "http_version": "1.1", "scheme": "http",
+    }
+    with patch("config.ADMIN_TOKEN", "s3cret"), patch("key_encrypt.KDF_ITERATIONS", 1_000):
+        kdf_pool.configure(workers=0)
+        try:
+            asyncio.run(asgi.app(scope, receive, send))
+        finally:
+            kdf_pool.configure(workers=config.KDF_POOL_WORKERS)
+
+    bodies = [m for m in sent[1:] if m.get("body")]
+    assert sent[0]["status"] == 200 and len(received) == len(chunks)
+    assert len(bodies) == len(rows) + 1 and all(m["more_body"] for m in bodies) and sent[-1]["more_body"] is False
+    assert json.loads(bodies[-1]["body"]) == {"summary": {"imported": 3, "failed": 0, "replaced": 0}}
@@ -0,0 +1,54 @@
+"""
+Tests for the benchmark fakes and dataset: the real agent code paths run against them end to end.
+Run from backend: pytest tests/test_bench_fakes.py -v
+"""
+import sqlite3
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+def test_nominee_cycle_against_fake_horizon_and_twilio(app_and_client):
+    import app as app_module
+    from benchmarks.dataset import generate
+    from benchmarks.fakes import FakeHorizon, FakeTwilio
+
+    app, client, db_path = app_and_client
+    assert generate(db_path, 40, inactive_fraction=0.25)["inactive"] == 10
+    with FakeHorizon() as horizon, FakeTwilio() as twilio, \
+            patch("horizon_client.HORIZON_URL", horizon.url), patch("sms_client.TWILIO_API_BASE", twilio.url), \
+            patch("sms_client.TWILIO_ACCOUNT_SID", "ACtest"), patch("sms_client.TWILIO_AUTH_TOKEN", "t"), \
+            patch("sms_client.TWILIO_FROM_NUMBER", "+15550000000"), patch("config.SMS_DISPATCH_MODE", "inline"), \
+            patch("sms_outbox._bucket.acquire"):
+        with app.app_context():
+            _, sent, stats = app_module._run_check_nominees()
+        horizon_stats, twilio_stats = horizon.stats(), twilio.stats()
+
+    assert (stats["lookups"], stats["sms_queued"], sent) == (40, 10, 10)
+    assert horizon_stats["by_route"] == {"GET /accounts/{id}/transactions": 40}
+    assert twilio_stats["requests"] == 10
+    with sqlite3.connect(db_path) as c:
+        claimed = [r[0] for r in c.execute(
+            "SELECT n.depositor_account_id FROM nominee_claims k JOIN nominees n ON n.id = k.nominee_id"
+        )]
+    assert len(claimed) == 10 and all(d[1] == "I" for d in claimed)
+
+
+def test_vault_reads_against_fake_soroban_rpc():
+    import soroban_client
+    from benchmarks.fakes import FakeSorobanRpc, contract_id
+
+    with FakeSorobanRpc() as rpc:
+        ids = rpc.add_vaults(10, claimable_fraction=0.3)
+        with patch("soroban_client.SOROBAN_RPC_URL", rpc.url), patch("soroban_client._server", None):
+            vaults, stats = soroban_client.read_vaults(ids + [contract_id(999)])
+        assert rpc.stats()["by_method"] == {"getLedgerEntries": 1}
+
+    assert vaults[contract_id(999)] is None
+    assert sum(v["can_claim"] for v in vaults.values() if v) == 3
+    assert vaults[ids[0]]["amount"] == 10_000_000 and vaults[ids[0]]["beneficiary_address"].startswith("G")
+    assert stats["ledger"] == rpc.ledger
@@ -0,0 +1,164 @@
+"""
+Tests for deposit building: shared server, cached sequence numbers and reused simulations.
+Run from backend: pytest tests/test_build_deposit.py -v
+"""
+import copy
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from stellar_sdk import Account, Address, Keypair, StrKey, TransactionEnvelope, scval
+from stellar_sdk import xdr as stellar_xdr
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+CONTRACT = StrKey.encode_contract(b"\x01" * 32)
+TOKEN = StrKey.encode_contract(b"\x02" * 32)
+DEPOSITOR = Keypair.random().public_key
+RESOURCE_FEE = 5000
+
+
+def _fake_prepare(tx):
+    """Stand-in for prepare_transaction: adds soroban data, the resource fee and source-account auth."""
+    te = copy.deepcopy(tx)
+    op = te.transaction.operations[0]
+    args = list(op.host_function.invoke_contract.args)
+    transfer = stellar_xdr.SorobanAuthorizedInvocation(
+        function=stellar_xdr.SorobanAuthorizedFunction(
+            stellar_xdr.SorobanAuthorizedFunctionType.SOROBAN_AUTHORIZED_FUNCTION_TYPE_CONTRACT_FN,
+            contract_fn=stellar_xdr.InvokeContractArgs(
+                Address(TOKEN).to_xdr_sc_address(), stellar_xdr.SCSymbol(b"transfer"),
+                [args[0], scval.to_address(CONTRACT), args[2]],
+            ),
+        ),
+        sub_invocations=[],
+    )
+    op.auth = [stellar_xdr.SorobanAuthorizationEntry(
+        credentials=stellar_xdr.SorobanCredentials(
+            stellar_xdr.SorobanCredentialsType.SOROBAN_CREDENTIALS_SOURCE_ACCOUNT
+        ),
+        root_invocation=stellar_xdr.SorobanAuthorizedInvocation(
+            function=stellar_xdr.SorobanAuthorizedFunction(
+                stellar_xdr.SorobanAuthorizedFunctionType.SOROBAN_AUTHORIZED_FUNCTION_TYPE_CONTRACT_FN,
+                contract_fn=stellar_xdr.InvokeContractArgs(
+                    Address(CONTRACT).to_xdr_sc_address(), stellar_xdr.SCSymbol(b"deposit"), args,
+                ),
+            ),
+            sub_invocations=[transfer],
+        ),
+    )]
+    te.transaction.soroban_data = stellar_xdr.SorobanTransactionData(
+        ext=stellar_xdr.SorobanTransactionDataExt(0),
+        resources=stellar_xdr.SorobanResources(
+            footprint=stellar_xdr.LedgerFootprint([], []),
+            instructions=stellar_xdr.Uint32(1_000_000),
+            disk_read_bytes=stellar_xdr.Uint32(1000),
+            write_bytes=stellar_xdr.Uint32(500),
+        ),
+        resource_fee=stellar_xdr.Int64(RESOURCE_FEE),
+    )
+    te.transaction.fee += RESOURCE_FEE
+    return te
+
+
+@pytest.fixture
+def rpc():
+    import build_deposit
+    build_deposit._simulations.clear()
+    build_deposit._sequences.invalidate(DEPOSITOR)
+    server = MagicMock()
+    server.load_account.side_effect = lambda account_id: Account(account_id, 100)
+    server.prepare_transaction.side_effect = _fake_prepare
+    ledger = {"sequence": 1000}
+    with patch("soroban_client.rpc_server", return_value=server), \
+            patch("soroban_client.latest_ledger", side_effect=lambda: ledger["sequence"]), \
+            patch("build_deposit.CONTRACT_ID", CONTRACT), \
+            patch("build_deposit.MULTI_VAULT_CONTRACT_ID", ""):
+        yield server, ledger
+
+
+def _build(amount, beneficiary=None):
+    import build_deposit
+    xdr, err = build_deposit.build_deposit_xdr(DEPOSITOR, beneficiary or Keypair.random().public_key, amount, 100, TOKEN)
+    assert err is None
+    return TransactionEnvelope.from_xdr(xdr, "Test SDF Network ; September 2015")
+
+
+def test_repeat_deposit_reuses_sequence_and_simulation(rpc):
+    server, ledger = rpc
+    first = _build(10)
+    beneficiary = Keypair.random().public_key
+    second = _build(25, beneficiary)
+    assert (server.load_account.call_count, server.prepare_transaction.call_count) == (1, 1)
+
+    tx = second.transaction
+    assert (tx.sequence, tx.fee) == (first.transaction.sequence, first.transaction.fee) == (101, 100 + RESOURCE_FEE)
+    assert tx.soroban_data.to_xdr() == first.transaction.soroban_data.to_xdr()
+    root = tx.operations[0].auth[0].root_invocation
+    assert scval.to_native(root.function.contract_fn.args[2]) == 25
+    assert scval.to_native(root.function.contract_fn.args[3]).address == beneficiary
+    assert scval.to_native(root.sub_invocations[0].function.contract_fn.args[2]) == 25
+
+    ledger["sequence"] = 1000 + 13  # past DEPOSIT_SIM_CACHE_LEDGERS
+    _build(30)
+    assert server.prepare_transaction.call_count == 2
+
+
+def test_submit_advances_or_invalidates_cached_sequence(rpc):
+    import build_deposit
+    server, ledger = rpc
+    envelope = _build(10)
+
+    from stellar_sdk.soroban_rpc import SendTransactionStatus
+
+    server.send_transaction.return_value = SimpleNamespace(hash="h1", status=SendTransactionStatus.PENDING)
+    result, err = build_deposit.submit_signed_envelope(envelope.to_xdr())
+    assert err is None and result["status"] == "PENDING"  # plain string, so /api/submit can serialize it
+    assert _build(10).transaction.sequence == 102
+    assert server.load_account.call_count == 1
+
+    server.send_transaction.return_value = SimpleNamespace(hash="h2", status="ERROR")
+    build_deposit.submit_signed_envelope(envelope.to_xdr())
+    _build(10)
+    assert server.load_account.call_count == 2
+
+
+def test_multi_vault_deposits_are_always_simulated(rpc):
+    server, ledger = rpc
+    with patch("build_deposit.MULTI_VAULT_CONTRACT_ID", CONTRACT):
+        _build(10)
+        _build(10)
+    assert server.prepare_transaction.call_count == 2
+
+
+def test_deposit_caches_are_bounded():
+    import build_deposit
+
+    cache = build_deposit.SequenceCache(ttl=60, maxsize=2)
+    for account, seq in (("A", 1), ("B", 2), ("C", 3)):
+        cache.set(account, seq)
+    assert (cache.get("A"), cache.get("B"), cache.get("C")) == (None, 2, 3)
+    expired = build_deposit.SequenceCache(ttl=0)
+    expired.set("A", 1)
+    assert expired.get("A") is None and not expired._entries
+
+    def remember(key, ledger):
+        tx = MagicMock()
+        tx.transaction.fee = 100
+        prepared = MagicMock()
+        prepared.transaction.fee = 150
+        prepared.transaction.operations = [MagicMock(auth=[])]
+        build_deposit._remember_simulation(key, ledger, tx, prepared)
+
+    build_deposit._simulations.clear()
+    with patch("build_deposit.DEPOSIT_CACHE_SIZE", 3):
+        remember("old", 900)
+        for i in range(5):
+            remember(f"k{i}", 1000)
+    # "old" is past DEPOSIT_SIM_CACHE_LEDGERS and pruned; then only the 3 most recent keys stay.
+    assert list(build_deposit._simulations) == ["k2", "k3", "k4"]
+    build_deposit._simulations.clear()
@@ -0,0 +1,59 @@
+"""
+Tests for the pooled SQLite connections (WAL, pragmas, per-thread reuse, closed on thread exit).
+Run from backend: pytest tests/test_db.py -v
+"""
+import sys
+import threading
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+def test_pooled_connection_uses_wal_and_tuned_pragmas(app_and_client):
+    import db
+    app, client, db_path = app_and_client
+    conn = db.get_pool(db_path).connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_nominee_claims_nominee_id" in indexes
+
+
+def test_pool_reuses_connection_per_thread(app_and_client):
+    import db
+    app, client, db_path = app_and_client
+    pool = db.get_pool(db_path)
+    assert pool.connection() is pool.connection()
+    other = []
+    t = threading.Thread(target=lambda: other.append(pool.connection()))
+    t.start()
+    t.join()
+    assert other[0] is not pool.connection()
+
+
+def test_connection_is_closed_when_its_thread_exits(app_and_client):
+    import gc
+    import sqlite3
+
+    import db
+    app, client, db_path = app_and_client
+    pool = db.ConnectionPool(db_path)
+    pool.connection()
+    opened = []
+    threads = [threading.Thread(target=lambda: opened.append(pool.connection())) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    gc.collect()
+    assert pool.open_connections() == 1  # only this thread's connection is left
+    for conn in opened:
+        try:
+            conn.execute("SELECT 1")
+            raise AssertionError("connection of an exited thread is still open")
+        except sqlite3.ProgrammingError:
+            pass
+    pool.close_all()
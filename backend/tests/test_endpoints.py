@@ -0,0 +1,107 @@
+"""
+Tests for multi-endpoint Horizon / Soroban RPC access: latency-based selection, health, hedged reads,
+and writes that are never hedged.
+Run from backend: pytest tests/test_endpoints.py -v
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+def _pool(latencies, fail=()):
+    """EndpointPool over fake endpoints: fn(url) sleeps latencies[url] seconds (or raises for urls in fail)."""
+    from endpoints import EndpointPool
+
+    pool = EndpointPool("test", list(latencies))
+    calls = []
+
+    def fn(url):
+        calls.append(url)
+        if url in fail:
+            raise ConnectionError(url)
+        time.sleep(latencies[url])
+        return url
+
+    return pool, fn, calls
+
+
+def test_reads_are_hedged_after_the_tail_latency_and_writes_are_not():
+    pool, fn, calls = _pool({"a": 0.5, "b": 0.002})  # "a" is usually the fastest, but is having a latency spike
+    a, b = pool.endpoints
+    for _ in range(30):
+        pool.record(a, 0.005, True)
+        pool.record(b, 0.010, True)
+    assert pool.ranked() == [a, b] and pool.hedge_delay(a) == 0.02  # p95 of 5 ms, clamped to HEDGE_MIN_DELAY_MS
+
+    started = time.monotonic()
+    assert pool.call(fn) == "b"
+    assert time.monotonic() - started < 0.3 and calls == ["a", "b"]
+    state = pool.state()
+    assert state["hedges_sent"] == 1 and state["endpoints"][1]["hedge_wins"] == 1
+
+    calls.clear()
+    assert pool.call(fn, hedge=False) == calls[0] and len(calls) == 1
+    sent = []
+
+    async def post(url):
+        sent.append(url)
+        await asyncio.sleep(0.05)
+        return url
+
+    asyncio.run(pool.call_async(post, hedge=False))
+    assert len(sent) == 1
+
+
+def test_failing_endpoint_is_taken_out_and_reads_fail_over():
+    pool, fn, calls = _pool({"a": 0, "b": 0}, fail={"a"})
+    for _ in range(3):
+        assert pool.call(fn) == "b"
+    state = {e["url"]: e for e in pool.state()["endpoints"]}
+    assert state["a"]["healthy"] is False and state["a"]["consecutive_failures"] == 3
+    calls.clear()
+    assert pool.call(fn) == "b" and calls == ["b"]  # down endpoints are tried last
+
+    async def read(url):
+        if url == "b":
+            raise ConnectionError(url)
+        return url
+
+    pool.endpoints[0].down_until = 0.0
+    assert asyncio.run(pool.call_async(read)) == "a"
+
+
+def test_horizon_reads_prefer_the_fast_endpoint_and_submit_once():
+    import horizon_client
+    from benchmarks.fakes import FakeHorizon
+    from endpoints import EndpointPool
+
+    with FakeHorizon(latency_ms=150) as slow, FakeHorizon() as fast:
+        pool = EndpointPool("horizon", [slow.url, fast.url])
+        with patch("horizon_client.endpoint_pool", pool), patch("horizon_client._invalidate_source"):
+            for _ in range(10):
+                assert horizon_client.get_last_activity("G" + "A" * 55)
+            assert horizon_client.submit_transaction("AAAA")["successful"] is True
+        slow_stats, fast_stats = slow.stats()["by_route"], fast.stats()["by_route"]
+
+    lookups = "GET /accounts/{id}/transactions"
+    assert fast_stats[lookups] >= 9 and slow_stats.get(lookups, 0) <= 2
+    assert slow_stats.get("POST /transactions", 0) + fast_stats.get("POST /transactions", 0) == 1
+
+
+def test_soroban_reads_fail_over_between_rpc_endpoints():
+    import soroban_client
+    from benchmarks.fakes import FakeSorobanRpc
+    from endpoints import EndpointPool
+
+    with FakeSorobanRpc(error_rate=1.0) as broken, FakeSorobanRpc() as healthy:
+        pool = EndpointPool("soroban", [broken.url, healthy.url])
+        with patch("soroban_client.rpc_endpoints", pool), patch("soroban_client._server", None):
+            assert soroban_client.rpc_server().get_latest_ledger().sequence == healthy.ledger
+        assert healthy.stats()["by_method"] == {"getLatestLedger": 1}
+    assert pool.state()["endpoints"][1]["errors"] == 0
@@ -0,0 +1,116 @@
+"""
+Tests for the Horizon account cache: TTL, LRU eviction, coalesced misses and invalidation on submit, fresh reads.
+Run from backend: pytest tests/test_horizon_cache.py -v
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from stellar_sdk import Account, Keypair, TransactionBuilder
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+def test_ttl_lru_and_stats():
+    from horizon_client import AccountCache
+
+    cache = AccountCache(ttl=0.2, maxsize=2)
+    fetch = MagicMock(side_effect=lambda a: {"id": a})
+    for account_id in ("A", "A", "B", "A", "C"):
+        cache.get(account_id, fetch)
+    # "B" was least recently used when "C" arrived.
+    assert [c.args[0] for c in fetch.call_args_list] == ["A", "B", "C"]
+    cache.get("B", fetch)
+    assert fetch.call_count == 4
+
+    time.sleep(0.25)
+    cache.get("C", fetch)
+    assert fetch.call_count == 5
+    assert cache.stats() == {
+        "hits": 2, "misses": 5, "coalesced": 0, "evictions": 2, "size": 2, "ttl_seconds": 0.2, "max_size": 2,
+    }
+
+    fetch.side_effect = lambda a: None  # not found is not cached
+    cache.get("D", fetch)
+    cache.get("D", fetch)
+    assert fetch.call_count == 7
+
+
+def test_concurrent_misses_share_one_fetch():
+    from horizon_client import AccountCache
+
+    cache = AccountCache(ttl=30, maxsize=10)
+    release = threading.Event()
+    calls = []
+
+    def fetch(account_id):
+        calls.append(account_id)
+        release.wait(2)
+        return {"id": account_id}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("A", fetch))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == ["A"]
+    assert results == [{"id": "A"}] * 8
+    assert (cache.misses, cache.coalesced) == (1, 7)
+
+
+def test_submit_invalidates_source_account():
+    import horizon_client
+
+    kp = Keypair.random()
+    horizon_client.account_cache.clear()
+    response = MagicMock(status_code=200)
+    response.json.side_effect = [{"id": kp.public_key, "sequence": "1"}, {"hash": "h"}, {"id": kp.public_key, "sequence": "2"}]
+    with patch("http_session.request", return_value=response) as request:
+        assert horizon_client.get_account(kp.public_key)["sequence"] == "1"
+        assert horizon_client.get_account(kp.public_key)["sequence"] == "1"
+        tx = (
+            TransactionBuilder(Account(kp.public_key, 1), "Test SDF Network ; September 2015", base_fee=100)
+            .append_bump_sequence_op(5)
+            .set_timeout(30)
+            .build()
+        )
+        tx.sign(kp)
+        horizon_client.submit_transaction(tx.to_xdr())
+        assert horizon_client.get_account(kp.public_key)["sequence"] == "2"
+    assert request.call_count == 3
+
+
+def test_fresh_reads_bypass_the_cache_and_refresh_it():
+    import horizon_client
+
+    kp = Keypair.random()
+    horizon_client.account_cache.clear()
+    response = MagicMock(status_code=200)
+    response.json.side_effect = [{"id": kp.public_key, "sequence": "1"}, {"id": kp.public_key, "sequence": "2"}]
+    with patch("http_session.request", return_value=response) as request:
+        assert horizon_client.get_account(kp.public_key)["sequence"] == "1"
+        assert horizon_client.get_account(kp.public_key, fresh=True)["sequence"] == "2"
+        assert horizon_client.get_account(kp.public_key)["sequence"] == "2"  # display reads get the refreshed copy
+    assert request.call_count == 2
+
+
+def test_account_endpoint_is_cached_unless_fresh_is_asked(app_and_client):
+    import horizon_client
+
+    app, client, db_path = app_and_client
+    kp = Keypair.random()
+    horizon_client.account_cache.clear()
+    response = MagicMock(status_code=200)
+    response.json.side_effect = [{"id": kp.public_key, "sequence": "1"}, {"id": kp.public_key, "sequence": "2"}]
+    with patch("http_session.request", return_value=response) as request:
+        assert client.get(f"/api/horizon/account/{kp.public_key}").get_json()["sequence"] == "1"
+        assert client.get(f"/api/horizon/account/{kp.public_key}").get_json()["sequence"] == "1"
+        assert client.get(f"/api/horizon/account/{kp.public_key}?fresh=1").get_json()["sequence"] == "2"
+    assert request.call_count == 2
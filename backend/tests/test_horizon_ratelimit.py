@@ -0,0 +1,134 @@
+"""
+Tests for rate-limit-aware Horizon lookups: AIMD concurrency from X-RateLimit headers, and deferral of
+rate-limited lookups in the inactivity check.
+Run from backend: pytest tests/test_horizon_ratelimit.py -v
+"""
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from tests.conftest import _insert_nominee  # noqa: E402
+
+
+def test_aimd_limit_follows_rate_limit_headers():
+    from horizon_ratelimit import AimdLimiter
+
+    limiter = AimdLimiter(8, min_limit=2, cooldown=0.05)
+    limiter.observe(200, {"X-RateLimit-Limit": "3600", "X-RateLimit-Remaining": "3000", "X-RateLimit-Reset": "40"})
+    assert limiter.state()["concurrency_limit"] == 8 and limiter.state()["rate_remaining"] == 3000
+
+    limiter.observe(429, {"Retry-After": "30"})
+    limiter.observe(429, {"Retry-After": "30"})  # same episode: only one cut
+    state = limiter.state()
+    assert (state["concurrency_limit"], state["decreases"], state["throttled"]) == (4, 1, 2)
+    assert 29 < state["paused_seconds"] <= 30
+    started = time.monotonic()
+    assert limiter.acquire(max_wait=1) is False  # pause outlasts the wait budget: defer at once
+    assert time.monotonic() - started < 0.5 and limiter.state()["deferred"] == 1
+
+    limiter.paused_until = 0.0
+    for _ in range(5 + 5):  # about `limit` successes per +1: 4 -> 6
+        limiter.observe(200, {})
+    assert limiter.state()["concurrency_limit"] == 6
+
+    time.sleep(0.06)
+    limiter.observe(200, {"x-ratelimit-limit": "100", "x-ratelimit-remaining": "5"})  # under the 10% watermark
+    assert limiter.state()["concurrency_limit"] == 3
+    assert [limiter.acquire(0.01) for _ in range(4)] == [True, True, True, False]
+    limiter.release()
+    assert limiter.acquire(0.01) is True
+
+
+def test_horizon_reads_get_429_without_transport_retries():
+    import http_session
+    import horizon_client
+    from benchmarks.fakes import FakeHorizon
+    from horizon_ratelimit import limiter
+
+    account = "G" + "A" * 55
+    limiter.reset()
+    try:
+        with FakeHorizon(rate_limit=1, rate_window=30) as horizon, patch("horizon_client.HORIZON_URL", horizon.url):
+            assert horizon_client.get_last_activity(account)
+            try:
+                horizon_client.get_last_activity(account)
+                raise AssertionError("expected RateLimited")
+            except horizon_client.RateLimited:
+                pass
+            assert horizon.stats()["throttled"] == 1  # the 429 was not retried under the limiter
+            assert limiter.state()["throttled"] == 1
+    finally:
+        limiter.reset()
+        http_session.close_all()
+
+
+def test_async_429_is_only_retried_when_asked():
+    from aio_http import _retryable
+
+    assert _retryable(429, "GET", retry_429=False) is False
+    assert _retryable(429, "POST", retry_429=True) is True
+    assert _retryable(503, "GET", retry_429=False) is True
+    assert _retryable(503, "POST", retry_429=True) is False
+
+
+def test_async_horizon_reads_get_429_without_transport_retries():
+    pytest.importorskip("aiohttp")
+    import aio_http
+    from benchmarks.fakes import FakeHorizon
+
+    async def lookups(url):
+        try:
+            return [(await aio_http.get(url, retry_429=False)).status_code for _ in range(2)]
+        finally:
+            await aio_http.close_all()
+
+    with FakeHorizon(rate_limit=1, rate_window=30) as horizon:
+        assert asyncio.run(lookups(f"{horizon.url}/accounts/{'G' + 'A' * 55}")) == [200, 429]
+        assert horizon.stats()["throttled"] == 1  # the 429 went back to the caller, not retried
+
+
+def test_rate_limited_lookups_are_deferred_not_read_as_inactive(app_and_client):
+    import app as app_module
+    from horizon_ratelimit import limiter
+
+    app, client, db_path = app_and_client
+    throttled, active = "G" + "T" * 55, "G" + "A" * 55
+    _insert_nominee(db_path, depositor=throttled, inactivity_days=0)
+    _insert_nominee(db_path, depositor=active, inactivity_days=0, phone="+15550000001")
+
+    def horizon_get(url, **kwargs):
+        if throttled in url:
+            return MagicMock(status_code=429, headers={"Retry-After": "0.3", "X-RateLimit-Remaining": "0"})
+        body = {"_embedded": {"records": [{"created_at": "2020-01-01T00:00:00Z"}]}}
+        return MagicMock(status_code=200, headers={"X-RateLimit-Remaining": "50"}, json=MagicMock(return_value=body))
+
+    limiter.reset()
+    try:
+        with patch("http_session.get", side_effect=horizon_get), patch("config.SMS_DISPATCH_MODE", "async"):
+            with app.app_context():
+                _, _, stats = app_module._run_check_nominees()
+            state = client.get("/api/horizon/rate-limit").get_json()
+    finally:
+        limiter.reset()
+
+    assert (stats["nominees_checked"], stats["nominees_deferred"]) == (1, 1)
+    assert state["throttled"] == 1 and state["deferred"] == 1 and state["rate_remaining"] is not None
+    with sqlite3.connect(db_path) as c:
+        rows = dict(c.execute(
+            "SELECT n.depositor_account_id, (SELECT COUNT(*) FROM nominee_claims k WHERE k.nominee_id = n.id) "
+            "FROM nominees n"
+        ))
+        next_check, lease = c.execute(
+            "SELECT next_check_at, lease_owner FROM nominees WHERE depositor_account_id = ?", (throttled,)
+        ).fetchone()
+    assert rows == {throttled: 0, active: 1}
+    assert next_check is not None and lease is None  # back in the queue for a later cycle
@@ -0,0 +1,84 @@
+"""
+Tests for the shared outbound HTTP layer (pooled sessions, retries on 429/5xx).
+Run from backend: pytest tests/test_http_session.py -v
+"""
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+@pytest.fixture
+def flaky_server():
+    """Local server that answers each path with a scripted list of status codes, then 200."""
+    script = {}
+    hits = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            hits[self.path] = hits.get(self.path, 0) + 1
+            codes = script.get(self.path, [])
+            code = codes.pop(0) if codes else 200
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", script, hits
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    import http_session
+    http_session.close_all()
+    with patch("http_session.HTTP_BACKOFF_FACTOR", 0):
+        yield
+    http_session.close_all()
+
+
+def test_get_retries_5xx_then_succeeds(flaky_server):
+    import http_session
+    base, script, hits = flaky_server
+    script["/a"] = [503, 502]
+    r = http_session.get(f"{base}/a")
+    assert r.status_code == 200
+    assert hits["/a"] == 3
+
+
+def test_post_retries_429_but_not_5xx(flaky_server):
+    import http_session
+    base, script, hits = flaky_server
+    script["/limited"] = [429]
+    script["/broken"] = [500]
+    assert http_session.post(f"{base}/limited", data={"x": "1"}).status_code == 200
+    assert hits["/limited"] == 2
+    assert http_session.post(f"{base}/broken", data={"x": "1"}).status_code == 500
+    assert hits["/broken"] == 1
+
+
+def test_one_session_per_host_and_host_timeout_override():
+    import http_session
+    assert http_session.session_for("https://h.example/a") is http_session.session_for("https://H.example/b")
+    assert http_session.session_for("https://h.example/a") is not http_session.session_for("https://other.example/")
+    with patch("http_session.HTTP_HOST_TIMEOUTS", {"h.example": 3.0}):
+        assert http_session.timeout_for("https://h.example/x", 10) == 3.0
+        assert http_session.timeout_for("https://other.example/x", 10) == 10
@@ -3,45 +3,16 @@ Tests for inactivity detection (5 minutes test option) and SMS claim link.
 Run from repo root: python -m pytest backend/tests/test_inactivity_and_sms.py -v
 Or from backend: pytest tests/test_inactivity_and_sms.py -v
 """
-import os
 import sys
 import sqlite3
-import tempfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
-import pytest
-
 _backend = Path(__file__).resolve().parent.parent
 if str(_backend) not in sys.path:
     sys.path.insert(0, str(_backend))
 
-
-@pytest.fixture
-def app_and_client():
-    """Flask app with in-memory DB and test client."""
-    import app as app_module
-    app = app_module.app
-    fd, db_path = tempfile.mkstemp(suffix=".db")
-    os.close(fd)
-    app.config["DATABASE"] = db_path
-    app.config["TESTING"] = True
-    app_module.init_db()
-    yield app, app.test_client(), db_path
-    try:
-        os.unlink(db_path)
-    except Exception:
-        pass
-
-
-def _insert_nominee(db_path, depositor="G" + "A" * 55, inactivity_days=0, phone="+15551234567", question="Test?"):
-    with sqlite3.connect(db_path) as c:
-        c.execute(
-            """INSERT INTO nominees
-               (depositor_account_id, sweep_public_key, ciphertext_b64, nonce_b64, salt_b64, question, beneficiary_phone, beneficiary_stellar_address, inactivity_days)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (depositor, "G" + "B" * 55, "cipher", "nonce", "salt", question, phone, None, inactivity_days),
-        )
+from tests.conftest import _insert_nominee  # noqa: E402
 
 
 def test_inactivity_5_minutes_treats_no_activity_as_inactive(app_and_client):
@@ -104,6 +75,84 @@ def test_inactivity_7_days_uses_days(app_and_client):
     send_sms.assert_called_once()
 
 
+def test_concurrent_lookups_report_throughput(app_and_client):
+    """With several nominees, lookups run through the pool and the result reports throughput."""
+    app, client, db_path = app_and_client
+    for i in range(5):
+        _insert_nominee(db_path, depositor="G" + chr(ord("A") + i) * 55, inactivity_days=7, phone=f"+1555000000{i}")
+
+    with patch("config.HORIZON_LOOKUP_CONCURRENCY", 4):
+        with patch("horizon_client.get_last_activity", return_value="2020-01-01T00:00:00Z") as lookup:
+            with patch("sms_client.send_nominee_claim_sms", return_value=True) as send_sms:
+                r = client.get("/api/agent/check-nominees")
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["sms_sent"] == 5
+    assert data["lookups"] == 5
+    assert "lookups_per_sec" in data
+    assert lookup.call_count == 5
+    assert send_sms.call_count == 5
+
+
+def test_active_nominee_is_not_rechecked_until_due(app_and_client):
+    """An active depositor is scheduled at last activity + threshold and skipped by later cycles."""
+    from datetime import datetime, timezone, timedelta
+    app, client, db_path = app_and_client
+    _insert_nominee(db_path, inactivity_days=7)
+    recent = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    with patch("horizon_client.get_last_activity", return_value=recent) as lookup:
+        with patch("sms_client.send_nominee_claim_sms", return_value=True) as send_sms:
+            client.get("/api/agent/check-nominees")
+            r = client.get("/api/agent/check-nominees")
+    assert r.get_json()["lookups"] == 0
+    assert lookup.call_count == 1
+    send_sms.assert_not_called()
+    with sqlite3.connect(db_path) as c:
+        next_check = c.execute("SELECT next_check_at FROM nominees").fetchone()[0]
+    expected = (datetime.now(timezone.utc) + timedelta(days=6)).strftime("%Y-%m-%d")
+    assert next_check.startswith(expected)
+
+
+def test_startup_backfill_schedules_and_retires_rows(app_and_client):
+    """init_db computes next_check_at from last activity and retires rows that already have a claim."""
+    import app as app_module
+    app, client, db_path = app_and_client
+    _insert_nominee(db_path, depositor="G" + "A" * 55, inactivity_days=30)
+    _insert_nominee(db_path, depositor="G" + "C" * 55, inactivity_days=30)
+    with sqlite3.connect(db_path) as c:
+        c.execute("UPDATE nominees SET last_activity_at = '2026-01-01T00:00:00Z' WHERE depositor_account_id = ?", ("G" + "A" * 55,))
+        claimed_id = c.execute("SELECT id FROM nominees WHERE depositor_account_id = ?", ("G" + "C" * 55,)).fetchone()[0]
+        c.execute("INSERT INTO nominee_claims (claim_token, nominee_id) VALUES ('t', ?)", (claimed_id,))
+
+    app_module.init_db()
+    with sqlite3.connect(db_path) as c:
+        rows = dict(c.execute("SELECT depositor_account_id, next_check_at FROM nominees").fetchall())
+    assert rows["G" + "A" * 55] == "2026-01-31 00:00:00"
+    assert rows["G" + "C" * 55] is None
+
+
+def test_check_streams_chunks_and_skips_claimed(app_and_client):
+    """Nominees are processed in keyset chunks; a nominee that already has a claim is not re-issued."""
+    app, client, db_path = app_and_client
+    for i in range(5):
+        _insert_nominee(db_path, depositor="G" + chr(ord("A") + i) * 55, inactivity_days=7, phone=f"+1555000000{i}")
+    with sqlite3.connect(db_path) as c:
+        c.execute("INSERT INTO nominee_claims (claim_token, nominee_id) VALUES ('existing', 1)")
+
+    with patch("config.NOMINEE_CHECK_CHUNK_SIZE", 2):
+        with patch("horizon_client.get_last_activity", return_value="2020-01-01T00:00:00Z"):
+            with patch("sms_client.send_nominee_claim_sms", return_value=True) as send_sms:
+                r = client.get("/api/agent/check-nominees")
+    data = r.get_json()
+    assert data["sms_sent"] == 4
+    assert data["lookups"] == 4
+    assert {c.args[0] for c in send_sms.call_args_list} == {f"+1555000000{i}" for i in range(1, 5)}
+    with sqlite3.connect(db_path) as c:
+        assert c.execute("SELECT COUNT(*) FROM nominee_claims").fetchone()[0] == 5
+        assert c.execute("SELECT COUNT(*) FROM nominees WHERE next_check_at IS NOT NULL").fetchone()[0] == 1
+
+
 def test_sms_link_format():
     """Claim link in SMS is base/claim/<token> (sms_client builds it)."""
     base = "https://example.run.app"
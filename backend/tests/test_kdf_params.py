@@ -0,0 +1,69 @@
+"""
+Tests for per-record KDF parameters and the calibration tool's recommendation.
+Run from backend: pytest tests/test_kdf_params.py -v
+"""
+import base64
+import sqlite3
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from tests.conftest import _insert_nominee  # noqa: E402
+
+
+def _register(client, depositor):
+    return client.post("/api/nominee/register", json={
+        "depositor_account_id": depositor, "beneficiary_phone": "+15550000000", "question": "Pet?", "answer": "rex",
+    })
+
+
+def _claim_kdf(db_path, client, depositor, token):
+    with sqlite3.connect(db_path) as c:
+        nominee_id = c.execute("SELECT id FROM nominees WHERE depositor_account_id = ?", (depositor,)).fetchone()[0]
+        c.execute("INSERT INTO nominee_claims (claim_token, nominee_id) VALUES (?, ?)", (token, nominee_id))
+    with patch("horizon_client.get_account", return_value=None):
+        return client.get(f"/api/claim/data/{token}").get_json()
+
+
+def test_records_keep_the_params_they_were_encrypted_with(app_and_client):
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    import kdf_pool
+    import key_encrypt
+
+    app, client, db_path = app_and_client
+    _insert_nominee(db_path, depositor="G" + "L" * 55)  # row from before kdf_params existed
+    kdf_pool.configure(workers=0)
+    try:
+        with patch("key_encrypt.KDF_ITERATIONS", 2_000):
+            assert _register(client, "G" + "A" * 55).status_code == 200
+        with patch("key_encrypt.KDF_ITERATIONS", 3_000):
+            assert _register(client, "G" + "B" * 55).status_code == 200
+    finally:
+        import config
+        kdf_pool.configure(workers=config.KDF_POOL_WORKERS)
+
+    assert _claim_kdf(db_path, client, "G" + "L" * 55, "legacy")["kdf"] == key_encrypt.LEGACY_KDF_PARAMS
+    data = _claim_kdf(db_path, client, "G" + "A" * 55, "old")
+    assert (data["kdf"]["iterations"], data["kdf"]["algorithm"]) == (2_000, "PBKDF2-SHA256")
+    assert _claim_kdf(db_path, client, "G" + "B" * 55, "new")["kdf"]["iterations"] == 3_000
+
+    # The older record still decrypts with its own stored parameters.
+    key = key_encrypt._derive_key("rex", base64.b64decode(data["salt_b64"]), data["kdf"])
+    secret = AESGCM(key).decrypt(base64.b64decode(data["nonce_b64"]), base64.b64decode(data["ciphertext_b64"]), None)
+    assert secret.startswith(b"S")
+
+
+def test_calibration_respects_both_budgets():
+    from kdf_calibrate import recommend_iterations
+
+    # Server 40 ms / 100k, phone 400 ms / 100k: the 1 s claim budget allows 250k, the 200 ms register budget 500k.
+    result = recommend_iterations(40, 400, claim_budget_ms=1000, register_budget_ms=200)
+    assert (result["iterations"], result["limited_by"], result["within_budget"]) == (250_000, "claim", True)
+    assert result["browser_ms"] <= 1000 and result["server_ms"] <= 200
+
+    floor = recommend_iterations(40, 4000, claim_budget_ms=1000, register_budget_ms=200)
+    assert (floor["iterations"], floor["within_budget"]) == (100_000, False)
@@ -0,0 +1,89 @@
+"""
+Tests for the registration KDF pool: results from worker processes and 503 + Retry-After when saturated.
+Run from backend: pytest tests/test_kdf_pool.py -v
+"""
+import base64
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+@pytest.fixture
+def pool():
+    import config
+    import kdf_pool
+    yield kdf_pool
+    kdf_pool.configure(workers=config.KDF_POOL_WORKERS, max_pending=config.KDF_POOL_MAX_PENDING)
+
+
+def test_worker_process_output_decrypts(pool):
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    import key_encrypt
+
+    pool.configure(workers=1)
+    ciphertext, nonce, salt = pool.encrypt("SSECRET", "blue")
+    key = key_encrypt._derive_key("blue", base64.b64decode(salt))
+    assert AESGCM(key).decrypt(base64.b64decode(nonce), base64.b64decode(ciphertext), None) == b"SSECRET"
+    assert pool.snapshot()["pending"] == 0
+
+
+def test_saturated_pool_returns_503_with_retry_after(app_and_client, pool):
+    app, client, db_path = app_and_client
+    pool.configure(workers=0, max_pending=1)
+    release = threading.Event()
+
+    def slow_encrypt(secret, answer, params=None):
+        release.wait(5)
+        return "c", "n", "s"
+
+    def register(depositor):
+        return client.post("/api/nominee/register", json={
+            "depositor_account_id": depositor, "beneficiary_phone": "+15550000000", "question": "Q?", "answer": "A",
+        })
+
+    results = []
+    with patch("key_encrypt.encrypt_secret_with_answer", side_effect=slow_encrypt):
+        first = threading.Thread(target=lambda: results.append(register("G" + "A" * 55)))
+        first.start()
+        while pool.snapshot()["pending"] == 0:
+            time.sleep(0.01)
+        busy = register("G" + "B" * 55)
+        release.set()
+        first.join()
+
+    assert busy.status_code == 503
+    assert int(busy.headers["Retry-After"]) >= 1
+    assert busy.get_json()["retry_after"] == int(busy.headers["Retry-After"])
+    assert results[0].status_code == 200
+    assert pool.snapshot()["rejected"] >= 1
+
+
+def test_timed_out_job_keeps_its_slot_until_it_ends(pool):
+    from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+    pool.configure(workers=1, max_pending=1)
+    release = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    def stuck_job(secret, answer, params):
+        release.wait(5)
+        return "c", "n", "s"
+
+    with patch("kdf_pool._get_pool", return_value=executor), patch("kdf_pool._encrypt_job", side_effect=stuck_job), \
+            patch("kdf_pool.KDF_POOL_TIMEOUT_SECONDS", 0.05):
+        with pytest.raises(TimeoutError):
+            pool.encrypt("SSECRET", "blue")
+        assert pool.snapshot()["pending"] == 1  # the job still occupies the worker
+        with pytest.raises(pool.PoolBusy):
+            pool.encrypt("SSECRET", "blue")
+        release.set()
+        executor.shutdown(wait=True)
+    assert pool.snapshot()["pending"] == 0
@@ -0,0 +1,119 @@
+"""
+Tests for the /metrics endpoint and its instrumentation (outbound calls, SQLite, scheduler cycles).
+Run from backend: pytest tests/test_metrics.py -v
+"""
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from tests.conftest import _insert_nominee  # noqa: E402
+
+
+class _Cycles:
+    """stop_event stand-in: lets the scheduler loop run n cycles without waiting."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def wait(self, timeout):
+        self.n -= 1
+        return self.n < 0
+
+
+def test_histogram_and_counter_render_in_prometheus_format():
+    import metrics
+
+    hist = metrics.Histogram("test_latency_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    hist.observe(0.05, "a")
+    hist.observe(0.5, "a")
+    hist.observe(5, "a")
+    counter = metrics.Counter("test_total", "Test.", ("code",))
+    counter.inc(200)
+    counter.inc(200, amount=2)
+    text = hist.render() + "\n" + counter.render()
+    metrics._registry.remove(hist)
+    metrics._registry.remove(counter)
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{route="a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="a",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{route="a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{route="a"} 3' in text
+    assert 'test_total{code="200"} 3' in text
+
+
+def test_outbound_calls_db_and_scheduler_are_recorded(app_and_client):
+    import app as app_module
+    import metrics
+    from horizon_ratelimit import limiter
+
+    app, client, db_path = app_and_client
+    metrics.reset()
+    _insert_nominee(db_path, depositor="G" + "A" * 55, inactivity_days=0)
+    _insert_nominee(db_path, depositor="G" + "B" * 55, inactivity_days=30, phone="+15550000001")
+    horizon = MagicMock(status_code=429)
+    with patch("http_session.get", return_value=horizon), \
+            patch("app.INACTIVITY_CHECK_INTERVAL_MINUTES", 1), patch("sms_client.TWILIO_ACCOUNT_SID", ""):
+        app_module._inactivity_scheduler_loop(_Cycles(1))
+    limiter.reset()
+
+    assert metrics.OUTBOUND_REQUESTS.value("horizon", "get_last_activity", "429") == 2
+    assert metrics.OUTBOUND_LATENCY.count("horizon", "get_last_activity") == 2
+    assert metrics.SCHEDULER_CYCLES.value("ok") == 1
+    assert metrics.SCHEDULER_CYCLE_SECONDS.count() == 1
+    assert metrics.SCHEDULER_NOMINEES.value("deferred") == 2  # 429s are retried later, not read as inactivity
+    assert metrics.DB_LATENCY.count("UPDATE") > 0
+
+    assert client.get("/metrics").status_code == 403  # closed until a token is configured
+    with patch("config.ADMIN_TOKEN", "admin"):
+        assert client.get("/metrics").status_code == 401
+        text = client.get("/metrics", headers={"Authorization": "Bearer admin"}).get_data(as_text=True)
+    assert 'walletsurance_outbound_requests_total{service="horizon",operation="get_last_activity",status="429"} 2' in text
+    assert 'walletsurance_scheduler_nominees_total{result="deferred"} 2' in text
+    assert "walletsurance_db_query_duration_seconds_bucket{statement=\"SELECT\"" in text
+    with patch("config.METRICS_TOKEN", "scrape"), patch("config.ADMIN_TOKEN", "admin"):
+        assert client.get("/metrics", headers={"Authorization": "Bearer admin"}).status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape"}).status_code == 200
+
+
+def test_soroban_rpc_calls_are_timed_per_method():
+    import metrics
+    import soroban_client
+    from benchmarks.fakes import FakeSorobanRpc
+
+    metrics.reset()
+    with FakeSorobanRpc(error_rate=1.0) as rpc, FakeSorobanRpc() as healthy:
+        with patch("soroban_client.SOROBAN_RPC_URL", healthy.url), patch("soroban_client._server", None):
+            assert soroban_client.rpc_server().get_latest_ledger().sequence == healthy.ledger
+        with patch("soroban_client.SOROBAN_RPC_URL", rpc.url), patch("soroban_client._server", None):
+            try:
+                soroban_client.rpc_server().get_latest_ledger()
+            except Exception:
+                pass
+    assert metrics.OUTBOUND_REQUESTS.value("soroban", "getLatestLedger", "ok") == 1
+    assert metrics.OUTBOUND_REQUESTS.value("soroban", "getLatestLedger", "error") == 1
+
+
+def test_failed_simulations_are_counted_and_clients_share_one_server(monkeypatch):
+    import metrics
+    import soroban_client
+    from benchmarks.fakes import FakeSorobanRpc
+    from stellar_sdk import StrKey
+
+    metrics.reset()
+    monkeypatch.setattr(soroban_client, "_clients", soroban_client.OrderedDict())
+    with FakeSorobanRpc() as rpc, patch("soroban_client.SOROBAN_RPC_URL", rpc.url), patch("soroban_client._server", None):
+        first, second = (soroban_client._client(StrKey.encode_contract(bytes([n]) * 32)) for n in (1, 2))
+        assert first.server is second.server is soroban_client.rpc_server()
+        rpc.simulate_error = "HostError: Error(Contract, #1)"
+        try:
+            first.invoke("can_claim", simulate=True)
+        except Exception:
+            pass
+        else:
+            raise AssertionError("expected the simulation to fail")
+    assert metrics.OUTBOUND_REQUESTS.value("soroban", "simulateTransaction", "error") == 1
+    assert metrics.OUTBOUND_REQUESTS.value("soroban", "simulateTransaction", "ok") == 0
@@ -0,0 +1,114 @@
+"""
+Tests for bulk nominee import: streamed NDJSON/CSV in, per-row NDJSON results out, batched inserts.
+Run from backend: pytest tests/test_nominee_import.py -v
+"""
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+
+def _depositor(i):
+    return "G" + f"{i:04d}".rjust(55, "A")
+
+
+def _row(i, **extra):
+    return {"depositor_account_id": _depositor(i), "beneficiary_phone": f"+1555000{i:04d}", "question": "Pet?",
+            "answer": f"rex{i}", **extra}
+
+
+@pytest.fixture
+def cheap_kdf():
+    import config
+    import kdf_pool
+    with patch("key_encrypt.KDF_ITERATIONS", 1_000):
+        yield kdf_pool
+    kdf_pool.configure(workers=config.KDF_POOL_WORKERS)
+
+
+def test_import_endpoint_streams_ndjson_and_csv(app_and_client, cheap_kdf):
+    app, client, db_path = app_and_client
+    cheap_kdf.configure(workers=0)
+    body = "\n".join([
+        json.dumps(_row(1)), "not json", json.dumps(_row(2, depositor_account_id="bad")), "", json.dumps(_row(3)),
+    ])
+    assert client.post("/api/nominees/import", data=body).status_code == 403
+    with patch("config.ADMIN_TOKEN", "s3cret"):
+        assert client.post("/api/nominees/import", data=body, headers={"Authorization": "Bearer nope"}).status_code == 401
+        r = client.post("/api/nominees/import", data=body, headers={"Authorization": "Bearer s3cret"})
+        assert r.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+        csv_body = "depositor_account_id,beneficiary_phone,question,answer,inactivity_days\n" \
+                   f"{_depositor(4)},+15550004,Pet?,rex,7\n"
+        r = client.post("/api/nominees/import", data=csv_body, content_type="text/csv",
+                        headers={"Authorization": "Bearer s3cret"})
+        csv_lines = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+
+    assert [line.get("line") for line in lines[:-1]] == [1, 2, 3, 5]
+    assert lines[0]["depositor_account_id"] == _depositor(1) and lines[0]["sweep_public_key"].startswith("G")
+    assert lines[1] == {"line": 2, "error": "Invalid row"}
+    assert "depositor_account_id must be" in lines[2]["error"]
+    assert lines[-1] == {"summary": {"imported": 2, "failed": 2, "replaced": 0}}
+    assert csv_lines[-1] == {"summary": {"imported": 1, "failed": 0, "replaced": 0}}
+    with sqlite3.connect(db_path) as c:
+        rows = dict(c.execute("SELECT depositor_account_id, inactivity_days FROM nominees"))
+        kdf = json.loads(c.execute("SELECT kdf_params FROM nominees LIMIT 1").fetchone()[0])
+    assert rows == {_depositor(1): 30, _depositor(3): 30, _depositor(4): 7}
+    assert kdf["iterations"] == 1_000
+
+
+def test_batches_run_in_worker_processes_and_keep_input_order(app_and_client, cheap_kdf):
+    import db
+    import nominee_import
+
+    app, client, db_path = app_and_client
+    cheap_kdf.configure(workers=1)
+    conn = db.get_pool(db_path).connection()
+    source = io.BytesIO("".join(json.dumps(_row(i)) + "\n" for i in range(7)).encode())
+    results = list(nominee_import.import_rows(conn, nominee_import.read_rows(source), batch_size=3, window=2))
+    assert [r["line"] for r in results[:-1]] == list(range(1, 8))
+    assert results[-1] == {"summary": {"imported": 7, "failed": 0, "replaced": 0}}
+    assert len({r["sweep_public_key"] for r in results[:-1]}) == 7
+    assert conn.execute("SELECT COUNT(*) FROM nominees").fetchone()[0] == 7
+
+
+def test_replaced_rows_are_reported(app_and_client, cheap_kdf):
+    import db
+    import nominee_import
+
+    app, client, db_path = app_and_client
+    cheap_kdf.configure(workers=0)
+    conn = db.get_pool(db_path).connection()
+    list(nominee_import.import_rows(conn, [(1, _row(1))]))
+    results = list(nominee_import.import_rows(conn, [(1, _row(1)), (2, _row(2)), (3, _row(2))]))
+    assert [r["replaced"] for r in results[:-1]] == [True, False, True]
+    assert results[-1] == {"summary": {"imported": 3, "failed": 0, "replaced": 2}}
+    assert conn.execute("SELECT COUNT(*) FROM nominees").fetchone()[0] == 2
+
+
+def test_submit_failure_fails_the_batch_and_still_summarizes(app_and_client, cheap_kdf):
+    from concurrent.futures.process import BrokenProcessPool
+    from unittest.mock import MagicMock
+
+    import db
+    import nominee_import
+
+    app, client, db_path = app_and_client
+    cheap_kdf.configure(workers=1)
+    broken = MagicMock()
+    broken.submit.side_effect = BrokenProcessPool("worker died")
+    conn = db.get_pool(db_path).connection()
+    with patch("kdf_pool._get_pool", return_value=broken):
+        results = list(nominee_import.import_rows(conn, [(i, _row(i)) for i in range(1, 4)], batch_size=2))
+    assert [r["line"] for r in results[:-1]] == [1, 2, 3]
+    assert all("worker died" in r["error"] for r in results[:-1])
+    assert results[-1] == {"summary": {"imported": 0, "failed": 3, "replaced": 0}}
+    assert cheap_kdf.snapshot()["pending"] == 0 and cheap_kdf._pool is None
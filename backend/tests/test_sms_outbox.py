@@ -0,0 +1,130 @@
+"""
+Tests for the durable SMS outbox and its dispatcher (and where the web process starts it), against a local HTTP stand-in for Twilio.
+Run from backend: pytest tests/test_sms_outbox.py -v
+"""
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import pytest
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from tests.conftest import _insert_nominee  # noqa: E402
+
+
+@pytest.fixture
+def fake_twilio():
+    """Local Twilio Messages API stand-in: replies with scripted status codes (then 201) and records messages."""
+    statuses = []
+    messages = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode())
+            messages.append({k: v[0] for k, v in form.items()})
+            code = statuses.pop(0) if statuses else 201
+            body = b'{"sid": "SM123", "status": "queued"}' if code == 201 else b'{"message": "error"}'
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with patch("sms_client.TWILIO_API_BASE", f"http://127.0.0.1:{server.server_port}"), \
+            patch("sms_client.TWILIO_ACCOUNT_SID", "AC_test"), \
+            patch("sms_client.TWILIO_AUTH_TOKEN", "token"), \
+            patch("sms_client.TWILIO_FROM_NUMBER", "+15550000000"), \
+            patch("sms_outbox.SMS_RETRY_BASE_SECONDS", 0):
+        yield statuses, messages
+    server.shutdown()
+
+
+def _outbox(db_path):
+    with sqlite3.connect(db_path) as c:
+        c.row_factory = sqlite3.Row
+        return [dict(r) for r in c.execute("SELECT * FROM sms_outbox")]
+
+
+def test_failed_send_is_retried_by_dispatcher(app_and_client, fake_twilio):
+    import db
+    import sms_outbox
+    app, client, db_path = app_and_client
+    statuses, messages = fake_twilio
+    statuses.append(500)
+    _insert_nominee(db_path, inactivity_days=0, phone="+15557777777")
+
+    with patch("horizon_client.get_last_activity", return_value=None):
+        data = client.get("/api/agent/check-nominees").get_json()
+    assert data["sms_queued"] == 1
+    assert data["sms_sent"] == 0
+    row = _outbox(db_path)[0]
+    assert (row["status"], row["attempts"]) == ("pending", 1)
+
+    assert sms_outbox.dispatch(db.get_pool(db_path).connection()) == 1
+    row = _outbox(db_path)[0]
+    assert (row["status"], row["attempts"], row["last_error"]) == ("sent", 2, None)
+    assert [m["To"] for m in messages] == ["+15557777777", "+15557777777"]
+    assert "/claim/" + row["claim_token"] in messages[-1]["Body"]
+
+
+def test_async_mode_only_enqueues(app_and_client, fake_twilio):
+    import db
+    import sms_outbox
+    app, client, db_path = app_and_client
+    statuses, messages = fake_twilio
+    _insert_nominee(db_path, inactivity_days=0)
+
+    with patch("config.SMS_DISPATCH_MODE", "async"):
+        with patch("horizon_client.get_last_activity", return_value=None):
+            data = client.get("/api/agent/check-nominees").get_json()
+    assert (data["sms_queued"], data["sms_sent"]) == (1, 0)
+    assert messages == []
+    conn = db.get_pool(db_path).connection()
+    assert sms_outbox.dispatch(conn) == 1
+    assert sms_outbox.status_counts(conn) == {"sent": 1}
+
+
+def test_token_bucket_limits_rate():
+    import sms_outbox
+    bucket = sms_outbox.TokenBucket(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.18
+
+
+def test_web_workers_start_explicitly_on_the_configured_db(app_and_client, fake_twilio):
+    import app as app_module
+
+    app, client, db_path = app_and_client
+    statuses, messages = fake_twilio
+    assert not any(t.name == "sms-dispatcher" for t in threading.enumerate())  # importing app starts nothing
+    _insert_nominee(db_path, inactivity_days=0)
+    with patch("config.SMS_DISPATCH_MODE", "async"), patch("horizon_client.get_last_activity", return_value=None):
+        assert client.get("/api/agent/check-nominees").get_json()["sms_queued"] == 1
+
+    with patch("app.RUN_AGENT_IN_WEB", True), patch("app.INACTIVITY_CHECK_INTERVAL_MINUTES", 0):
+        threads = app_module.start_web_workers()
+    try:
+        assert [t.name for t in threads] == ["sms-dispatcher"]
+        deadline = time.monotonic() + 5
+        while _outbox(db_path)[0]["status"] != "sent" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(messages) == 1 and _outbox(db_path)[0]["status"] == "sent"
+    finally:
+        app_module.stop_web_workers()
+    assert not any(t.is_alive() for t in threads)
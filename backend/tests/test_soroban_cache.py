@@ -0,0 +1,100 @@
+"""
+Tests for the per-ledger Soroban view cache (reuse within a ledger, singleflight on misses, LRU bound, multi-vault ids)
+and the contract_id check of /api/contract/status.
+Run from backend: pytest tests/test_soroban_cache.py -v
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+CONTRACT = "C" + "A" * 55
+
+
+def test_status_simulated_once_per_ledger_and_coalesced(monkeypatch):
+    import soroban_client
+    monkeypatch.setattr(soroban_client, "_status_cache", soroban_client.LedgerCache())
+    calls = []
+
+    def slow_simulate(client, vault_id=None):
+        calls.append(client.contract_id)
+        time.sleep(0.05)
+        return {"can_claim": False, "beneficiary_address": None, "contract_id": client.contract_id}
+
+    ledger = {"seq": 100}
+    with patch("soroban_client._simulate_status", side_effect=slow_simulate), \
+            patch("soroban_client.latest_ledger", side_effect=lambda: ledger["seq"]):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(soroban_client.get_contract_status(CONTRACT))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert all(r["ledger"] == 100 for r in results)
+
+        soroban_client.get_contract_status(CONTRACT)
+        assert len(calls) == 1
+        ledger["seq"] = 101
+        assert soroban_client.get_contract_status(CONTRACT)["ledger"] == 101
+        assert len(calls) == 2
+
+
+def test_view_cache_and_contract_clients_are_bounded(monkeypatch):
+    import soroban_client
+    cache = soroban_client.LedgerCache(maxsize=2)
+    for key in ("a", "b", "a", "c"):  # "a" is used again, so "b" is the least recently used
+        cache.get(key, 1, lambda: {"key": key})
+    assert list(cache._entries) == ["a", "c"] and cache.evictions == 1
+    assert set(cache._locks) <= {"a", "c"}
+
+    monkeypatch.setattr(soroban_client, "_clients", soroban_client.OrderedDict())
+    monkeypatch.setattr(soroban_client, "SOROBAN_CLIENT_CACHE_SIZE", 2)
+    ids = ["C" + c * 55 for c in "ABCD"]
+    for contract_id in ids:
+        soroban_client._client(contract_id)
+    assert list(soroban_client._clients) == ids[2:]
+
+
+def test_contract_status_rejects_unknown_contracts(app_and_client):
+    app, client, db_path = app_and_client
+    with patch("app.CONTRACT_ID", CONTRACT), patch("soroban_client.get_contract_status") as status:
+        resp = client.get("/api/contract/status?contract_id=" + "C" + "Z" * 55)
+        assert resp.status_code == 400 and not status.called
+
+        status.return_value = {"can_claim": False, "contract_id": CONTRACT}
+        assert client.get(f"/api/contract/status?contract_id={CONTRACT}").status_code == 200
+
+
+def test_multi_vault_status_over_rpc_passes_the_vault_id(app_and_client, monkeypatch):
+    import soroban_client
+    from stellar_sdk import Keypair, scval
+
+    app, client, db_path = app_and_client
+    beneficiary = Keypair.random().public_key
+    invoked = []
+
+    class FakeClient:
+        contract_id = CONTRACT
+
+        def invoke(self, name, parameters=None, simulate=True):
+            invoked.append((name, [scval.to_native(p) for p in parameters or []]))
+            value = scval.to_bool(True) if name == "can_claim" else scval.to_address(beneficiary)
+            return type("Tx", (), {"result": lambda self: value})()
+
+    monkeypatch.setattr(soroban_client, "_status_cache", soroban_client.LedgerCache())
+    monkeypatch.setattr(soroban_client, "MULTI_VAULT_CONTRACT_ID", CONTRACT)
+    with patch("app.MULTI_VAULT_CONTRACT_ID", CONTRACT), patch("app.SOROBAN_EVENTS_ENABLED", False), \
+            patch("soroban_client._client", return_value=FakeClient()), \
+            patch("soroban_client.latest_ledger", return_value=100):
+        for vault_id in (7, 7, 8):
+            status = client.get(f"/api/contract/status?contract_id={CONTRACT}&vault_id={vault_id}").get_json()
+            assert status == {"can_claim": True, "beneficiary_address": beneficiary, "contract_id": CONTRACT,
+                              "vault_id": vault_id, "ledger": 100}
+    # One simulation per vault and ledger, each with the vault id as its u64 argument.
+    assert invoked == [("can_claim", [7]), ("beneficiary", [7]), ("can_claim", [8]), ("beneficiary", [8])]
@@ -0,0 +1,142 @@
+"""
+Tests for Soroban event ingestion into the vaults mirror and the mirror-backed status / agent check.
+Run from backend: pytest tests/test_soroban_events.py -v
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from stellar_sdk import Keypair, StrKey, scval
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+CONTRACT = StrKey.encode_contract(b"\x05" * 32)
+DEPOSITOR = Keypair.random().public_key
+BENEFICIARY = Keypair.random().public_key
+
+
+def _event(name, ledger, topic_address, **data):
+    """A getEvents record as published by the inheritance contract."""
+    return SimpleNamespace(
+        id=f"{ledger:019d}-0000000001",
+        contract_id=CONTRACT,
+        ledger=ledger,
+        topic=[scval.to_symbol(name).to_xdr(), scval.to_address(topic_address).to_xdr()],
+        value=scval.to_map({scval.to_symbol(k): v for k, v in data.items()}).to_xdr(),
+    )
+
+
+def _page(events, latest, cursor, oldest=1):
+    return SimpleNamespace(events=events, latest_ledger=latest, oldest_ledger=oldest, cursor=cursor)
+
+
+def test_events_feed_mirror_and_status_needs_no_rpc(app_and_client):
+    import db
+    import soroban_events
+    app, client, db_path = app_and_client
+    server = MagicMock()
+    server.get_events.side_effect = [
+        _page([
+            _event("deposit", 101, DEPOSITOR, beneficiary=scval.to_address(BENEFICIARY),
+                   token=scval.to_address(CONTRACT), amount=scval.to_int128(500),
+                   last_ping=scval.to_uint32(101), timeout=scval.to_uint32(10)),
+            _event("ping", 105, DEPOSITOR, last_ping=scval.to_uint32(105)),
+        ], latest=110, cursor="c1"),
+        _page([], latest=120, cursor="c2"),
+        _page([_event("claim", 121, BENEFICIARY, amount=scval.to_int128(500))], latest=121, cursor="c3"),
+    ]
+    conn = db.get_pool(db_path).connection()
+    empty_snapshot = ({CONTRACT: None}, {"ledger": 100, "rpc_calls": 1, "seconds": 0.0})
+
+    with patch("soroban_client.read_vaults", return_value=empty_snapshot), \
+            patch("soroban_client.rpc_server", return_value=server), \
+            patch("app.SOROBAN_EVENTS_ENABLED", True), \
+            patch("app.CONTRACT_ID", CONTRACT), \
+            patch("config.AGENT_VAULT_MODE", "mirror"), \
+            patch("soroban_client.get_contract_status", side_effect=AssertionError("RPC on hot path")):
+        assert soroban_events.poll_once(conn, [CONTRACT]) == 2
+        assert server.get_events.call_args.kwargs["start_ledger"] == 100
+        status = client.get(f"/api/contract/status?contract_id={CONTRACT}").get_json()
+        assert (status["can_claim"], status["ledger"], status["source"]) == (False, 110, "mirror")
+        assert status["beneficiary_address"] == BENEFICIARY
+
+        soroban_events.poll_once(conn, [CONTRACT])
+        assert server.get_events.call_args.kwargs["cursor"] == "c1"
+        assert client.get(f"/api/contract/status?contract_id={CONTRACT}").get_json()["can_claim"] is True
+        check = client.post("/api/agent/check").get_json()
+        assert (check["claimable"], check["rpc_calls"]) == (1, 0)
+        assert check["claims"][0]["beneficiary_address"] == BENEFICIARY
+
+        soroban_events.poll_once(conn, [CONTRACT])
+        status = client.get(f"/api/contract/status?contract_id={CONTRACT}").get_json()
+        assert (status["can_claim"], status["beneficiary_address"]) == (False, None)
+
+    row = soroban_events.get_vault(conn, CONTRACT)
+    assert (row["status"], row["depositor"], row["amount"], row["deadline"]) == ("claimed", DEPOSITOR, "500", 115)
+
+
+def _snapshot(ledger):
+    """read_vaults stand-in: no vaults found, snapshot taken at ledger."""
+    return lambda ids: ({c: None for c in ids}, {"ledger": ledger, "rpc_calls": 1, "seconds": 0.0})
+
+
+def test_lanes_are_stable_and_freshness_is_per_contract(app_and_client):
+    import db
+    import soroban_events
+    app, client, db_path = app_and_client
+    conn = db.get_pool(db_path).connection()
+    ids = [StrKey.encode_contract(bytes([i]) * 32) for i in range(10, 40)]
+
+    lanes = soroban_events.assign_lanes(conn, ids)
+    assert sorted(len(v) for v in lanes.values()) == [5, 25]
+    newcomer = StrKey.encode_contract(b"\x01" * 32)  # sorts before every watched ID
+    again = soroban_events.assign_lanes(conn, ids[1:] + [newcomer])
+    assert again[0] == [c for c in lanes[0] if c != ids[0]] and newcomer in again[1]
+
+    server = MagicMock()
+    server.get_events.side_effect = lambda **kw: _page([], latest=200 if len(kw["filters"]) == 5 else 150, cursor="c")
+    with patch("soroban_client.read_vaults", side_effect=_snapshot(100)), \
+            patch("soroban_client.rpc_server", return_value=server):
+        soroban_events.poll_once(conn, ids[1:] + [newcomer])
+    assert soroban_events.mirror_ledger(conn) == 150  # the slowest lane bounds the whole mirror
+    assert soroban_events.mirror_ledger(conn, again[0][0]) == 200
+    assert soroban_events.mirror_ledger(conn, newcomer) == 150
+
+    # A lane not read recently, or a contract that is not mirrored, is answered over RPC.
+    rpc_status = {"can_claim": False, "beneficiary_address": None, "contract_id": newcomer}
+    with patch("app.SOROBAN_EVENTS_ENABLED", True), patch("app.CONTRACT_ID", newcomer), \
+            patch("soroban_client.get_contract_status", return_value=rpc_status) as rpc:
+        assert client.get("/api/contract/status").get_json().get("source") == "mirror"
+        conn.execute("UPDATE event_lanes SET polled_at = polled_at - 3600 WHERE contract_id = ?", (newcomer,))
+        conn.commit()
+        assert client.get("/api/contract/status").get_json() == rpc_status
+        conn.execute("DELETE FROM event_lanes WHERE contract_id = ?", (newcomer,))
+        conn.commit()
+        assert client.get("/api/contract/status").get_json() == rpc_status
+    assert rpc.call_count == 2
+
+
+def test_lane_outside_event_retention_is_reseeded(app_and_client):
+    import db
+    import soroban_events
+    from stellar_sdk.exceptions import SorobanRpcErrorResponse
+    app, client, db_path = app_and_client
+    conn = db.get_pool(db_path).connection()
+    server = MagicMock()
+    server.get_events.side_effect = [
+        _page([], latest=110, cursor="old"),
+        SorobanRpcErrorResponse(-32600, "startLedger must be between the oldest ledger: 5000 and the latest ledger: 9000"),
+        _page([], latest=9000, oldest=5000, cursor="new"),
+    ]
+    snapshots = iter([100, 8990])
+    with patch("soroban_client.read_vaults", side_effect=lambda ids: _snapshot(next(snapshots))(ids)), \
+            patch("soroban_client.rpc_server", return_value=server):
+        soroban_events.poll_once(conn, [CONTRACT])
+        soroban_events.poll_once(conn, [CONTRACT])
+
+    calls = [c.kwargs for c in server.get_events.call_args_list]
+    assert calls[1]["cursor"] == "old" and calls[2]["start_ledger"] == 8990 and "cursor" not in calls[2]
+    assert soroban_events.mirror_ledger(conn, CONTRACT) == 9000
@@ -0,0 +1,89 @@
+"""
+Tests for per-request timing (Server-Timing header, structured log) and admin-controlled sampled profiling.
+Run from backend: pytest tests/test_timing_profiling.py -v
+"""
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from tests.conftest import _insert_nominee  # noqa: E402
+
+ADMIN = {"Authorization": "Bearer admin-secret"}
+
+
+def _spans(header):
+    """Server-Timing value -> {name: count} (total has no count)."""
+    spans = {}
+    for part in header.split(", "):
+        name, *params = part.split(";")
+        desc = [p for p in params if p.startswith("desc=")]
+        spans[name] = int(desc[0][6:-1]) if desc else None
+    return spans
+
+
+def test_server_timing_header_and_log_break_down_a_request(app_and_client, caplog):
+    app, client, db_path = app_and_client
+    _insert_nominee(db_path)
+    with caplog.at_level(logging.INFO, logger="walletsurance.timing"):
+        resp = client.get("/api/claim/data/secret-token")
+
+    assert resp.status_code == 404
+    spans = _spans(resp.headers["Server-Timing"])
+    assert spans["db"] >= 1 and spans["json"] == 1 and "total" in spans
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["route"] == "/api/claim/data/<token>" and record["status"] == 404
+    assert record["spans"]["db"]["count"] == spans["db"] and record["total_ms"] >= 0
+    assert "secret-token" not in caplog.text
+
+    with patch("timing.REQUEST_TIMING_ENABLED", False):
+        assert "Server-Timing" not in client.get("/health").headers
+
+
+def test_asgi_native_routes_count_executor_db_time(app_and_client):
+    import asgi
+
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/claim/data/nope", "query_string": b"", "headers": []}
+    asyncio.run(asgi.app(scope, receive, send))
+    headers = dict(sent[0]["headers"])
+    spans = _spans(headers[b"server-timing"].decode())
+    assert sent[0]["status"] == 404 and spans["db"] >= 1 and spans["json"] == 1
+
+
+def test_admin_sampled_profiling(app_and_client, tmp_path):
+    import profiling
+
+    app, client, db_path = app_and_client
+    with patch("config.ADMIN_TOKEN", "admin-secret"), patch("profiling.PROFILE_DIR", str(tmp_path)), \
+            patch("profiling.PROFILE_MAX_FILES", 2), patch.dict(profiling._settings):
+        assert client.get("/api/admin/profiling").status_code == 401
+        assert client.post("/api/admin/profiling", json={"request_rate": "x"}, headers=ADMIN).status_code == 400
+        resp = client.post("/api/admin/profiling", json={"request_rate": 5, "path_prefix": "/health"}, headers=ADMIN)
+        assert resp.get_json()["request_rate"] == 1.0
+
+        for _ in range(3):
+            client.get("/health")
+        client.get("/api/lock-config")  # outside the prefix: not sampled
+        profiles = client.get("/api/admin/profiling", headers=ADMIN).get_json()["profiles"]
+        assert len(profiles) == 2 and all(p["name"].startswith("request-health-") for p in profiles)
+
+        name = profiles[0]["name"]
+        download = client.get(f"/api/admin/profiles/{name}", headers=ADMIN)
+        assert download.status_code == 200 and len(download.data) == profiles[0]["bytes"]
+        top = client.get(f"/api/admin/profiles/{name}?format=top&limit=5", headers=ADMIN).get_json()
+        assert len(top["functions"]) == 5 and top["functions"][0]["cumtime"] >= top["functions"][-1]["cumtime"]
+        assert client.get("/api/admin/profiles/..%2Fconfig.py", headers=ADMIN).status_code == 404
@@ -0,0 +1,179 @@
+"""
+Tests for the vault contract registry and the ledger-mode agent check (batched getLedgerEntries).
+Run from backend: pytest tests/test_vault_registry.py -v
+"""
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from stellar_sdk import Address, Keypair, StrKey, scval
+from stellar_sdk import xdr as stellar_xdr
+from stellar_sdk.soroban_rpc import GetLedgerEntriesResponse, LedgerEntryResult
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+ADMIN = {"Authorization": "Bearer admin"}
+
+
+def _contract_id(n):
+    return StrKey.encode_contract(n.to_bytes(32, "big"))
+
+
+def _instance_entry(contract_id, last_ping, timeout, beneficiary):
+    """A getLedgerEntries result for a contract instance holding one vault."""
+    import soroban_client
+    storage = stellar_xdr.SCMap([
+        stellar_xdr.SCMapEntry(scval.to_symbol("last_ping"), scval.to_uint32(last_ping)),
+        stellar_xdr.SCMapEntry(scval.to_symbol("timeout"), scval.to_uint32(timeout)),
+        stellar_xdr.SCMapEntry(scval.to_symbol("benef"), scval.to_address(beneficiary)),
+        stellar_xdr.SCMapEntry(scval.to_symbol("amount"), scval.to_int128(1000)),
+    ])
+    key = soroban_client._instance_key(contract_id)
+    data = stellar_xdr.LedgerEntryData(
+        stellar_xdr.LedgerEntryType.CONTRACT_DATA,
+        contract_data=stellar_xdr.ContractDataEntry(
+            ext=stellar_xdr.ExtensionPoint(0),
+            contract=Address(contract_id).to_xdr_sc_address(),
+            key=key.contract_data.key,
+            durability=stellar_xdr.ContractDataDurability.PERSISTENT,
+            val=stellar_xdr.SCVal(
+                stellar_xdr.SCValType.SCV_CONTRACT_INSTANCE,
+                instance=stellar_xdr.SCContractInstance(
+                    executable=stellar_xdr.ContractExecutable(
+                        stellar_xdr.ContractExecutableType.CONTRACT_EXECUTABLE_WASM,
+                        wasm_hash=stellar_xdr.Hash(b"\0" * 32),
+                    ),
+                    storage=storage,
+                ),
+            ),
+        ),
+    )
+    return LedgerEntryResult(key=key.to_xdr(), xdr=data.to_xdr(), lastModifiedLedgerSeq=1)
+
+
+def test_register_and_list_vaults(app_and_client):
+    app, client, db_path = app_and_client
+    cids = [_contract_id(i) for i in range(1, 4)]
+    assert client.post("/api/vaults", json={"contract_id": cids[0]}).status_code == 403
+    with patch("config.ADMIN_TOKEN", "admin"):
+        assert client.post("/api/vaults", json={"contract_id": cids[0]}).status_code == 401
+        assert client.post("/api/vaults", json={"contract_ids": cids, "label": "batch"}, headers=ADMIN).status_code == 201
+        assert client.post("/api/vaults", json={"contract_id": cids[0]}, headers=ADMIN).status_code == 201
+        assert client.post("/api/vaults", json={"contract_id": "nope"}, headers=ADMIN).status_code == 400
+    listed = client.get("/api/vaults").get_json()
+    assert sorted(v["contract_id"] for v in listed) == sorted(cids)
+    assert {v["label"] for v in listed} == {"batch"}
+
+
+def test_ledger_mode_batches_reads_and_claims_due_vaults(app_and_client):
+    app, client, db_path = app_and_client
+    beneficiary = Keypair.random().public_key
+    cids = [_contract_id(i) for i in range(1, 6)]
+    with patch("config.ADMIN_TOKEN", "admin"):
+        client.post("/api/vaults", json={"contract_ids": cids}, headers=ADMIN)
+    # Ledger 1000: vaults 1 and 2 are past last_ping + timeout, 3 and 4 are not, 5 has no instance entry.
+    entries = {
+        cids[0]: _instance_entry(cids[0], 900, 50, beneficiary),
+        cids[1]: _instance_entry(cids[1], 500, 500, beneficiary),
+        cids[2]: _instance_entry(cids[2], 990, 50, beneficiary),
+        cids[3]: _instance_entry(cids[3], 100, 5000, beneficiary),
+    }
+
+    def get_ledger_entries(keys):
+        found = []
+        for key in keys:
+            cid = Address.from_xdr_sc_address(key.contract_data.contract).address
+            if cid in entries:
+                found.append(entries[cid])
+        return GetLedgerEntriesResponse(entries=found, latestLedger=1000)
+
+    server = MagicMock()
+    server.get_ledger_entries.side_effect = get_ledger_entries
+    with patch("config.AGENT_VAULT_MODE", "ledger"), \
+            patch("soroban_client.SOROBAN_LEDGER_ENTRIES_BATCH", 2), \
+            patch("soroban_client.rpc_server", return_value=server):
+        data = client.post("/api/agent/check").get_json()
+
+    assert (data["checked"], data["claimable"], data["missing"]) == (5, 2, 1)
+    assert data["rpc_calls"] == server.get_ledger_entries.call_count == 3
+    assert {c["contract_id"] for c in data["claims"]} == {cids[0], cids[1]}
+    assert {c["beneficiary_address"] for c in data["claims"]} == {beneficiary}
+    runs = client.get("/api/agent/runs").get_json()
+    assert {r["contract_id"] for r in runs} == {cids[0], cids[1]}
+
+
+def _data_entry(key, val, live_until=None):
+    """A getLedgerEntries result for one contract data entry (key is a CONTRACT_DATA LedgerKey)."""
+    data = stellar_xdr.LedgerEntryData(
+        stellar_xdr.LedgerEntryType.CONTRACT_DATA,
+        contract_data=stellar_xdr.ContractDataEntry(
+            ext=stellar_xdr.ExtensionPoint(0),
+            contract=key.contract_data.contract,
+            key=key.contract_data.key,
+            durability=key.contract_data.durability,
+            val=val,
+        ),
+    )
+    return LedgerEntryResult(key=key.to_xdr(), xdr=data.to_xdr(), lastModifiedLedgerSeq=1, liveUntilLedgerSeq=live_until)
+
+
+def test_multi_vault_contract_reads_keyed_vaults_and_batches_claim_many(app_and_client):
+    import soroban_client
+    app, client, db_path = app_and_client
+    multi = _contract_id(99)
+    beneficiary = Keypair.random().public_key
+    depositor = Keypair.random().public_key
+
+    instance_key = soroban_client._instance_key(multi)
+    instance = stellar_xdr.SCVal(
+        stellar_xdr.SCValType.SCV_CONTRACT_INSTANCE,
+        instance=stellar_xdr.SCContractInstance(
+            executable=stellar_xdr.ContractExecutable(
+                stellar_xdr.ContractExecutableType.CONTRACT_EXECUTABLE_WASM,
+                wasm_hash=stellar_xdr.Hash(b"\0" * 32),
+            ),
+            storage=stellar_xdr.SCMap([
+                stellar_xdr.SCMapEntry(scval.to_vec([scval.to_symbol("NextId")]), scval.to_uint64(6)),
+            ]),
+        ),
+    )
+
+    def vault(last_ping, timeout):
+        # #[contracttype] struct Vault -> map keyed by field-name symbols, sorted.
+        return scval.to_map({
+            scval.to_symbol("amount"): scval.to_int128(100),
+            scval.to_symbol("beneficiary"): scval.to_address(beneficiary),
+            scval.to_symbol("depositor"): scval.to_address(depositor),
+            scval.to_symbol("last_ping"): scval.to_uint32(last_ping),
+            scval.to_symbol("timeout"): scval.to_uint32(timeout),
+            scval.to_symbol("token"): scval.to_address(_contract_id(7)),
+        })
+
+    # Vault 2 was already claimed (deleted); 1, 3 and 5 are expired at ledger 1000, 4 is not.
+    # Vault 5's entry outlived its TTL (archived): still there, to be restored before the claim.
+    entries = {instance_key.to_xdr(): _data_entry(instance_key, instance)}
+    for vault_id, (last_ping, timeout) in {1: (10, 10), 3: (900, 100), 4: (999, 10), 5: (0, 1)}.items():
+        key = soroban_client._vault_key(multi, vault_id)
+        entries[key.to_xdr()] = _data_entry(key, vault(last_ping, timeout), live_until=500 if vault_id == 5 else 5000)
+
+    def get_ledger_entries(keys):
+        found = [entries[k.to_xdr()] for k in keys if k.to_xdr() in entries]
+        return GetLedgerEntriesResponse(entries=found, latestLedger=1000)
+
+    server = MagicMock()
+    server.get_ledger_entries.side_effect = get_ledger_entries
+    with patch("config.AGENT_VAULT_MODE", "ledger"), \
+            patch("config.MULTI_VAULT_CONTRACT_ID", multi), \
+            patch("config.CLAIM_MANY_BATCH", 2), \
+            patch("soroban_client.rpc_server", return_value=server):
+        data = client.post("/api/agent/check").get_json()
+
+    assert (data["checked"], data["claimable"], data["archived"]) == (4, 3, 1)
+    assert {c["vault_id"]: c["restore_needed"] for c in data["claims"]} == {1: False, 3: False, 5: True}
+    assert data["rpc_calls"] == 2
+    assert data["claim_many_batches"] == [[1, 3], [5]]
+    assert {c["beneficiary_address"] for c in data["claims"]} == {beneficiary}
+    runs = client.get("/api/agent/runs").get_json()
+    assert sorted(r["vault_id"] for r in runs) == [1, 3, 5]
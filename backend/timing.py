@@ -0,0 +1,109 @@
+"""
+Per-request timing spans. While a request is handled, time spent in SQLite, each external service
+(recorded by metrics.outbound / metrics.observe_db), Soroban prepare_transaction and JSON encoding is
+summed per span name. At the end it becomes a Server-Timing response header and one structured log line
+(logger "walletsurance.timing", a JSON object per request).
+Spans are kept in a ContextVar: work handed to another thread is only counted when run in a copy of the
+request's context (contextvars.copy_context().run), as asgi.py does. Spans may overlap (prepare includes
+its soroban simulate call), so they need not add up to the total.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import REQUEST_TIMING_ENABLED, REQUEST_TIMING_LOG_MIN_MS
+
+LOG = logging.getLogger("walletsurance.timing")
+
+
+class Timing:
+    """Spans of one request: name -> [seconds, count]."""
+
+    __slots__ = ("started", "spans", "_lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                self.spans[name] = [seconds, 1]
+            else:
+                span[0] += seconds
+                span[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self, total: float) -> str:
+        """Server-Timing value, e.g. db;dur=1.2;desc="3", horizon;dur=80.4;desc="1", total;dur=84.0."""
+        with self._lock:
+            spans = sorted(self.spans.items())
+        parts = [f'{name};dur={seconds * 1000:.1f};desc="{count}"' for name, (seconds, count) in spans]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {name: {"ms": round(seconds * 1000, 2), "count": count} for name, (seconds, count) in self.spans.items()}
+
+
+_current: ContextVar[Timing | None] = ContextVar("request_timing", default=None)
+
+
+def start():
+    """Begin timing the current request. Returns a token for finish(), or None when disabled."""
+    if not REQUEST_TIMING_ENABLED:
+        return None
+    return _current.set(Timing())
+
+
+def current() -> Timing | None:
+    return _current.get()
+
+
+def add(name: str, seconds: float) -> None:
+    """Add time to a span of the current request (no-op outside one)."""
+    t = _current.get()
+    if t is not None:
+        t.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    t = _current.get()
+    if t is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        t.add(name, time.perf_counter() - started)
+
+
+def finish(token, method: str, route: str, status: int) -> str | None:
+    """End the request started with token: log its spans and return the Server-Timing header value."""
+    if token is None:
+        return None
+    t = _current.get()
+    _current.reset(token)
+    if t is None:
+        return None
+    total = t.elapsed()
+    if REQUEST_TIMING_LOG_MIN_MS >= 0 and total * 1000 >= REQUEST_TIMING_LOG_MIN_MS:
+        LOG.info(json.dumps({
+            "event": "request",
+            "method": method,
+            "route": route,
+            "status": status,
+            "total_ms": round(total * 1000, 2),
+            "spans": t.summary(),
+        }))
+    return t.header(total)
@@ -1,11 +1,13 @@
 #!/usr/bin/env bash
 # Deploy the Walletsurance inheritance contract to Soroban Testnet.
+# Usage: ./scripts/deploy_inheritance.sh [inheritance|vaults]   (vaults = multi-vault contract)
 # Prereqs: stellar CLI, wasm built, and a funded testnet account (identity configured).
 set -e
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 REPO_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
 WASM_DIR="$REPO_ROOT/walletsurance"
-WASM_PATH="$WASM_DIR/target/wasm32v1-none/release/inheritance.wasm"
+CONTRACT_NAME="${1:-inheritance}"
+WASM_PATH="$WASM_DIR/target/wasm32v1-none/release/$CONTRACT_NAME.wasm"
 
 if [[ ! -f "$WASM_PATH" ]]; then
   echo "Building contract..."
@@ -17,7 +19,7 @@ if [[ ! -f "$WASM_PATH" ]]; then
   exit 1
 fi
 
-echo "Deploying inheritance contract to Testnet..."
+echo "Deploying $CONTRACT_NAME contract to Testnet..."
 # You must have identity configured: stellar keys add default
 # Fund testnet account: https://laboratory.stellar.org/#account-creator?network=test
 SOURCE="${STELLAR_SOURCE_ACCOUNT:-default}"
@@ -34,4 +36,8 @@ if [[ -z "$CONTRACT_ID" ]]; then
 fi
 
 echo "Deployed contract ID: $CONTRACT_ID"
-echo "Set in your environment: export CONTRACT_ID=$CONTRACT_ID"
+if [[ "$CONTRACT_NAME" == "vaults" ]]; then
+  echo "Set in your environment: export MULTI_VAULT_CONTRACT_ID=$CONTRACT_ID"
+else
+  echo "Set in your environment: export CONTRACT_ID=$CONTRACT_ID"
+fi
@@ -1,9 +1,11 @@
 #![no_std]
 //! Walletsurance: Dead Man's Switch contract.
 //! Lock funds; if depositor doesn't ping within timeout, beneficiary can claim.
+//! Every state change publishes an event (deposit / ping / claim) so off-chain indexers can mirror
+//! the vault from getEvents instead of simulating view calls.
 
 use soroban_sdk::{
-    contract, contractimpl, symbol_short, token, Address, Env, MuxedAddress, Symbol,
+    contract, contractevent, contractimpl, symbol_short, token, Address, Env, MuxedAddress, Symbol,
 };
 
 const KEY_DEPOSITOR: Symbol = symbol_short!("depositor");
@@ -13,6 +15,37 @@ const KEY_AMOUNT: Symbol = symbol_short!("amount");
 const KEY_LAST_PING: Symbol = symbol_short!("last_ping");
 const KEY_TIMEOUT: Symbol = symbol_short!("timeout");
 
+/// Topics: ["deposit", depositor]. Data: the full vault.
+#[contractevent]
+#[derive(Clone, Debug, Eq, PartialEq)]
+pub struct Deposit {
+    #[topic]
+    pub depositor: Address,
+    pub beneficiary: Address,
+    pub token: Address,
+    pub amount: i128,
+    pub last_ping: u32,
+    pub timeout: u32,
+}
+
+/// Topics: ["ping", depositor]. Data: the new last_ping ledger.
+#[contractevent]
+#[derive(Clone, Debug, Eq, PartialEq)]
+pub struct Ping {
+    #[topic]
+    pub depositor: Address,
+    pub last_ping: u32,
+}
+
+/// Topics: ["claim", beneficiary]. Data: amount paid out; the vault is empty afterwards.
+#[contractevent]
+#[derive(Clone, Debug, Eq, PartialEq)]
+pub struct Claim {
+    #[topic]
+    pub beneficiary: Address,
+    pub amount: i128,
+}
+
 #[contract]
 pub struct Inheritance;
 
@@ -49,6 +82,15 @@ impl Inheritance {
         env.storage().instance().set(&KEY_LAST_PING, &ledger);
         env.storage().instance().set(&KEY_TIMEOUT, &timeout_ledgers);
 
+        Deposit {
+            depositor,
+            beneficiary,
+            token,
+            amount,
+            last_ping: ledger,
+            timeout: timeout_ledgers,
+        }
+        .publish(&env);
         Ok(())
     }
 
@@ -63,6 +105,11 @@ impl Inheritance {
 
         let ledger = env.ledger().sequence();
         env.storage().instance().set(&KEY_LAST_PING, &ledger);
+        Ping {
+            depositor,
+            last_ping: ledger,
+        }
+        .publish(&env);
         Ok(())
     }
 
@@ -112,6 +159,11 @@ impl Inheritance {
         env.storage().instance().remove(&KEY_LAST_PING);
         env.storage().instance().remove(&KEY_TIMEOUT);
 
+        Claim {
+            beneficiary,
+            amount,
+        }
+        .publish(&env);
         Ok(())
     }
 
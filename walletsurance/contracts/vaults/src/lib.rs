@@ -0,0 +1,236 @@
+#![no_std]
+//! Walletsurance: multi-vault Dead Man's Switch contract.
+//! Same switch as `inheritance`, but one deployment holds many vaults: each deposit gets a vault ID
+//! and its state lives in persistent storage under `DataKey::Vault(id)`. `claim_many` lets the agent
+//! settle many expired vaults in one transaction. Like `inheritance`, every state change publishes
+//! an event, here with the vault ID as the first topic after the event name.
+
+use soroban_sdk::{
+    contract, contractevent, contractimpl, contracttype, token, Address, Env, MuxedAddress, Vec,
+};
+
+/// Instance storage is kept alive for ~30 days past each deposit (5s ledgers).
+const DAY_IN_LEDGERS: u32 = 17_280;
+const VAULT_TTL_EXTEND_TO: u32 = 30 * DAY_IN_LEDGERS;
+const VAULT_TTL_THRESHOLD: u32 = VAULT_TTL_EXTEND_TO - DAY_IN_LEDGERS;
+/// A vault entry lives until its deadline (last_ping + timeout) plus this margin for the agent to claim it,
+/// so a long timeout does not let the entry be archived before it can be claimed.
+const VAULT_CLAIM_MARGIN: u32 = 30 * DAY_IN_LEDGERS;
+
+#[contracttype]
+#[derive(Clone, Debug, Eq, PartialEq)]
+pub struct Vault {
+    pub depositor: Address,
+    pub beneficiary: Address,
+    pub token: Address,
+    pub amount: i128,
+    pub last_ping: u32,
+    pub timeout: u32,
+}
+
+#[contracttype]
+#[derive(Clone)]
+pub enum DataKey {
+    /// Instance storage: next vault ID to assign (IDs start at 1).
+    NextId,
+    /// Persistent storage: one vault.
+    Vault(u64),
+}
+
+/// Topics: ["deposit", vault_id, depositor]. Data: the full vault.
+#[contractevent]
+#[derive(Clone, Debug, Eq, PartialEq)]
+pub struct Deposit {
+    #[topic]
+    pub vault_id: u64,
+    #[topic]
+    pub depositor: Address,
+    pub beneficiary: Address,
+    pub token: Address,
+    pub amount: i128,
+    pub last_ping: u32,
+    pub timeout: u32,
+}
+
+/// Topics: ["ping", vault_id, depositor]. Data: the new last_ping ledger.
+#[contractevent]
+#[derive(Clone, Debug, Eq, PartialEq)]
+pub struct Ping {
+    #[topic]
+    pub vault_id: u64,
+    #[topic]
+    pub depositor: Address,
+    pub last_ping: u32,
+}
+
+/// Topics: ["claim", vault_id, beneficiary]. Data: amount paid out; the vault is deleted.
+#[contractevent]
+#[derive(Clone, Debug, Eq, PartialEq)]
+pub struct Claim {
+    #[topic]
+    pub vault_id: u64,
+    #[topic]
+    pub beneficiary: Address,
+    pub amount: i128,
+}
+
+fn load(env: &Env, id: u64) -> Option<Vault> {
+    env.storage().persistent().get(&DataKey::Vault(id))
+}
+
+/// Ledgers the vault entry must stay live from now: until its deadline plus VAULT_CLAIM_MARGIN,
+/// capped at the network's maximum entry TTL.
+fn vault_ttl(env: &Env, vault: &Vault) -> u32 {
+    let deadline = vault.last_ping.saturating_add(vault.timeout);
+    deadline
+        .saturating_sub(env.ledger().sequence())
+        .saturating_add(VAULT_CLAIM_MARGIN)
+        .min(env.storage().max_ttl())
+}
+
+fn store(env: &Env, id: u64, vault: &Vault) {
+    let key = DataKey::Vault(id);
+    env.storage().persistent().set(&key, vault);
+    let ttl = vault_ttl(env, vault);
+    env.storage().persistent().extend_ttl(&key, ttl, ttl);
+    // The contract instance (and code) must outlive every vault in it.
+    env.storage().instance().extend_ttl(ttl, ttl);
+}
+
+fn is_expired(env: &Env, vault: &Vault) -> bool {
+    env.ledger().sequence() >= vault.last_ping.saturating_add(vault.timeout)
+}
+
+/// Pay the vault out to its beneficiary and delete it so it cannot be claimed again.
+fn settle(env: &Env, id: u64, vault: &Vault) {
+    let token_client = token::Client::new(env, &vault.token);
+    let to: MuxedAddress = vault.beneficiary.clone().into();
+    token_client.transfer(&env.current_contract_address(), &to, &vault.amount);
+    env.storage().persistent().remove(&DataKey::Vault(id));
+    Claim {
+        vault_id: id,
+        beneficiary: vault.beneficiary.clone(),
+        amount: vault.amount,
+    }
+    .publish(env);
+}
+
+#[contract]
+pub struct Vaults;
+
+#[contractimpl]
+impl Vaults {
+    /// Lock tokens in a new vault and return its ID. Caller must have approved this contract.
+    /// `timeout_ledgers`: number of ledgers after last ping before claim is allowed.
+    pub fn deposit(
+        env: Env,
+        depositor: Address,
+        token: Address,
+        amount: i128,
+        beneficiary: Address,
+        timeout_ledgers: u32,
+    ) -> Result<u64, soroban_sdk::Error> {
+        depositor.require_auth();
+        if amount <= 0 {
+            return Err(soroban_sdk::Error::from_contract_error(1));
+        }
+        if timeout_ledgers == 0 {
+            return Err(soroban_sdk::Error::from_contract_error(2));
+        }
+
+        let contract_id = env.current_contract_address();
+        let token_client = token::Client::new(&env, &token);
+        let to_muxed: MuxedAddress = contract_id.into();
+        token_client.transfer(&depositor, &to_muxed, &amount);
+
+        let id: u64 = env.storage().instance().get(&DataKey::NextId).unwrap_or(1);
+        env.storage().instance().set(&DataKey::NextId, &(id + 1));
+        env.storage()
+            .instance()
+            .extend_ttl(VAULT_TTL_THRESHOLD, VAULT_TTL_EXTEND_TO);
+
+        let vault = Vault {
+            depositor,
+            beneficiary,
+            token,
+            amount,
+            last_ping: env.ledger().sequence(),
+            timeout: timeout_ledgers,
+        };
+        store(&env, id, &vault);
+        Deposit {
+            vault_id: id,
+            depositor: vault.depositor,
+            beneficiary: vault.beneficiary,
+            token: vault.token,
+            amount: vault.amount,
+            last_ping: vault.last_ping,
+            timeout: vault.timeout,
+        }
+        .publish(&env);
+        Ok(id)
+    }
+
+    /// Reset the deadline of one vault. Only its depositor may call.
+    pub fn ping(env: Env, id: u64) -> Result<(), soroban_sdk::Error> {
+        let mut vault = load(&env, id).ok_or(soroban_sdk::Error::from_contract_error(3))?;
+        vault.depositor.require_auth();
+
+        vault.last_ping = env.ledger().sequence();
+        store(&env, id, &vault);
+        Ping {
+            vault_id: id,
+            depositor: vault.depositor,
+            last_ping: vault.last_ping,
+        }
+        .publish(&env);
+        Ok(())
+    }
+
+    /// Claim one vault to its beneficiary if its timeout has passed. Callable by anyone (e.g. Python agent).
+    pub fn claim(env: Env, id: u64) -> Result<(), soroban_sdk::Error> {
+        let vault = load(&env, id).ok_or(soroban_sdk::Error::from_contract_error(3))?;
+        if !is_expired(&env, &vault) {
+            return Err(soroban_sdk::Error::from_contract_error(4)); // not yet expired
+        }
+        settle(&env, id, &vault);
+        Ok(())
+    }
+
+    /// Claim every expired vault in `ids`; missing or not-yet-expired IDs are skipped, so one stale
+    /// ID does not fail the batch. Returns the IDs that were paid out. Callable by anyone.
+    pub fn claim_many(env: Env, ids: Vec<u64>) -> Vec<u64> {
+        let mut claimed = Vec::new(&env);
+        for id in ids.iter() {
+            if let Some(vault) = load(&env, id) {
+                if is_expired(&env, &vault) {
+                    settle(&env, id, &vault);
+                    claimed.push_back(id);
+                }
+            }
+        }
+        claimed
+    }
+
+    /// View: can the vault be claimed? (timeout elapsed since last ping; false if no such vault)
+    pub fn can_claim(env: Env, id: u64) -> bool {
+        match load(&env, id) {
+            Some(vault) => is_expired(&env, &vault),
+            None => false,
+        }
+    }
+
+    /// View: beneficiary address of a vault
+    pub fn beneficiary(env: Env, id: u64) -> Result<Address, soroban_sdk::Error> {
+        load(&env, id)
+            .map(|vault| vault.beneficiary)
+            .ok_or(soroban_sdk::Error::from_contract_error(3))
+    }
+
+    /// View: full vault state
+    pub fn vault(env: Env, id: u64) -> Result<Vault, soroban_sdk::Error> {
+        load(&env, id).ok_or(soroban_sdk::Error::from_contract_error(3))
+    }
+}
+
+mod test;
@@ -0,0 +1,104 @@
+#![cfg(test)]
+use super::*;
+use soroban_sdk::{
+    testutils::{storage::Persistent as _, Address as _, Ledger},
+    token, vec, Env,
+};
+
+#[test]
+fn test_claim_many_settles_only_expired_vaults() {
+    let env = Env::default();
+    env.mock_all_auths();
+    let contract_id = env.register(Vaults, ());
+    let client = VaultsClient::new(&env, &contract_id);
+
+    let admin = Address::generate(&env);
+    let token_id = env.register_stellar_asset_contract_v2(admin).address();
+    let depositor = Address::generate(&env);
+    let heir = Address::generate(&env);
+    token::StellarAssetClient::new(&env, &token_id).mint(&depositor, &300);
+
+    let a = client.deposit(&depositor, &token_id, &100, &heir, &10);
+    let b = client.deposit(&depositor, &token_id, &100, &heir, &50);
+    let c = client.deposit(&depositor, &token_id, &100, &heir, &10);
+    assert_eq!((a, b, c), (1, 2, 3));
+    assert!(!client.can_claim(&a));
+
+    env.ledger().with_mut(|l| l.sequence_number += 20);
+    client.ping(&c);
+    assert!(client.can_claim(&a));
+    assert!(!client.can_claim(&b));
+    assert!(!client.can_claim(&c));
+
+    let claimed = client.claim_many(&vec![&env, a, b, c, 99]);
+    assert_eq!(claimed, vec![&env, a]);
+    assert_eq!(token::Client::new(&env, &token_id).balance(&heir), 100);
+    assert!(client.try_vault(&a).is_err());
+    assert_eq!(client.vault(&b).amount, 100);
+}
+
+fn setup(env: &Env) -> (VaultsClient<'_>, Address, Address, Address) {
+    env.mock_all_auths();
+    let contract_id = env.register(Vaults, ());
+    let client = VaultsClient::new(env, &contract_id);
+    let token_id = env
+        .register_stellar_asset_contract_v2(Address::generate(env))
+        .address();
+    let depositor = Address::generate(env);
+    token::StellarAssetClient::new(env, &token_id).mint(&depositor, &1_000);
+    (client, token_id, depositor, Address::generate(env))
+}
+
+fn vault_ttl_left(env: &Env, client: &VaultsClient, id: u64) -> u32 {
+    env.as_contract(&client.address, || {
+        env.storage().persistent().get_ttl(&DataKey::Vault(id))
+    })
+}
+
+#[test]
+fn test_claim_many_skips_claimed_duplicate_and_unknown_ids() {
+    let env = Env::default();
+    let (client, token_id, depositor, heir) = setup(&env);
+    let a = client.deposit(&depositor, &token_id, &100, &heir, &10);
+    let b = client.deposit(&depositor, &token_id, &100, &heir, &10);
+    env.ledger().with_mut(|l| l.sequence_number += 10); // exactly at the deadline: claimable
+
+    client.claim(&a);
+    let claimed = client.claim_many(&vec![&env, a, b, b, 7]);
+    assert_eq!(claimed, vec![&env, b]);
+    assert_eq!(client.claim_many(&vec![&env, a, b]), vec![&env]);
+    assert_eq!(token::Client::new(&env, &token_id).balance(&heir), 200);
+    assert!(client.try_claim(&b).is_err());
+}
+
+#[test]
+fn test_claim_before_deadline_fails_and_claim_many_skips_it() {
+    let env = Env::default();
+    let (client, token_id, depositor, heir) = setup(&env);
+    let id = client.deposit(&depositor, &token_id, &100, &heir, &10);
+    env.ledger().with_mut(|l| l.sequence_number += 9);
+
+    assert!(!client.can_claim(&id));
+    assert!(client.try_claim(&id).is_err());
+    assert_eq!(client.claim_many(&vec![&env, id]), vec![&env]);
+    assert_eq!(client.vault(&id).amount, 100);
+}
+
+#[test]
+fn test_vault_entry_outlives_a_long_timeout() {
+    let env = Env::default();
+    let (client, token_id, depositor, heir) = setup(&env);
+    let timeout = 60 * DAY_IN_LEDGERS; // longer than the instance TTL
+    let id = client.deposit(&depositor, &token_id, &100, &heir, &timeout);
+    assert!(vault_ttl_left(&env, &client, id) >= timeout + VAULT_CLAIM_MARGIN);
+
+    // A ping late in the timeout pushes the entry's TTL out from the new last ping.
+    env.ledger().with_mut(|l| l.sequence_number += 50 * DAY_IN_LEDGERS);
+    client.ping(&id);
+    assert!(vault_ttl_left(&env, &client, id) >= timeout + VAULT_CLAIM_MARGIN);
+
+    // Still live (and claimable) at the deadline: neither the entry nor the instance was archived first.
+    env.ledger().with_mut(|l| l.sequence_number += timeout);
+    assert!(client.can_claim(&id));
+    assert!(vault_ttl_left(&env, &client, id) >= VAULT_CLAIM_MARGIN);
+}